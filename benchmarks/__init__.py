@@ -0,0 +1,6 @@
+"""Benchmarks for psyc20255management.
+
+Each module here is a script, to be run from the top of the repository with
+e.g. `python -m benchmarks.marksheet_extraction`.
+
+"""
@@ -0,0 +1,99 @@
+"""Time `psyc20255management.utils.checksums` against reading each file in
+freshly allocated chunks, on a few large files, such as reports with
+embedded images, or PDFs.
+
+Usage:
+  checksum_engine [--files=<n>] [--size=<mb>] [--threads=<n>] [--repeats=<n>]
+
+Options:
+  --files=<n>       Number of files [default: 20].
+  --size=<mb>       Size of each file in megabytes [default: 20].
+  --threads=<n>     Threads for the batch [default: 4].
+  --repeats=<n>     Number of runs of each; the fastest counts [default: 3].
+
+The files are freshly written, so they are likely to be in the page cache,
+and this measures hashing rather than the disk.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import time
+import hashlib
+import tempfile
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.utils import checksums
+
+#================================ End Imports ================================
+
+
+def chunked_checksum(filepath, chunk_size=1048576):
+    'The previous checksum of a file: md5 over freshly read chunks.'
+    hasher = hashlib.md5()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def best_time(function, repeats):
+    'Return the result of `function()` and its fastest time in seconds.'
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    size = int(float(arguments['--size']) * 1e6)
+    threads = int(arguments['--threads'])
+    repeats = int(arguments['--repeats'])
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+
+        filepaths = []
+        for i in range(int(arguments['--files'])):
+            filepath = os.path.join(tmpdir, 'report%d.pdf' % i)
+            with open(filepath, 'wb') as f:
+                f.write(os.urandom(size))
+            filepaths.append(filepath)
+
+        previous, previous_time = best_time(
+                lambda: [chunked_checksum(filepath) for filepath in filepaths],
+                repeats)
+
+        timings = [('chunked reads, md5', previous_time)]
+        for name, function in [
+                ('mmap, md5',
+                 lambda: checksums.checksum_files(filepaths, threads=1)),
+                ('mmap, md5, %d threads' % threads,
+                 lambda: checksums.checksum_files(filepaths, threads=threads)),
+                ('mmap, fast',
+                 lambda: checksums.checksum_files(filepaths, threads=1, fast=True)),
+                ('mmap, fast, %d threads' % threads,
+                 lambda: checksums.checksum_files(filepaths, threads=threads,
+                                                  fast=True)),
+                ]:
+            result, seconds = best_time(function, repeats)
+            if 'fast' not in name:
+                assert result == previous
+            timings.append((name, seconds))
+
+    total_mb = len(filepaths) * size / 1e6
+    print('%d files, %.0f MB' % (len(filepaths), total_mb))
+    for name, seconds in timings:
+        print('%-25s %8.3f s %8.0f MB/s' % (name, seconds, total_mb / seconds))
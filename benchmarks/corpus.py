@@ -0,0 +1,77 @@
+"""Generate synthetic corpora for the benchmarks: a NOW dropbox of submitted
+reports, and a directory of completed marksheets.
+
+Usage:
+  corpus dropbox <directory> [--students=<n>] [--resubmissions=<r>] [--size=<kb>] [--zip=<zip_file>] [--seed=<n>]
+  corpus marksheets <directory> [--count=<n>] [--damaged=<p>] [--sequences=<names>] [--seed=<n>]
+
+Options:
+  --students=<n>        Number of students [default: 1000].
+  --resubmissions=<r>   Mean number of extra submissions per student [default: 2].
+  --size=<kb>           Size of each submitted file in kilobytes [default: 16].
+  --zip=<zip_file>      Also put the dropbox in a zip file, as downloaded.
+  --count=<n>           Number of marksheets [default: 1000].
+  --damaged=<p>         Proportion of marksheets with damaged grade dropdowns
+                        [default: 0.05].
+  --sequences=<names>   Comma separated sequences of the marksheets
+                        [default: Experimental].
+  --seed=<n>            Random seed [default: 101].
+
+The submitted reports' filenames match `conf.submitted_report_filename_pattern`.
+The marksheets are made from `conf.marksheet_template_fname`, with random
+grades. The grade dropdowns of some of them are damaged in one of the ways in
+`dropdown_damages`. They are built by `psyc20255management.tests.fixtures`,
+as are those of the tests.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import json
+import random
+from collections import Counter
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.tests.fixtures import (make_dropbox,
+                                                 make_dropbox_zip,
+                                                 make_completed_marksheets)
+
+#================================ End Imports ================================
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    random.seed(int(arguments['--seed']))
+
+    dirname = arguments['<directory>']
+    os.makedirs(dirname, exist_ok=True)
+
+    if arguments['dropbox']:
+        file_count = make_dropbox(dirname,
+                                  int(arguments['--students']),
+                                  float(arguments['--resubmissions']),
+                                  1024 * int(arguments['--size']))
+        if arguments['--zip']:
+            make_dropbox_zip(dirname, arguments['--zip'])
+        print(json.dumps(dict(files = file_count,
+                              students = int(arguments['--students']))))
+
+    elif arguments['marksheets']:
+        manifest = make_completed_marksheets(dirname,
+                                             int(arguments['--count']),
+                                             float(arguments['--damaged']),
+                                             arguments['--sequences'].split(','))
+        print(json.dumps(dict(files = len(manifest),
+                              damaged = Counter(marksheet['damage']
+                                                for marksheet in manifest
+                                                if marksheet['damage']))))
@@ -0,0 +1,147 @@
+"""Time bulk population and updating of the database with a synthetic cohort.
+
+Usage:
+  database_load [--students=<n>] [--lecturers=<n>]
+
+Options:
+  --students=<n>     Number of students [default: 5000].
+  --lecturers=<n>    Number of lecturers [default: 40].
+
+For comparison, the students and reports are also loaded by adding ORM
+objects one at a time.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import time
+import random
+import datetime
+import tempfile
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management import conf, database
+from psyc20255management.models import Student, Report
+from psyc20255management.utils.records import Submission
+
+#================================ End Imports ================================
+
+
+def make_cohort(student_count, lecturer_count):
+
+    '''Return synthetic students, lecturers and, for each sequence,
+    submissions (as from `get_submitted_reports_list`).'''
+
+    random.seed(101)
+
+    students = [dict(uid = 'N0%06d' % i,
+                     firstname = 'First%d' % i,
+                     lastname = 'Last%d' % i,
+                     labgroup_id = random.choice(conf.labgroups))
+                for i in range(student_count)]
+
+    lecturers = [dict(uid = 'psy%dlect' % i,
+                      firstname = 'First%d' % i,
+                      lastname = 'Last%d' % i,
+                      email = 'lecturer%d@ntu.ac.uk' % i)
+                 for i in range(lecturer_count)]
+
+    deadline = datetime.datetime(2017, 12, 1, 16, 0)
+    submissions = {
+        sequence_name: {
+            student['uid']: Submission(filename = '%s report.docx' % student['uid'],
+                                       filepath = '%s report.docx' % student['uid'],
+                                       student_name = '%s %s' % (student['firstname'],
+                                                                 student['lastname']),
+                                       student_id = student['uid'],
+                                       extension = '.docx',
+                                       timestamp = deadline,
+                                       checksum = '%032x' % random.getrandbits(128))
+            for student in students
+        }
+        for sequence_name in conf.sequences
+    }
+
+    return students, lecturers, submissions
+
+
+def timed(label, function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    print('%-45s %8.3f s' % (label, time.perf_counter() - start))
+    return result
+
+
+def load_with_orm(engine, students, submissions):
+
+    'Load students and reports by adding ORM objects one at a time.'
+
+    session = sessionmaker(bind=engine)()
+    for student in students:
+        session.add(Student(**student))
+        session.flush()
+    for sequence_name, sequence_submissions in submissions.items():
+        for student_id, row\
+                in database.get_report_rows(sequence_submissions).items():
+            session.add(Report(student = student_id,
+                               sequence = sequence_name,
+                               **row))
+            session.flush()
+    session.commit()
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    students, lecturers, submissions\
+            = make_cohort(int(arguments['--students']),
+                          int(arguments['--lecturers']))
+
+    print('%d students, %d lecturers, %d reports'
+          % (len(students), len(lecturers),
+             sum(map(len, submissions.values()))))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+
+        engine = create_engine('sqlite:///%s' % os.path.join(tmpdir, 'orm.db'))
+        database.initialize_database(engine)
+        timed('ORM, one object at a time',
+              load_with_orm, engine, students, submissions)
+
+        engine = create_engine('sqlite:///%s' % os.path.join(tmpdir, 'bulk.db'))
+        timed('initialize', database.initialize_database, engine)
+
+        sequence_names = list(submissions)
+        timed('populate (students, lecturers, 1 sequence)',
+              database.populate_database,
+              engine,
+              students=students,
+              lecturers=lecturers,
+              sequence_name=sequence_names[0],
+              submissions=submissions[sequence_names[0]])
+
+        for sequence_name in sequence_names[1:]:
+            timed('update, insert %s reports' % sequence_name,
+                  database.update_reports,
+                  engine,
+                  sequence_name,
+                  database.get_report_rows(submissions[sequence_name]))
+
+        grade_rows = {student['uid']: dict(grade = random.choice(conf.grades),
+                                           is_graded = True)
+                      for student in students}
+        timed('update, grade every report',
+              database.update_reports, engine, sequence_names[0], grade_rows)
+        timed('update, nothing changed',
+              database.update_reports, engine, sequence_names[0], grade_rows)
@@ -0,0 +1,102 @@
+"""Time the listing of a large dropbox directory: by `os.listdir` and a
+filename parse of every entry, as it used to be, and by a `ScanIndex`, the
+first time and again once the index is up to date.
+
+Usage:
+  directory_scan [--students=<n>] [--resubmissions=<r>] [--repeats=<n>]
+
+Options:
+  --students=<n>        Number of students [default: 10000].
+  --resubmissions=<r>   Mean number of extra submissions per student [default: 2].
+  --repeats=<n>         Number of runs; the fastest counts [default: 5].
+
+The files are empty, so that only the listing is timed. Local disks list
+much faster than the network shares that the index is for, so the times
+here are the least that the index saves.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import time
+import random
+import tempfile
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.utils import filenames
+from psyc20255management.utils.scanindex import ScanIndex
+
+from .corpus import make_dropbox
+
+#================================ End Imports ================================
+
+
+def list_and_parse(dirname):
+    'List `dirname` and parse every filename in it.'
+    return [(fname, filenames.parse_submitted_report_filename(fname))
+            for fname in sorted(os.listdir(dirname))]
+
+
+def best_time(function, repeats):
+    'Return the least seconds taken by `repeats` calls of `function`.'
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    random.seed(101)
+    repeats = int(arguments['--repeats'])
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+
+        dropbox_dirname = os.path.join(tmpdir, 'dropbox')
+        os.mkdir(dropbox_dirname)
+        file_count = make_dropbox(dropbox_dirname,
+                                  int(arguments['--students']),
+                                  float(arguments['--resubmissions']),
+                                  0)
+        index_fname = os.path.join(tmpdir, 'index.pickle')
+
+        # Let the directory's modification time settle, so that the index
+        # trusts it.
+        time.sleep(2.5)
+
+        listdir_time = best_time(lambda: list_and_parse(dropbox_dirname), repeats)
+
+        def first_scan():
+            if os.path.exists(index_fname):
+                os.remove(index_fname)
+            scan_index = ScanIndex(dropbox_dirname,
+                                   filenames.parse_submitted_report_filename,
+                                   index_fname)
+            scan_index.scan()
+            scan_index.save()
+
+        def later_scan():
+            ScanIndex(dropbox_dirname,
+                      filenames.parse_submitted_report_filename,
+                      index_fname).scan()
+
+        first_scan_time = best_time(first_scan, repeats)
+        later_scan_time = best_time(later_scan, repeats)
+
+    print('%d files' % file_count)
+    print('listdir and parse:    %7.3f s' % listdir_time)
+    print('scan index, first:    %7.3f s' % first_scan_time)
+    print('scan index, later:    %7.3f s, loading the index included'
+          % later_scan_time)
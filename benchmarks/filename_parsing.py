@@ -0,0 +1,102 @@
+"""Time the parsing of submitted report filenames, with `datetime.strptime`
+as before and with `psyc20255management.utils.filenames`.
+
+Usage:
+  filename_parsing [--filenames=<n>] [--repeats=<n>]
+
+Options:
+  --filenames=<n>   Number of synthetic filenames [default: 50000].
+  --repeats=<n>     Number of runs of each parser; the fastest counts [default: 5].
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import time
+import random
+import datetime
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management import conf
+from psyc20255management.utils import filenames
+
+#================================ End Imports ================================
+
+strptime_format = "%d %B, %Y %I%M %p"
+
+
+def make_filenames(count):
+
+    '''Return `count` synthetic submitted report filenames, with timestamps
+    spread over the month before a deadline.'''
+
+    random.seed(101)
+    deadline = datetime.datetime(2017, 12, 1, 16, 0)
+    fnames = []
+    for i in range(count):
+        timestamp\
+                = deadline - datetime.timedelta(minutes=random.randrange(43200))
+        fnames.append('%05d-%05d - N0%06d - Student %d Name- %s - report.docx'
+                      % (12345, 10000 + i, i, i,
+                         timestamp.strftime(strptime_format)))
+    return fnames
+
+
+def parse_with_strptime(fname):
+    'The previous parsing of a filename: the pattern, then strptime.'
+    match = conf.submitted_report_filename_pattern.match(fname)
+    dropbox_id, student_id, student_name, date_string, document_name\
+            = match.groups()
+    return dict(student_id = student_id,
+                student_name = student_name,
+                timestamp = datetime.datetime.strptime(date_string,
+                                                       strptime_format))
+
+
+def best_time(function, items, repeats):
+    'Return the fastest time, in seconds, of mapping `function` over `items`.'
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    fnames = make_filenames(int(arguments['--filenames']))
+    repeats = int(arguments['--repeats'])
+    date_strings = [conf.submitted_report_filename_pattern.match(fname).group(4)
+                    for fname in fnames]
+
+    for date_string in date_strings:
+        assert filenames.parse_timestamp(date_string)\
+                == datetime.datetime.strptime(date_string, strptime_format)
+
+    timings = [
+        ('timestamp, strptime',
+         best_time(lambda date_string:
+                       datetime.datetime.strptime(date_string, strptime_format),
+                   date_strings, repeats)),
+        ('timestamp, parse_timestamp',
+         best_time(filenames.parse_timestamp, date_strings, repeats)),
+        ('filename, pattern and strptime',
+         best_time(parse_with_strptime, fnames, repeats)),
+        ('filename, parse_submitted_report_filename',
+         best_time(filenames.parse_submitted_report_filename, fnames, repeats)),
+    ]
+
+    print('%d filenames; microseconds per filename' % len(fnames))
+    for name, seconds in timings:
+        print('%-45s %8.2f' % (name, 1e6 * seconds / len(fnames)))
@@ -0,0 +1,81 @@
+"""Time the grade statistics of `psyc20255management.analytics` on several
+years' worth of synthetic grades.
+
+Usage:
+  grade_analytics [--grades=<n>] [--markers=<n>] [--repeats=<n>]
+
+Options:
+  --grades=<n>      Number of grades [default: 100000].
+  --markers=<n>     Number of markers [default: 40].
+  --repeats=<n>     Number of runs; the fastest counts [default: 5].
+
+One marker in every ten grades a step or two higher than the rest, and should
+be flagged.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import time
+import random
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management import conf, analytics
+
+#================================ End Imports ================================
+
+
+def make_grade_rows(count, marker_count):
+
+    '''Return `count` synthetic (marker, labgroup, grade) rows, with grades
+    roughly normal around the middle of the scale.'''
+
+    random.seed(101)
+    middle = len(conf.grades) // 2
+    rows = []
+    for _ in range(count):
+        marker_index = random.randrange(marker_count)
+        shift = 2 if marker_index % 10 == 0 else 0
+        code = round(random.gauss(middle - shift, 2.5))
+        rows.append(('marker%02d' % marker_index,
+                     random.choice(conf.labgroups),
+                     conf.grades[min(max(code, 0), len(conf.grades) - 1)]))
+    return rows
+
+
+def run(rows):
+    'Return the marker and lab group statistics of `rows`.'
+    grade_columns = analytics.GradeColumns(rows)
+    return (grade_columns.get_marker_statistics(),
+            grade_columns.get_labgroup_statistics())
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    rows = make_grade_rows(int(arguments['--grades']), int(arguments['--markers']))
+
+    times = []
+    for _ in range(int(arguments['--repeats'])):
+        start = time.perf_counter()
+        marker_statistics, labgroup_statistics = run(rows)
+        times.append(time.perf_counter() - start)
+
+    print('%d grades, %d markers, %d lab groups, with %s: %.3f s'
+          % (len(rows),
+             len(marker_statistics),
+             len(labgroup_statistics),
+             'numpy' if analytics.numpy is not None else 'array and Counter',
+             min(times)))
+    print('Flagged markers: %s'
+          % ', '.join('%s (%s)' % (statistics.name, statistics.flag)
+                      for statistics in sorted(marker_statistics)
+                      if statistics.flag))
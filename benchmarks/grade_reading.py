@@ -0,0 +1,123 @@
+"""Time the reading of marksheets' grade dropdowns, by the incremental
+parsing of `docxreader.read_marksheet_header`, against the BeautifulSoup
+path that it replaced, on a synthetic corpus with damaged dropdowns.
+
+Usage:
+  grade_reading [--count=<n>] [--damaged=<p>] [--repeats=<n>] [--seed=<n>]
+
+Options:
+  --count=<n>       Number of marksheets [default: 500].
+  --damaged=<p>     Proportion of marksheets with damaged grade dropdowns
+                    [default: 0.3].
+  --repeats=<n>     Number of runs; the fastest counts [default: 3].
+  --seed=<n>        Random seed [default: 101].
+
+The marksheets are made by `benchmarks.corpus`, with each of the
+`dropdown_damages`. Both readers must give the same text for every
+marksheet, and the grade of every marksheet whose dropdown is undamaged, or
+damaged in a way that can still be read, must be the grade it was given.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import time
+import random
+import zipfile
+import tempfile
+from collections import Counter
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+from bs4 import BeautifulSoup
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.utils import docxreader, marksheets
+
+from .corpus import make_completed_marksheets
+
+#================================ End Imports ================================
+
+
+def read_dropdown_text_bs4(marksheet):
+
+    '''The previous reading of the grade dropdown: the whole xml as a
+    BeautifulSoup tree, or None if it has no dropdown.'''
+
+    document = zipfile.ZipFile(marksheet)
+    xml_data = document.read('word/document.xml')
+    document.close()
+    soup = BeautifulSoup(xml_data, 'xml')
+    try:
+        return soup.find('sdt').find('sdtContent').text
+    except AttributeError:
+        return None
+
+
+def read_dropdown_text(marksheet):
+    'Read the grade dropdown as `get_grade_from_marksheet` does.'
+    return docxreader.read_marksheet_header(marksheet, paragraph_count=0)[1]
+
+
+def best_time(read, filepaths, repeats):
+    'Return the least seconds taken to `read` all of `filepaths`.'
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for filepath in filepaths:
+            read(filepath)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def get_grade(filepath):
+    'Return the grade of a marksheet, or None if it can not be read.'
+    try:
+        return marksheets.get_grade_from_marksheet(filepath)
+    except AssertionError:
+        return None
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    random.seed(int(arguments['--seed']))
+
+    with tempfile.TemporaryDirectory() as dirname:
+
+        manifest = make_completed_marksheets(dirname,
+                                             int(arguments['--count']),
+                                             float(arguments['--damaged']))
+        filepaths = [os.path.join(dirname, marksheet['filename'])
+                     for marksheet in manifest]
+
+        for marksheet, filepath in zip(manifest, filepaths):
+            assert read_dropdown_text(filepath)\
+                    == read_dropdown_text_bs4(filepath),\
+                    'Readers disagree on %s' % marksheet['filename']
+            # A removed dropdown's grade is read from the paragraph instead.
+            if marksheet['is_valid'] and marksheet['damage'] != 'removed':
+                assert get_grade(filepath) == marksheet['grade'],\
+                        'Wrong grade for %s' % marksheet['filename']
+            elif not marksheet['is_valid']:
+                assert get_grade(filepath) is None,\
+                        'Grade read from %s' % marksheet['filename']
+
+        repeats = int(arguments['--repeats'])
+        bs4_time = best_time(read_dropdown_text_bs4, filepaths, repeats)
+        parse_time = best_time(read_dropdown_text, filepaths, repeats)
+
+    print('%d marksheets, damaged: %s'
+          % (len(manifest),
+             dict(Counter(marksheet['damage'] for marksheet in manifest
+                          if marksheet['damage']))))
+    print('BeautifulSoup:  %7.3f s, %7.3f ms per marksheet'
+          % (bs4_time, 1000 * bs4_time / len(filepaths)))
+    print('pull parsing:   %7.3f s, %7.3f ms per marksheet, %.1f times faster'
+          % (parse_time, 1000 * parse_time / len(filepaths), bs4_time / parse_time))
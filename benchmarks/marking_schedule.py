@@ -0,0 +1,78 @@
+"""Time `assignments.schedule_marking` on a synthetic cohort, and show how
+evenly it balances the markers' loads.
+
+Usage:
+  marking_schedule [--reports=<n>] [--markers=<n>] [--markers-per-labgroup=<n>] [--repeats=<n>]
+
+Options:
+  --reports=<n>                 Number of reports [default: 5000].
+  --markers=<n>                 Number of markers [default: 40].
+  --markers-per-labgroup=<n>    Number of markers of each lab group [default: 3].
+  --repeats=<n>                 Number of runs; the fastest counts [default: 5].
+
+The reports are spread over the lab groups of `conf.labgroups`, with sizes
+drawn from a long tailed distribution, as reports with figures are much
+larger than those without. Each lab group is marked by a few of the
+markers, and the lab groups share markers, as they do in practice.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import time
+import random
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management import conf
+from psyc20255management.utils import assignments
+
+#================================ End Imports ================================
+
+
+def make_reports(count, marker_count, markers_per_labgroup):
+
+    '''Return `count` synthetic reports, as (student ID, bytes, eligible
+    markers), and the list of markers.'''
+
+    random.seed(101)
+    markers = ['marker%02d' % i for i in range(marker_count)]
+    labgroup_markers = {labgroup: random.sample(markers, markers_per_labgroup)
+                        for labgroup in conf.labgroups}
+
+    reports = [('N0%06d' % i,
+                int(random.lognormvariate(12, 1)),
+                labgroup_markers[random.choice(conf.labgroups)])
+               for i in range(count)]
+
+    return reports, markers
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    reports, markers = make_reports(int(arguments['--reports']),
+                                    int(arguments['--markers']),
+                                    int(arguments['--markers-per-labgroup']))
+
+    times = []
+    for _ in range(int(arguments['--repeats'])):
+        start = time.perf_counter()
+        schedule = assignments.schedule_marking(reports, markers)
+        times.append(time.perf_counter() - start)
+
+    loads = [load for load in schedule.loads.values() if load]
+    mean_load = sum(loads) / len(loads)
+
+    print('%d reports, %d markers: %.3f s, %.2f us per report'
+          % (len(reports), len(markers), min(times),
+             1e6 * min(times) / len(reports)))
+    print('Marker loads: mean %.1f MB, least %.2f, most %.2f of the mean'
+          % (mean_load / 2 ** 20, min(loads) / mean_load, max(loads) / mean_load))
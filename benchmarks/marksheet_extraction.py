@@ -0,0 +1,91 @@
+"""Per-file latency of extracting the vital details of completed marksheets.
+
+Compares the python-docx path, i.e. `MarksheetModel(...)` followed by
+`extract_vital_details()`, with the streaming path used by
+`MarksheetModel.get_marksheet_vital_details`.
+
+Usage:
+  marksheet_extraction [<marksheet_directory>] [--repeats=<n>]
+
+Options:
+  --repeats=<n>     Number of times to read each marksheet [default: 20].
+
+With no directory, the marksheet template is used.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import time
+import statistics
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management import conf
+from psyc20255management.utils.marksheets import (MarksheetModel,
+                                                  list_completed_marksheets)
+
+#================================ End Imports ================================
+
+
+def current_path(marksheet_filename, sequence_name):
+    return MarksheetModel(marksheet_filename,
+                          sequence_name).extract_vital_details()
+
+
+def streaming_path(marksheet_filename, sequence_name):
+    return MarksheetModel.get_marksheet_vital_details(marksheet_filename,
+                                                      sequence_name)
+
+
+def time_per_file(extract, marksheet_filenames, sequence_name, repeats):
+
+    '''Return a list of the per-file latencies, in milliseconds.'''
+
+    latencies = []
+    for _ in range(repeats):
+        for marksheet_filename in marksheet_filenames:
+            start = time.perf_counter()
+            extract(marksheet_filename, sequence_name)
+            latencies.append(1000 * (time.perf_counter() - start))
+
+    return latencies
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    if arguments['<marksheet_directory>']:
+        marksheet_filenames\
+            = [completed_marksheet.filepath for completed_marksheet
+               in list_completed_marksheets(arguments['<marksheet_directory>'])]
+    else:
+        marksheet_filenames = [conf.marksheet_template_fname]
+
+    repeats = int(arguments['--repeats'])
+    sequence_name = 'Experimental'
+
+    for marksheet_filename in marksheet_filenames:
+        assert current_path(marksheet_filename, sequence_name)\
+            == streaming_path(marksheet_filename, sequence_name),\
+            'Extraction paths disagree on %s' % marksheet_filename
+
+    print('%d files, %d repeats' % (len(marksheet_filenames), repeats))
+    for name, extract in [('python-docx', current_path),
+                          ('streaming', streaming_path)]:
+        latencies = time_per_file(extract,
+                                  marksheet_filenames,
+                                  sequence_name,
+                                  repeats)
+        print('%-20s median %7.3f ms   mean %7.3f ms   max %7.3f ms'
+              % (name,
+                 statistics.median(latencies),
+                 statistics.mean(latencies),
+                 max(latencies)))
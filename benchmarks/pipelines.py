@@ -0,0 +1,203 @@
+"""Time each pipeline on synthetic corpora of several sizes, and write the
+results as JSON, so that runs on different commits can be compared.
+
+Usage:
+  pipelines [--sizes=<sizes>] [--pipelines=<names>] [--resubmissions=<r>] [--size=<kb>] [--damaged=<p>] [--processes=<n>] [--threads=<n>] [--output=<json_file>] [--seed=<n>]
+
+Options:
+  --sizes=<sizes>       Comma separated numbers of files [default: 500,5000,50000].
+  --pipelines=<names>   Comma separated pipelines to time, from
+                        submissions, submissions_zip, marksheet_generation
+                        and completions [default: all].
+  --resubmissions=<r>   Mean number of extra submissions per student [default: 2].
+  --size=<kb>           Size of each submitted file in kilobytes [default: 16].
+  --damaged=<p>         Proportion of marksheets with damaged grade dropdowns
+                        [default: 0.05].
+  --processes=<n>       Worker processes for the completions [default: 1].
+  --threads=<n>         Threads for checksumming and generation [default: 4].
+  --output=<json_file>  Write the results here, as well as to stdout.
+  --seed=<n>            Random seed [default: 101].
+
+The pipelines are
+* submissions, `reports.get_submitted_reports_list` on a dropbox directory
+* submissions_zip, `reports.get_submitted_reports_list_from_zip`
+* marksheet_generation, `marksheets.make_new_marksheets`
+* completions, `marksheets.process_completed_marksheets`, without a cache
+
+The corpora are made by `benchmarks.corpus`, and only the pipelines are
+timed. A dropbox of n files has about n / (1 + resubmissions) students.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import sys
+import json
+import time
+import random
+import platform
+import tempfile
+import datetime
+import contextlib
+import subprocess
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management import conf
+from psyc20255management.utils import reports, marksheets
+
+from .corpus import make_dropbox, make_dropbox_zip, make_completed_marksheets
+
+#================================ End Imports ================================
+
+pipeline_names = ['submissions',
+                  'submissions_zip',
+                  'marksheet_generation',
+                  'completions']
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_commit():
+    'Return the commit of the repository, or None if it can not be found.'
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                       cwd=this_dir,
+                                       stderr=subprocess.DEVNULL,
+                                       universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timed(function, *args, **kwargs):
+
+    '''Return the seconds taken by `function(*args, **kwargs)`, with anything
+    it prints to stdout thrown away.'''
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        function(*args, **kwargs)
+        return time.perf_counter() - start
+
+
+def time_submissions(tmpdir, file_count, arguments, pipelines):
+
+    '''Time the submissions pipelines that are in `pipelines` on a dropbox of
+    about `file_count` files. Return a list of results.'''
+
+    dropbox_dirname = os.path.join(tmpdir, 'dropbox')
+    os.mkdir(dropbox_dirname)
+
+    resubmissions = float(arguments['--resubmissions'])
+    file_count = make_dropbox(dropbox_dirname,
+                              max(1, round(file_count / (1 + resubmissions))),
+                              resubmissions,
+                              1024 * int(arguments['--size']))
+
+    results = []
+
+    if 'submissions' in pipelines:
+        results.append(('submissions', file_count,
+                        timed(reports.get_submitted_reports_list,
+                              dropbox_dirname,
+                              threads=int(arguments['--threads']))))
+
+    if 'submissions_zip' in pipelines:
+        zip_fname = os.path.join(tmpdir, 'dropbox.zip')
+        make_dropbox_zip(dropbox_dirname, zip_fname)
+        results.append(('submissions_zip', file_count,
+                        timed(reports.get_submitted_reports_list_from_zip,
+                              zip_fname)))
+
+    return results
+
+
+def time_marksheets(tmpdir, file_count, arguments, pipelines):
+
+    '''Time the marksheet pipelines that are in `pipelines` on `file_count`
+    marksheets. Return a list of results.'''
+
+    results = []
+
+    if 'marksheet_generation' in pipelines:
+        new_marksheets_dirname = os.path.join(tmpdir, 'new_marksheets')
+        os.mkdir(new_marksheets_dirname)
+        rows = [('Student %d Name' % i,
+                 'N0%06d' % i,
+                 'Marker Name',
+                 'marker@ntu.ac.uk',
+                 os.path.join(new_marksheets_dirname,
+                              conf.marksheet_fname_template
+                              % ('Student %d Name' % i, 'N0%06d' % i)))
+                for i in range(file_count)]
+        results.append(('marksheet_generation', file_count,
+                        timed(marksheets.make_new_marksheets,
+                              rows,
+                              threads=int(arguments['--threads']))))
+
+    if 'completions' in pipelines:
+        completions_dirname = os.path.join(tmpdir, 'completions')
+        os.mkdir(completions_dirname)
+        make_completed_marksheets(completions_dirname,
+                                  file_count,
+                                  float(arguments['--damaged']))
+        results.append(('completions', file_count,
+                        timed(marksheets.process_completed_marksheets,
+                              completions_dirname,
+                              processes=int(arguments['--processes']),
+                              failures=[])))
+
+    return results
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    sizes = [int(size) for size in arguments['--sizes'].split(',')]
+    if arguments['--pipelines'] == 'all':
+        pipelines = pipeline_names
+    else:
+        pipelines = arguments['--pipelines'].split(',')
+        assert set(pipelines) <= set(pipeline_names),\
+                'Unknown pipelines %s.' % ', '.join(set(pipelines) - set(pipeline_names))
+
+    random.seed(int(arguments['--seed']))
+
+    results = []
+    for size in sizes:
+        for time_pipelines in (time_submissions, time_marksheets):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                for pipeline, file_count, seconds\
+                        in time_pipelines(tmpdir, size, arguments, pipelines):
+                    results.append(dict(pipeline = pipeline,
+                                        size = size,
+                                        files = file_count,
+                                        seconds = round(seconds, 4),
+                                        files_per_second = round(file_count / seconds, 1)))
+                    print('%-22s %7d files %9.3f s %10.1f files/s'
+                          % (pipeline, file_count, seconds, file_count / seconds),
+                          file=sys.stderr)
+
+    output = dict(commit = get_commit(),
+                  date = datetime.datetime.now().isoformat(timespec='seconds'),
+                  python = platform.python_version(),
+                  platform = platform.platform(),
+                  cpus = os.cpu_count(),
+                  parameters = {option.lstrip('-'): value
+                                for option, value in arguments.items()
+                                if option != '--output'},
+                  results = results)
+
+    if arguments['--output']:
+        with open(arguments['--output'], 'w') as output_file:
+            json.dump(output, output_file, indent=2)
+
+    print(json.dumps(output, indent=2))
@@ -0,0 +1,184 @@
+"""Time the queries in `psyc20255management.queries` on a large synthetic
+cohort, without and with the indexes declared in the models, and show how
+SQLite plans each of them.
+
+Each query is run once through the ORM, to get its SQL and parameters, and
+then the SQL itself is timed, on the raw DBAPI connection, so that building
+ORM objects from the rows does not hide the time taken by the query.
+
+Usage:
+  query_paths [--students=<n>] [--lecturers=<n>] [--repeats=<n>]
+
+Options:
+  --students=<n>     Number of students [default: 50000].
+  --lecturers=<n>    Number of lecturers [default: 40].
+  --repeats=<n>      Number of times to run each query [default: 20].
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import time
+import random
+import tempfile
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management import conf, database, queries
+from psyc20255management.models import Base, Report
+
+from .database_load import make_cohort
+
+#================================ End Imports ================================
+
+
+def seed(engine, students, lecturers, submissions):
+
+    '''Load the cohort, with each report given a random marker, and about
+    half of them graded.'''
+
+    database.initialize_database(engine)
+    database.populate_database(engine, students=students, lecturers=lecturers)
+
+    marker_uids = [lecturer['uid'] for lecturer in lecturers]
+    report_rows = []
+    for sequence_name, sequence_submissions in submissions.items():
+        for student_id, row\
+                in database.get_report_rows(sequence_submissions).items():
+            is_graded = random.random() < 0.5
+            report_rows.append(dict(row,
+                                    student = student_id,
+                                    sequence = sequence_name,
+                                    marker = random.choice(marker_uids),
+                                    is_graded = is_graded,
+                                    grade = random.choice(conf.grades)
+                                            if is_graded else None))
+
+    with engine.begin() as connection:
+        database.insert_rows(connection, Report.__table__, report_rows)
+
+
+def get_query_functions(session, lecturers):
+
+    '''Return the (name, function) of each query, with its arguments
+    chosen at random.'''
+
+    marker_uid = random.choice(lecturers)['uid']
+    sequence_name = random.choice(conf.sequences)
+    labgroup_uid = random.choice(conf.labgroups)
+
+    return [
+        ('reports for marker',
+         lambda: queries.get_reports_for_marker(session, marker_uid)),
+        ('ungraded reports of sequence',
+         lambda: queries.get_ungraded_reports(session, sequence_name)),
+        ('ungraded report counts',
+         lambda: queries.get_ungraded_report_counts(session)),
+        ('students in lab group',
+         lambda: queries.get_students_in_labgroup(session, labgroup_uid)),
+    ]
+
+
+def get_statement(engine, query_function):
+
+    '''Return the SQL and parameters of the one statement run by
+    `query_function`.'''
+
+    statements = []
+
+    def before_cursor_execute(connection, cursor, statement, parameters,
+                              context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        query_function()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert len(statements) == 1, 'Expected one statement, not %d.' % len(statements)
+
+    return statements[0]
+
+
+def time_statements(engine, statements, repeats):
+
+    '''Return the median time, in milliseconds, of running each of the
+    (name, sql, parameters) `statements` and fetching its rows, and how
+    SQLite plans it, as a list of lines.'''
+
+    connection = engine.raw_connection()
+    cursor = connection.cursor()
+
+    results = []
+    for name, sql, parameters in statements:
+
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            cursor.execute(sql, parameters)
+            cursor.fetchall()
+            latencies.append(1000 * (time.perf_counter() - start))
+
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, parameters)
+        plan = [row[-1] for row in cursor.fetchall()]
+
+        results.append((name, sorted(latencies)[len(latencies) // 2], plan))
+
+    cursor.close()
+    connection.close()
+
+    return results
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    students, lecturers, submissions\
+            = make_cohort(int(arguments['--students']),
+                          int(arguments['--lecturers']))
+    repeats = int(arguments['--repeats'])
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+
+        engine = create_engine('sqlite:///%s' % os.path.join(tmpdir, 'cohort.db'))
+        seed(engine, students, lecturers, submissions)
+        session = sessionmaker(bind=engine)()
+
+        statements = [(name,) + get_statement(engine, query_function)
+                      for name, query_function
+                      in get_query_functions(session, lecturers)]
+        session.close()
+
+        indexed = time_statements(engine, statements, repeats)
+
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(engine)
+
+        unindexed = time_statements(engine, statements, repeats)
+
+    print('%d students, %d reports; median latency of the SQL in ms'
+          % (len(students), sum(map(len, submissions.values()))))
+    print('%-30s %10s %10s' % ('', 'no indexes', 'indexes'))
+    for (name, before, _), (_, after, _) in zip(unindexed, indexed):
+        print('%-30s %10.2f %10.2f' % (name, before, after))
+
+    for (name, _, before_plan), (_, _, after_plan) in zip(unindexed, indexed):
+        print()
+        print('%s, no indexes:' % name)
+        for line in before_plan:
+            print('    %s' % line)
+        print('%s, indexes:' % name)
+        for line in after_plan:
+            print('    %s' % line)
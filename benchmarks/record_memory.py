@@ -0,0 +1,128 @@
+"""Measure the memory taken by each record of a submission, a completed
+marksheet and a completed marksheet row, as the dictionaries and lists that
+they were, and as the namedtuples of `psyc20255management.utils.records`.
+
+Usage:
+  record_memory [--records=<n>]
+
+Options:
+  --records=<n>     Number of records of each kind [default: 100000].
+
+Only the records themselves are measured. Their values, e.g. the filenames,
+are made beforehand, as they take the same memory either way.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import datetime
+import tracemalloc
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.utils.records import (Submission,
+                                               CompletedMarksheet,
+                                               CompletedMarksheetRow)
+
+#================================ End Imports ================================
+
+
+def make_values(count):
+
+    '''Return `count` distinct tuples of the values of a submission, i.e.
+    filename, filepath, student_name, student_id, extension, timestamp and
+    checksum.'''
+
+    deadline = datetime.datetime(2017, 12, 1, 16, 0)
+    values = []
+    for i in range(count):
+        student_name = 'Student %d Name' % i
+        student_id = 'N0%06d' % i
+        filename = '12345-%05d - %s - %s - report.docx' % (i, student_id, student_name)
+        values.append((filename,
+                       '/dropbox/' + filename,
+                       student_name,
+                       student_id,
+                       '.docx',
+                       deadline - datetime.timedelta(minutes=i),
+                       '%032x' % i))
+    return values
+
+
+def measure(make_record, values):
+
+    '''Return the bytes allocated per record by making a record from each of
+    the `values` with `make_record`.'''
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    records = [make_record(*record_values) for record_values in values]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Not counting the list that holds them.
+    list_size = records.__sizeof__()
+    return (after - before - list_size) / len(records)
+
+
+def submission_dict(filename, filepath, student_name, student_id, extension,
+                    timestamp, checksum):
+    return dict(filename = filename,
+                filepath = filepath,
+                student_name = student_name,
+                student_id = student_id,
+                extension = extension,
+                timestamp = timestamp,
+                checksum = checksum)
+
+
+def completed_marksheet_dict(filename, filepath, student_name, student_id,
+                             *_):
+    return dict(student_name = student_name,
+                student_id = student_id,
+                filename = filename,
+                filepath = filepath)
+
+
+def completed_marksheet_record(filename, filepath, student_name, student_id,
+                               *_):
+    return CompletedMarksheet(student_name, student_id, filename, filepath)
+
+
+def completed_marksheet_list(filename, filepath, student_name, student_id,
+                             extension, _, checksum):
+    return [student_name, student_id, checksum, extension, 'A+', filepath]
+
+
+def completed_marksheet_row(filename, filepath, student_name, student_id,
+                            extension, _, checksum):
+    return CompletedMarksheetRow(student_name, student_id, checksum,
+                                 extension, 'A+', filepath)
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    values = make_values(int(arguments['--records']))
+
+    comparisons = [
+        ('submission', submission_dict, Submission),
+        ('completed marksheet',
+         completed_marksheet_dict, completed_marksheet_record),
+        ('completed marksheet row',
+         completed_marksheet_list, completed_marksheet_row),
+    ]
+
+    print('%d records of each kind; bytes per record' % len(values))
+    print('%-25s %12s %12s' % ('', 'dict/list', 'namedtuple'))
+    for name, make_before, make_after in comparisons:
+        print('%-25s %12.1f %12.1f' % (name,
+                                       measure(make_before, values),
+                                       measure(make_after, values)))
@@ -0,0 +1,117 @@
+"""Measure the import time of `scripts/psyc20255management_admin.py` with
+`python -X importtime`, for CI to track.
+
+Usage:
+  startup_time [--budget=<ms>] [--repeats=<n>] [--top=<n>] [--json]
+
+Options:
+  --budget=<ms>     Import time budget of the lightweight commands [default: 100].
+  --repeats=<n>     Number of runs of each command; the fastest counts [default: 5].
+  --top=<n>         Number of the slowest imports to list [default: 5].
+  --json            Print the results as JSON.
+
+The lightweight commands, i.e. --version and --help, must stay within the
+budget, otherwise the exit status is 1. The other commands are reported, but
+have no budget.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import sys
+import json
+import tempfile
+import subprocess
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+
+#================================ End Imports ================================
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+repository_dir = os.path.dirname(this_dir)
+script_fname = os.path.join(repository_dir,
+                            'scripts',
+                            'psyc20255management_admin.py')
+
+# (command line arguments, is lightweight)
+commands = [(['--version'], True),
+            (['--help'], True),
+            (['database', 'create'], False)]
+
+
+def get_import_times(arguments, cwd):
+
+    '''Run the script with `arguments` under `python -X importtime` and
+    return a list of the (self time, cumulative time, module) of each import,
+    with times in microseconds.'''
+
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(
+        [repository_dir] + [path for path in [environment.get('PYTHONPATH')]
+                            if path])
+
+    completed = subprocess.run([sys.executable, '-X', 'importtime',
+                                script_fname] + arguments,
+                               cwd=cwd,
+                               env=environment,
+                               stdout=subprocess.DEVNULL,
+                               stderr=subprocess.PIPE,
+                               universal_newlines=True)
+
+    import_times = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative_time, module\
+                = line[len('import time:'):].split('|')
+        import_times.append((int(self_time), int(cumulative_time), module.strip()))
+
+    return import_times
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    budget = float(arguments['--budget'])
+    repeats = int(arguments['--repeats'])
+    top = int(arguments['--top'])
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for command_arguments, is_lightweight in commands:
+            runs = [get_import_times(command_arguments, tmpdir)
+                    for _ in range(repeats)]
+            import_times = min(runs, key=lambda run: sum(t[0] for t in run))
+            total = sum(self_time for self_time, _, _ in import_times) / 1000
+            results.append(dict(
+                command = ' '.join(command_arguments),
+                import_time_ms = round(total, 2),
+                module_count = len(import_times),
+                budget_ms = budget if is_lightweight else None,
+                within_budget = total <= budget if is_lightweight else None,
+                slowest = [dict(module = module, cumulative_ms = cumulative / 1000)
+                           for _, cumulative, module
+                           in sorted(import_times, key=lambda t: -t[1])[:top]]
+            ))
+
+    if arguments['--json']:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print('%-20s %8.1f ms  %4d modules  %s'
+                  % (result['command'],
+                     result['import_time_ms'],
+                     result['module_count'],
+                     {True: 'within budget',
+                      False: 'OVER BUDGET',
+                      None: ''}[result['within_budget']]))
+            for slow in result['slowest']:
+                print('    %-40s %8.1f ms' % (slow['module'], slow['cumulative_ms']))
+
+    if any(result['within_budget'] is False for result in results):
+        sys.exit(1)
@@ -0,0 +1,99 @@
+"""Time `get_submitted_reports_list` over a synthetic dropbox, against the
+previous approach of checksumming every submission, including superseded
+ones.
+
+Usage:
+  submission_listing [--students=<n>] [--resubmissions=<r>] [--size=<kb>] [--threads=<n>]
+
+Options:
+  --students=<n>        Number of students [default: 1000].
+  --resubmissions=<r>   Mean number of extra submissions per student [default: 2].
+  --size=<kb>           Size of each submitted file in kilobytes [default: 256].
+  --threads=<n>         Number of checksumming threads [default: 1].
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import time
+import random
+import datetime
+import tempfile
+from collections import defaultdict
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from docopt import docopt
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management import conf
+from psyc20255management.utils.checksums import checksum_file
+from psyc20255management.utils.reports import get_submitted_reports_list
+
+from .corpus import make_dropbox
+
+#================================ End Imports ================================
+
+
+def checksum_everything(reports_directory):
+
+    '''The previous `get_submitted_reports_list`: checksum each submission,
+    then sort each student's submissions to find the most recent.'''
+
+    submissions = defaultdict(list)
+    for fname in os.listdir(reports_directory):
+        match = conf.submitted_report_filename_pattern.match(fname)
+        if match:
+            _, student_id, student_name, date_string, doc_name = match.groups()
+            filepath = os.path.join(reports_directory, fname)
+            submissions[student_id].append(
+                dict(filename = fname,
+                     filepath = filepath,
+                     checksum = checksum_file(filepath),
+                     timestamp = datetime.datetime.strptime(
+                         date_string, "%d %B, %Y %I%M %p"))
+            )
+
+    return {key:sorted(submissions[key],
+                       key = lambda submission: submission['timestamp']).pop()
+            for key in submissions}
+
+
+if __name__ == '__main__':
+
+    arguments = docopt(__doc__)
+
+    size = 1024 * int(arguments['--size'])
+
+    random.seed(101)
+
+    with tempfile.TemporaryDirectory() as dropbox_dirname:
+
+        file_count = make_dropbox(dropbox_dirname,
+                                  int(arguments['--students']),
+                                  float(arguments['--resubmissions']),
+                                  size)
+
+        start = time.perf_counter()
+        previous = checksum_everything(dropbox_dirname)
+        previous_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        current = get_submitted_reports_list(dropbox_dirname,
+                                             threads=int(arguments['--threads']))
+        current_time = time.perf_counter() - start
+
+    assert {student_id: submission['checksum']
+            for student_id, submission in previous.items()}\
+        == {student_id: submission.checksum
+            for student_id, submission in current.items()}
+
+    print('%d files from %d students' % (file_count, len(current)))
+    print('checksum everything:  %5d files, %8.1f MB hashed, %7.3f s'
+          % (file_count, file_count * size / 1e6, previous_time))
+    print('winners only:         %5d files, %8.1f MB hashed, %7.3f s'
+          % (len(current), len(current) * size / 1e6, current_time))
@@ -0,0 +1,269 @@
+'''
+Grade distributions, and marker statistics, for moderation.
+
+Grades are mapped once to their ordinal codes, i.e. their position in the
+ordered `conf.grades` scale, so that 0 is the highest grade. Markers and lab
+groups are likewise mapped to codes. Each is kept as an array-backed column
+(see `GradeColumns`).
+
+The grades of each marker, or each lab group, are counted in one go over
+the whole column, by NumPy's bincount if NumPy is installed, and by a
+Counter over the columns otherwise. Everything after that, i.e. the
+medians and the moderation flags, is worked out from the small table of
+counts, whatever the number of grades.
+
+A group's grades diverge from the cohort when the Kolmogorov-Smirnov
+distance between its distribution of grades and that of the rest of the
+cohort is significant (at the 5% level), and is at least
+`moderation_min_distance`, and the group has at least `moderation_min_count`
+grades. The least distance keeps trivial differences from being flagged
+when there are many years of grades.
+
+'''
+
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import math
+import operator
+from array import array
+from itertools import repeat
+from collections import Counter, namedtuple
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from . import conf
+
+#================================ End Imports ================================
+
+grade_codes = {grade: code for code, grade in enumerate(conf.grades)}
+
+# The coefficient of the two sample Kolmogorov-Smirnov critical value, at the
+# 5% level, and the least distance and number of grades for a group to be
+# flagged.
+moderation_coefficient = 1.358
+moderation_min_distance = 0.1
+moderation_min_count = 5
+
+# The flags of a group whose grades are higher, or lower, than the rest of
+# the cohort's.
+HIGH = 'high'
+LOW = 'low'
+
+# The statistics of the grades of a marker, or a lab group. The median is a
+# grade, the distance is the Kolmogorov-Smirnov distance from the rest of the
+# cohort, the flag is HIGH, LOW or None, and the counts are the number of
+# each grade, in the order of `conf.grades`.
+GroupStatistics = namedtuple('GroupStatistics',
+                             ['name',
+                              'count',
+                              'median',
+                              'distance',
+                              'flag',
+                              'counts'])
+
+
+def encode(values, typecode='H'):
+
+    '''Return the codes of `values` as an array, and the list of the distinct
+    values, in order of first appearance, so that value `i` has code `i`.'''
+
+    codes = {}
+    encoded = array(typecode,
+                    [codes.setdefault(value, len(codes)) for value in values])
+
+    return encoded, list(codes)
+
+
+class GradeColumns(object):
+
+    '''The grades given to reports, with their markers and lab groups, in
+    array-backed columns of codes.
+
+    * grades, the ordinal code of each grade (see `grade_codes`)
+    * markers, the code of each marker, i.e. their index in `marker_names`
+    * labgroups, the code of each lab group, i.e. their index in
+    `labgroup_names`
+
+    '''
+
+    def __init__(self, rows):
+
+        '''Make the columns from `rows` of (marker, labgroup, grade), e.g. from
+        `get_report_grade_rows` or `get_completed_marksheet_grade_rows`. An
+        unknown grade raises a KeyError.'''
+
+        markers, labgroups, grades = zip(*rows) if rows else ((), (), ())
+
+        self.grades = array('B', map(grade_codes.__getitem__, grades))
+        self.markers, self.marker_names = encode(markers)
+        self.labgroups, self.labgroup_names = encode(labgroups)
+
+    def __len__(self):
+        return len(self.grades)
+
+    def get_marker_statistics(self):
+        'Return the `GroupStatistics` of each marker.'
+        return get_group_statistics(self.markers, self.marker_names, self.grades)
+
+    def get_labgroup_statistics(self):
+        'Return the `GroupStatistics` of each lab group.'
+        return get_group_statistics(self.labgroups, self.labgroup_names, self.grades)
+
+
+def count_grades(group_codes, group_count, grades):
+
+    '''Return a table, as a list of lists, of the number of each grade, by
+    code, given by each of the `group_count` groups, by code, where
+    `group_codes` and `grades` are the columns of codes.'''
+
+    grade_count = len(conf.grades)
+
+    if numpy is not None:
+        combined_codes\
+                = numpy.frombuffer(group_codes, dtype=numpy.uint16).astype(numpy.intp)\
+                * grade_count\
+                + numpy.frombuffer(grades, dtype=numpy.uint8)
+        return numpy.bincount(combined_codes,
+                              minlength=group_count * grade_count)\
+                .reshape(group_count, grade_count).tolist()
+
+    combined_counts = Counter(map(operator.add,
+                                  map(operator.mul, group_codes, repeat(grade_count)),
+                                  grades))
+
+    return [[combined_counts[group_code * grade_count + grade_code]
+             for grade_code in range(grade_count)]
+            for group_code in range(group_count)]
+
+
+def get_group_statistics(group_codes, group_names, grades):
+
+    '''Return the `GroupStatistics` of each group, in the order of
+    `group_names`, from the columns of codes `group_codes` and `grades`.'''
+
+    table = count_grades(group_codes, len(group_names), grades)
+    cohort_counts = [sum(column) for column in zip(*table)]
+
+    group_statistics = []
+    for name, counts in zip(group_names, table):
+        distance, flag = get_moderation_flag(counts, cohort_counts)
+        group_statistics.append(GroupStatistics(name = name,
+                                                count = sum(counts),
+                                                median = get_median_grade(counts),
+                                                distance = distance,
+                                                flag = flag,
+                                                counts = counts))
+
+    return group_statistics
+
+
+def get_median_grade(counts):
+
+    '''Return the median grade, given the number of each grade in `counts`,
+    or None if there are none. Of two middle grades, the higher is taken.'''
+
+    total = sum(counts)
+    if not total:
+        return None
+
+    cumulative = 0
+    for grade, count in zip(conf.grades, counts):
+        cumulative += count
+        if 2 * cumulative >= total:
+            return grade
+
+
+def get_moderation_flag(counts, cohort_counts):
+
+    '''Return the Kolmogorov-Smirnov distance between the distribution of
+    grades `counts` of a group and that of the rest of the cohort, whose
+    counts along with the group's are `cohort_counts`, and the moderation
+    flag of the group, i.e. HIGH or LOW if the distance is significant, or
+    None.'''
+
+    rest_counts = list(map(operator.sub, cohort_counts, counts))
+
+    total, rest_total = sum(counts), sum(rest_counts)
+    if not total or not rest_total:
+        return 0.0, None
+
+    distance, signed_distance = 0.0, 0.0
+    cumulative, rest_cumulative = 0, 0
+    for count, rest_count in zip(counts, rest_counts):
+        cumulative += count
+        rest_cumulative += rest_count
+        difference = cumulative / total - rest_cumulative / rest_total
+        if abs(difference) > distance:
+            distance, signed_distance = abs(difference), difference
+
+    critical_distance = max(moderation_min_distance,
+                            moderation_coefficient
+                            * math.sqrt((total + rest_total) / (total * rest_total)))
+
+    if total < moderation_min_count or distance <= critical_distance:
+        return distance, None
+
+    # The group has more of the higher grades, which have the lower codes.
+    return distance, HIGH if signed_distance > 0 else LOW
+
+
+def get_report_grade_rows(connection, sequence_name=None):
+
+    '''Return the (marker, labgroup, grade) of each graded report in the
+    Report table, of the sequence `sequence_name` or of every sequence, where
+    the marker is the lecturer's uid.'''
+
+    from sqlalchemy import select
+
+    from .models import Report, Student
+
+    query = select([Report.marker, Student.labgroup_id, Report.grade])\
+            .select_from(Report.__table__.join(Student.__table__,
+                                               Student.uid == Report.student))\
+            .where(Report.is_graded == True)\
+            .where(Report.grade != None)
+
+    if sequence_name is not None:
+        query = query.where(Report.sequence == sequence_name)
+
+    return [tuple(row) for row in connection.execute(query)]
+
+
+def get_completed_marksheet_grade_rows(completed_marksheets, labgroups=None):
+
+    '''Return the (marker, labgroup, grade) of each of the rows
+    `completed_marksheets`, from processing completed marksheets, where the
+    marker is the marker's name. The lab group of each student is looked up,
+    by student ID, in `labgroups`, if given, and is otherwise ''.'''
+
+    if labgroups is None:
+        labgroups = {}
+
+    return [(row.marker_name, labgroups.get(row.student_id, ''), row.grade)
+            for row in completed_marksheets]
+
+
+def format_group_statistics(title, group_statistics):
+
+    '''Return the `group_statistics` of markers or lab groups as a list of
+    lines of a table, under the heading `title`.'''
+
+    lines = ['%-30s %6s %8s %9s %5s' % (title, 'count', 'median', 'distance', 'flag')]
+    for statistics in sorted(group_statistics, key=lambda s: str(s.name)):
+        lines.append('%-30s %6d %8s %9.3f %5s' % (statistics.name,
+                                                  statistics.count,
+                                                  statistics.median,
+                                                  statistics.distance,
+                                                  statistics.flag or ''))
+
+    return lines
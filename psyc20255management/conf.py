@@ -40,3 +40,41 @@ marksheet_fname_pattern = re.compile(r'(.*)__(.*)__marksheet.docx')
 
 # From the time when we used commas as delimiters.
 legacy_marksheet_fname_pattern = re.compile(r'([^,]*), ([^,]*), marksheet.docx')
+
+
+# Cached results of processing completed marksheets are kept here, one cache
+# file per completed marking directory.
+cache_directory = os.path.join(os.path.expanduser('~'),
+                               '.cache',
+                               'psyc20255management')
+marksheet_cache_fname_template = 'marksheets_%s.pickle'
+
+# Indexes of the files in dropbox and completed marking directories, one per
+# directory and kind of listing, also kept in the cache directory.
+scan_index_fname_template = 'scan_%s.pickle'
+
+# The archives of the completed marking of each marker, and of each student.
+marker_archive_fname_template = '%s__marking.zip'
+student_archive_fname_template = '%s__%s__marking.zip'
+
+# The lab sequences.
+sequences = ['Psychometrics', 'Experimental', 'Qualitative']
+
+# The database settings, any of which can be overridden in the [database]
+# section of a config file (see `database.get_engine`). The database is the
+# SQLite file <name>.db, unless a full SQLAlchemy url is given. The remaining
+# settings are SQLite pragmas, set on each new connection: WAL journaling lets
+# queries run while grades are being written, and with it synchronous=NORMAL
+# is safe and avoids an fsync per commit.
+database_settings = dict(name = 'foobar',
+                         url = '',
+                         pool_class = 'QueuePool',
+                         journal_mode = 'WAL',
+                         synchronous = 'NORMAL',
+                         cache_size = '-65536',     # In KiB, i.e. 64 MiB
+                         mmap_size = '268435456',   # 256 MiB
+                         temp_store = 'MEMORY',
+                         busy_timeout = '30000')    # In milliseconds
+
+# The default database config file, used if it exists.
+database_config_fname = 'psyc20255management.ini'
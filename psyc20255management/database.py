@@ -0,0 +1,528 @@
+'''
+Loading and updating the psyc20255 database in bulk.
+
+Rows are inserted and updated with SQLAlchemy core, as one executemany per
+table, and all inside a single transaction, rather than by adding ORM
+objects one at a time.
+
+'''
+
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import csv
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+import sqlalchemy.pool
+from sqlalchemy import create_engine, event, inspect, select, bindparam
+from configobj import ConfigObj
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from . import conf
+from .models import (Base,
+                     LabGroup,
+                     Student,
+                     Sequence,
+                     Lecturer,
+                     LabGroupSequence,
+                     LabGroupSequenceLecturer,
+                     Report,
+                     ReportDuplicate)
+
+#================================ End Imports ================================
+
+# The SQLite pragmas that may be set in the database settings.
+sqlite_pragmas = ('journal_mode',
+                  'synchronous',
+                  'cache_size',
+                  'mmap_size',
+                  'temp_store',
+                  'busy_timeout')
+
+# The columns of a Report that `update_reports` may change.
+report_update_columns = ('original_filename',
+                         'renamed_filename',
+                         'checksum',
+                         'timestamp',
+                         'grade',
+                         'is_graded')
+
+
+def get_database_settings(config_fname=None):
+
+    '''Return the database settings, i.e. `conf.database_settings` updated
+    with the [database] section of the config file `config_fname`, if it
+    exists. By default, the config file is `conf.database_config_fname`.'''
+
+    if config_fname is None:
+        config_fname = conf.database_config_fname
+
+    settings = dict(conf.database_settings)
+
+    if os.path.exists(config_fname):
+        settings.update(ConfigObj(config_fname).get('database', {}))
+
+    unknown_settings = set(settings) - set(conf.database_settings)
+    assert not unknown_settings,\
+            'Unknown database settings %s.' % ', '.join(sorted(unknown_settings))
+
+    return settings
+
+
+def get_engine(config_fname=None):
+
+    '''Return the SQLAlchemy engine for the database, as configured by
+    `get_database_settings`.
+
+    For SQLite, the pragmas in the settings are set on every new connection
+    in the pool.
+
+    '''
+
+    settings = get_database_settings(config_fname)
+
+    url = settings['url'] or 'sqlite:///%s.db' % settings['name']
+
+    engine = create_engine(url,
+                           poolclass=getattr(sqlalchemy.pool,
+                                             settings['pool_class']))
+
+    if engine.dialect.name == 'sqlite':
+
+        pragmas = [(pragma, settings[pragma]) for pragma in sqlite_pragmas
+                   if settings[pragma] != '']
+
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, value in pragmas:
+                cursor.execute('PRAGMA %s = %s' % (pragma, value))
+            cursor.close()
+
+    return engine
+
+
+def read_csv_rows(csv_fname, columns):
+
+    '''Return the rows of the csv file `csv_fname`, which has a header row,
+    as a list of dictionaries with just the keys in `columns`.'''
+
+    with open(csv_fname, newline='') as csv_file:
+        return [{column: row[column] for column in columns}
+                for row in csv.DictReader(csv_file)]
+
+
+def read_students(students_fname):
+    '''Return the students in the csv file `students_fname`, which has
+    columns uid, firstname, lastname and labgroup_id.'''
+    return read_csv_rows(students_fname,
+                         ('uid', 'firstname', 'lastname', 'labgroup_id'))
+
+
+def read_lecturers(lecturers_fname):
+    '''Return the lecturers in the csv file `lecturers_fname`, which has
+    columns uid, firstname, lastname and email.'''
+    return read_csv_rows(lecturers_fname,
+                         ('uid', 'firstname', 'lastname', 'email'))
+
+
+def read_labgroup_lecturers(labgroup_lecturers_fname):
+    '''Return the lecturers who mark each lab group in each sequence, in the
+    csv file `labgroup_lecturers_fname`, which has columns labgroup_id,
+    sequence_id and lecturer_id.'''
+    return read_csv_rows(labgroup_lecturers_fname,
+                         ('labgroup_id', 'sequence_id', 'lecturer_id'))
+
+
+def get_report_rows(submissions):
+
+    '''Return the Report column values of each submission in `submissions`,
+    as returned by `get_submitted_reports_list`, keyed by student ID.'''
+
+    # Imported here, as the rest of this module, e.g. for `database create`,
+    # does not need the reports utilities.
+    from .utils.reports import get_new_report_filename
+
+    return {student_id: dict(original_filename = submission.filename,
+                             renamed_filename = get_new_report_filename(submission),
+                             checksum = submission.checksum,
+                             timestamp = submission.timestamp)
+            for student_id, submission in submissions.items()}
+
+
+def get_grade_rows(completed_marksheets):
+
+    '''Return the Report grade column values of each completed marksheet in
+    `completed_marksheets`, as returned by `process_completed_marksheets`,
+    keyed by student ID.'''
+
+    return {row.student_id: dict(grade = row.grade, is_graded = True)
+            for row in completed_marksheets}
+
+
+def insert_rows(connection, table, rows):
+    'Insert `rows` into `table` with a single executemany.'
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+def insert_new_rows(connection, table, rows, key_columns=('uid',)):
+
+    '''Insert the `rows` into `table` whose values of the `key_columns` are
+    not yet present, so that populating twice is harmless.'''
+
+    existing_keys\
+        = {tuple(row) for row in connection.execute(
+            select([table.c[column] for column in key_columns]))}
+
+    insert_rows(connection,
+                table,
+                [row for row in rows
+                 if tuple(row[column] for column in key_columns)
+                    not in existing_keys])
+
+
+def create_tables(engine):
+
+    '''Create the tables and indexes that are not already in the database.
+
+    `create_all` creates the missing tables, e.g. report_duplicate, along
+    with their indexes, but leaves the tables that are there alone. So the
+    indexes of those tables that were added since the database was made,
+    e.g. ix_report_sequence_is_graded, are created here.'''
+
+    Base.metadata.create_all(engine)
+
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing_indexes = {index['name']
+                            for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing_indexes:
+                index.create(engine)
+
+
+def initialize_database(engine):
+
+    '''Create the tables and indexes (see `create_tables`), and fill in what
+    is known from conf, i.e. the lab groups and the sequences, if they are
+    not already there. Reports of an older database with no is_graded are
+    set to ungraded (see `fill_is_graded`).'''
+
+    create_tables(engine)
+
+    with engine.begin() as connection:
+        insert_conf_rows(connection)
+        fill_is_graded(connection)
+
+
+def insert_conf_rows(connection):
+
+    'Insert the lab groups and sequences in conf that are not yet present.'
+
+    labgroup_table = LabGroup.__table__
+    sequence_table = Sequence.__table__
+
+    existing_labgroups\
+        = {row.uid for row in connection.execute(select([labgroup_table.c.uid]))}
+    existing_sequences\
+        = {row.name for row in connection.execute(select([sequence_table.c.name]))}
+
+    insert_rows(connection,
+                labgroup_table,
+                [dict(uid = uid) for uid in conf.labgroups
+                 if uid not in existing_labgroups])
+
+    insert_rows(connection,
+                sequence_table,
+                [dict(name = name) for name in conf.sequences
+                 if name not in existing_sequences])
+
+
+def fill_is_graded(connection):
+
+    '''Set is_graded to False on the Reports where it is NULL, e.g. those
+    inserted before it had a default, so that ungraded reports can be found
+    by the index on (sequence, is_graded) (see `queries.is_ungraded`).'''
+
+    report_table = Report.__table__
+
+    connection.execute(report_table.update()
+                       .where(report_table.c.is_graded.is_(None))
+                       .values(is_graded = False))
+
+
+def insert_labgroup_lecturer_rows(connection, labgroup_lecturers):
+
+    '''Insert the `labgroup_lecturers`, as returned by
+    `read_labgroup_lecturers`, that are not yet present, along with the lab
+    group sequences that they need.'''
+
+    labgroup_sequence_table = LabGroupSequence.__table__
+    labgroup_lecturer_table = LabGroupSequenceLecturer.__table__
+
+    def get_labgroup_sequences():
+        return {(row.labgroup_id, row.sequence_id): row.uid
+                for row in connection.execute(
+                    select([labgroup_sequence_table.c.uid,
+                            labgroup_sequence_table.c.labgroup_id,
+                            labgroup_sequence_table.c.sequence_id]))}
+
+    labgroup_sequences = get_labgroup_sequences()
+
+    new_labgroup_sequences = {(row['labgroup_id'], row['sequence_id'])
+                              for row in labgroup_lecturers} - set(labgroup_sequences)
+    if new_labgroup_sequences:
+        insert_rows(connection,
+                    labgroup_sequence_table,
+                    [dict(labgroup_id = labgroup_id, sequence_id = sequence_id)
+                     for labgroup_id, sequence_id in sorted(new_labgroup_sequences)])
+        labgroup_sequences = get_labgroup_sequences()
+
+    existing_labgroup_lecturers\
+        = {(row.labgroup_sequence_id, row.lecturer_id)
+           for row in connection.execute(
+               select([labgroup_lecturer_table.c.labgroup_sequence_id,
+                       labgroup_lecturer_table.c.lecturer_id]))}
+
+    new_labgroup_lecturers\
+        = {(labgroup_sequences[row['labgroup_id'], row['sequence_id']],
+            row['lecturer_id'])
+           for row in labgroup_lecturers} - existing_labgroup_lecturers
+
+    insert_rows(connection,
+                labgroup_lecturer_table,
+                [dict(labgroup_sequence_id = labgroup_sequence_id,
+                      lecturer_id = lecturer_id)
+                 for labgroup_sequence_id, lecturer_id
+                 in sorted(new_labgroup_lecturers)])
+
+
+def populate_database(engine,
+                      students=(),
+                      lecturers=(),
+                      labgroup_lecturers=(),
+                      sequence_name=None,
+                      submissions=None):
+
+    '''Populate the database, in one transaction, with
+
+    * the lab groups and sequences in conf,
+    * `students`, as returned by `read_students`,
+    * `lecturers`, as returned by `read_lecturers`,
+    * `labgroup_lecturers`, as returned by `read_labgroup_lecturers`,
+    * the `submissions`, as returned by `get_submitted_reports_list`, of the
+      sequence `sequence_name`, if given,
+
+    leaving out any that are already there, e.g. from an earlier populate.
+
+    '''
+
+    with engine.begin() as connection:
+
+        insert_conf_rows(connection)
+
+        insert_new_rows(connection, Student.__table__, list(students))
+        insert_new_rows(connection, Lecturer.__table__, list(lecturers))
+        insert_labgroup_lecturer_rows(connection, list(labgroup_lecturers))
+
+        if submissions is not None:
+            insert_new_rows(connection,
+                            Report.__table__,
+                            [dict(row, student = student_id, sequence = sequence_name)
+                             for student_id, row
+                             in get_report_rows(submissions).items()],
+                            key_columns=('student', 'sequence'))
+
+
+def update_reports(engine, sequence_name, report_rows):
+
+    '''Insert or update, in bulk and in one transaction, the Report rows of
+    the sequence `sequence_name`.
+
+    `report_rows` is a dictionary, keyed by student ID, of the values of any
+    of the `report_update_columns`, e.g. as returned by `get_report_rows` or
+    `get_grade_rows`, or a merger of the two. Existing rows are only
+    rewritten if a value, e.g. the checksum or the grade, has changed.
+
+    Return the numbers of rows inserted, updated and left unchanged.
+
+    '''
+
+    report_table = Report.__table__
+
+    inserts = []
+    updates = []
+    unchanged = 0
+
+    with engine.begin() as connection:
+
+        fill_is_graded(connection)
+
+        existing_reports\
+            = {row.student: row for row in connection.execute(
+                select([report_table.c.uid, report_table.c.student]
+                       + [report_table.c[column]
+                          for column in report_update_columns])
+                .where(report_table.c.sequence == sequence_name))}
+
+        for student_id, values in report_rows.items():
+
+            existing_report = existing_reports.get(student_id)
+
+            if existing_report is None:
+                inserts.append(dict(values,
+                                    student = student_id,
+                                    sequence = sequence_name))
+            elif any(existing_report[column] != value
+                     for column, value in values.items()):
+                update = {column: existing_report[column]
+                          for column in report_update_columns}
+                update.update(values)
+                # The bound parameters of an UPDATE can not have the same
+                # names as the columns.
+                update = {'new_' + column: value
+                          for column, value in update.items()}
+                update['report_uid'] = existing_report.uid
+                updates.append(update)
+            else:
+                unchanged += 1
+
+        # Each executemany needs the same keys in every row.
+        inserts_by_keys = {}
+        for insert in inserts:
+            inserts_by_keys.setdefault(tuple(sorted(insert)), []).append(insert)
+        for rows in inserts_by_keys.values():
+            insert_rows(connection, report_table, rows)
+
+        if updates:
+            connection.execute(
+                report_table.update()
+                .where(report_table.c.uid == bindparam('report_uid'))
+                .values({column: bindparam('new_' + column)
+                         for column in report_update_columns}),
+                updates)
+
+    return len(inserts), len(updates), unchanged
+
+
+def get_lecturers(connection):
+    '''Return the firstname, lastname and email of each lecturer, as a
+    dictionary keyed by uid.'''
+    lecturer_table = Lecturer.__table__
+    return {row.uid: dict(firstname = row.firstname,
+                          lastname = row.lastname,
+                          email = row.email)
+            for row in connection.execute(select([lecturer_table]))}
+
+
+def get_student_labgroups(connection):
+    'Return the lab group of each student, as a dictionary keyed by uid.'
+    student_table = Student.__table__
+    return {row.uid: row.labgroup_id
+            for row in connection.execute(
+                select([student_table.c.uid, student_table.c.labgroup_id]))}
+
+
+def get_labgroup_markers(connection, sequence_name):
+
+    '''Return the uids of the lecturers who mark each lab group in the
+    sequence `sequence_name`, as a dictionary of sorted lists keyed by lab
+    group.'''
+
+    labgroup_sequence_table = LabGroupSequence.__table__
+    labgroup_lecturer_table = LabGroupSequenceLecturer.__table__
+
+    query = select([labgroup_sequence_table.c.labgroup_id,
+                    labgroup_lecturer_table.c.lecturer_id])\
+            .select_from(labgroup_lecturer_table.join(
+                labgroup_sequence_table,
+                labgroup_sequence_table.c.uid
+                == labgroup_lecturer_table.c.labgroup_sequence_id))\
+            .where(labgroup_sequence_table.c.sequence_id == sequence_name)
+
+    labgroup_markers = {}
+    for row in connection.execute(query):
+        labgroup_markers.setdefault(row.labgroup_id, []).append(row.lecturer_id)
+
+    return {labgroup_id: sorted(markers)
+            for labgroup_id, markers in labgroup_markers.items()}
+
+
+def update_report_markers(engine, sequence_name, marker_assignments):
+
+    '''Set, in bulk and in one transaction, the marker of each Report of
+    the sequence `sequence_name` in `marker_assignments`, a dictionary of
+    lecturer uids keyed by student ID, e.g. the assignments of a
+    `MarkingSchedule`.
+
+    Return the number of reports whose marker was set. Students who have no
+    Report in the sequence are left out.'''
+
+    report_table = Report.__table__
+
+    with engine.begin() as connection:
+
+        existing_students\
+            = {row.student for row in connection.execute(
+                select([report_table.c.student])
+                .where(report_table.c.sequence == sequence_name))}
+
+        # The bound parameters of an UPDATE can not have the same names as
+        # the columns.
+        updates = [dict(report_student = student_id, new_marker = marker)
+                   for student_id, marker in sorted(marker_assignments.items())
+                   if student_id in existing_students]
+
+        if updates:
+            connection.execute(
+                report_table.update()
+                .where(report_table.c.sequence == sequence_name)
+                .where(report_table.c.student == bindparam('report_student'))
+                .values(marker = bindparam('new_marker')),
+                updates)
+
+    return len(updates)
+
+
+def update_report_duplicates(engine, sequence_name, duplicate_pairs):
+
+    '''Replace, in one transaction, the duplicates flagged against the
+    Reports of the sequence `sequence_name` with `duplicate_pairs`, the
+    `DuplicatePair`s returned by `utils.duplicates.find_duplicates`.
+
+    Return the number of pairs flagged. Pairs of students who do not both
+    have a Report in the sequence are left out.'''
+
+    report_table = Report.__table__
+    duplicate_table = ReportDuplicate.__table__
+
+    with engine.begin() as connection:
+
+        report_uids\
+            = {row.student: row.uid for row in connection.execute(
+                select([report_table.c.uid, report_table.c.student])
+                .where(report_table.c.sequence == sequence_name))}
+
+        connection.execute(
+            duplicate_table.delete()
+            .where(duplicate_table.c.report_id.in_(
+                select([report_table.c.uid])
+                .where(report_table.c.sequence == sequence_name))))
+
+        rows = [dict(report_id = report_uids[pair.student_id],
+                     duplicate_report_id = report_uids[pair.other_student_id],
+                     kind = pair.kind,
+                     similarity = pair.similarity)
+                for pair in duplicate_pairs
+                if pair.student_id in report_uids
+                and pair.other_student_id in report_uids]
+
+        insert_rows(connection, duplicate_table, rows)
+
+    return len(rows)
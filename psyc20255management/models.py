@@ -16,6 +16,8 @@ from sqlalchemy import (Column,
                         Integer, 
                         DateTime,
                         Boolean,
+                        Float,
+                        Index,
                         UniqueConstraint)
 from sqlalchemy.ext.declarative import declarative_base
 Base = declarative_base()
@@ -65,7 +67,7 @@ class Student(Base):
     firstname = Column(String(100))
     lastname = Column(String(100))
 
-    labgroup_id = Column(String, ForeignKey('labgroup.uid'))
+    labgroup_id = Column(String, ForeignKey('labgroup.uid'), index=True)
 
 class Sequence(Base):
     '''
@@ -103,7 +105,7 @@ class Lecturer(Base):
 class LabGroupSequence(Base):
 
     __tablename__ = 'labgroup_sequence'
-    __table_args__ = tuple(UniqueConstraint('labgroup_id', 'sequence_id'))
+    __table_args__ = (UniqueConstraint('labgroup_id', 'sequence_id'),)
 
     uid = Column(Integer, primary_key = True)
 
@@ -117,7 +119,9 @@ class LabGroupTeam(Base):
     uid = Column(Integer, primary_key = True)
     name = Column(String(25))
 
-    labgroup_sequence_id = Column(Integer, ForeignKey('labgroup_sequence.uid'))
+    labgroup_sequence_id = Column(Integer, 
+                                  ForeignKey('labgroup_sequence.uid'),
+                                  index=True)
     student = Column(String, ForeignKey('student.uid'), unique=True)
 
 
@@ -128,14 +132,18 @@ class LabGroupSequenceLecturer(Base):
 
     uid = Column(Integer, primary_key = True)
 
-    labgroup_sequence_id = Column(Integer, ForeignKey('labgroup.uid'))
-    lecturer_id = Column(Integer, ForeignKey('lecturer.uid'))
+    labgroup_sequence_id = Column(Integer, ForeignKey('labgroup_sequence.uid'))
+    lecturer_id = Column(String, ForeignKey('lecturer.uid'), index=True)
 
 
 class Report(Base):
 
     __tablename__ = 'report'
-    __table_args__ = (UniqueConstraint('student', 'sequence'),)
+    # The unique constraint also serves lookups by student. The indexes are
+    # for "all reports for marker X" and "ungraded reports per sequence".
+    __table_args__ = (UniqueConstraint('student', 'sequence'),
+                      Index('ix_report_marker', 'marker'),
+                      Index('ix_report_sequence_is_graded', 'sequence', 'is_graded'))
 
     uid = Column(Integer, primary_key = True)
 
@@ -153,5 +161,29 @@ class Report(Base):
     marker = Column(String, ForeignKey('lecturer.uid'))
 
     # Grade 
-    is_graded = Column(Boolean)
+    is_graded = Column(Boolean, default=False)
     grade = Column(String(4))
+
+
+class ReportDuplicate(Base):
+
+    '''
+    A report that is a duplicate, or a near-duplicate, of another student's
+    report in the same sequence, as flagged by `utils.duplicates`. Each pair
+    is flagged once, against the report of the lower student ID.
+
+    kind (string), 'exact' or 'near'
+    similarity (float), the estimated similarity of their text, from 0 to 1
+
+    '''
+
+    __tablename__ = 'report_duplicate'
+    __table_args__ = (UniqueConstraint('report_id', 'duplicate_report_id'),)
+
+    uid = Column(Integer, primary_key = True)
+
+    report_id = Column(Integer, ForeignKey('report.uid'))
+    duplicate_report_id = Column(Integer, ForeignKey('report.uid'), index=True)
+
+    kind = Column(String(5))
+    similarity = Column(Float)
@@ -0,0 +1,76 @@
+'''
+The queries that we run on the psyc20255 database.
+
+Each is a single query, joining in whatever else is needed (e.g. the
+students of the reports), so that nothing has to be looked up row by row
+afterwards. Each is served by an index declared in the models.
+
+'''
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from sqlalchemy import func
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from .models import Student, Report
+
+#================================ End Imports ================================
+
+
+def get_reports_for_marker(session, marker_uid):
+
+    '''Return a list of the (report, student) pairs of all reports marked
+    by the lecturer `marker_uid`, ordered by sequence and student name.'''
+
+    return (session.query(Report, Student)
+            .join(Student, Student.uid == Report.student)
+            .filter(Report.marker == marker_uid)
+            .order_by(Report.sequence, Student.lastname, Student.firstname)
+            .all())
+
+
+def is_ungraded():
+
+    '''The condition that a report is not (yet) graded. Reports are never
+    left with is_graded NULL (see `database.fill_is_graded`), so that this
+    is a plain comparison, which the (sequence, is_graded) index serves.'''
+
+    return Report.is_graded == False
+
+
+def get_ungraded_reports(session, sequence_name):
+
+    '''Return a list of the (report, student) pairs of the ungraded reports
+    of the sequence `sequence_name`, ordered by marker and student name.'''
+
+    return (session.query(Report, Student)
+            .join(Student, Student.uid == Report.student)
+            .filter(Report.sequence == sequence_name)
+            .filter(is_ungraded())
+            .order_by(Report.marker, Student.lastname, Student.firstname)
+            .all())
+
+
+def get_ungraded_report_counts(session):
+
+    '''Return a dictionary of the number of ungraded reports in each
+    sequence.'''
+
+    return dict(session.query(Report.sequence, func.count(Report.uid))
+                .filter(is_ungraded())
+                .group_by(Report.sequence)
+                .all())
+
+
+def get_students_in_labgroup(session, labgroup_uid):
+
+    '''Return a list of the students in the lab group `labgroup_uid`, ordered
+    by name.'''
+
+    return (session.query(Student)
+            .filter(Student.labgroup_id == labgroup_uid)
+            .order_by(Student.lastname, Student.firstname)
+            .all())
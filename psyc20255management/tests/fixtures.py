@@ -0,0 +1,208 @@
+"""Builders of synthetic test data, for the tests and the benchmarks: a NOW
+dropbox of submitted reports, and directories of completed marksheets with
+random grades, some with damaged grade dropdowns.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import random
+import zipfile
+import datetime
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management import conf
+from psyc20255management.utils.marksheets import MarksheetModel, MarksheetTemplate
+
+#================================ End Imports ================================
+
+# The ways in which a marksheet's grade dropdown is damaged, and whether the
+# marksheet can still be read.
+#
+# * removed, the dropdown has been deleted and the grade typed in its place,
+#   untidily, e.g. ' 21high.'
+# * split, the dropdown's grade is split over two runs
+# * padded, the dropdown's grade is in lower case, padded with spaces and a
+#   full stop, e.g. ' 21high. ', as if typed in
+# * placeholder, the dropdown shows Word's placeholder, not a grade
+# * empty, the dropdown has no text at all
+dropdown_damages = dict(removed = True,
+                        split = True,
+                        padded = True,
+                        placeholder = False,
+                        empty = False)
+
+deadline = datetime.datetime(2017, 12, 1, 16, 0)
+
+
+def make_dropbox(dirname, students, resubmissions, size):
+
+    '''Fill `dirname` with submissions from `students` students, each of whom
+    submits 1 + Poisson-ish(`resubmissions`) times, with files of `size`
+    bytes. Return the number of files.'''
+
+    file_count = 0
+
+    for i in range(students):
+        submission_count = 1 + sum(random.random() < resubmissions / 4
+                                   for _ in range(4))
+        for minutes in random.sample(range(5000), submission_count):
+            timestamp = deadline - datetime.timedelta(minutes=minutes)
+            fname = '%05d-%05d - N0%06d - Student %d Name- %s - report.docx'\
+                    % (12345, 10000 + file_count,
+                       i,
+                       i,
+                       timestamp.strftime('%d %B, %Y %I%M %p'))
+            assert conf.submitted_report_filename_pattern.match(fname)
+            with open(os.path.join(dirname, fname), 'wb') as f:
+                f.write(os.urandom(size))
+            file_count += 1
+
+    return file_count
+
+
+def make_dropbox_zip(dirname, zip_fname):
+
+    '''Put the dropbox `dirname` in the zip file `zip_fname`, in a folder, as
+    the NOW dropbox download is.'''
+
+    with zipfile.ZipFile(zip_fname, 'w') as dropbox:
+        for fname in sorted(os.listdir(dirname)):
+            dropbox.write(os.path.join(dirname, fname), 'submissions/' + fname)
+
+
+class CorpusMarksheetTemplate(MarksheetTemplate):
+
+    '''A `MarksheetTemplate` whose new marksheets can also be given a
+    sequence, a grade, and a damaged grade dropdown.'''
+
+    template_title = MarksheetModel.sequence_title_template % 'Experimental'
+    template_grade_xml = '<w:sdtContent><w:r><w:t>1MID</w:t></w:r></w:sdtContent>'
+    grade_xml = '<w:sdtContent><w:r><w:t>%s</w:t></w:r></w:sdtContent>'
+
+    def __init__(self, template_fname=None):
+        super(CorpusMarksheetTemplate, self).__init__(template_fname)
+        assert self.template_title in self.fixed_parts[0]
+        assert self.template_grade_xml in self.fixed_parts[-1]
+        self.dropdown_start = self.fixed_parts[-1].index('<w:sdt>')
+        self.dropdown_end = self.fixed_parts[-1].index('</w:sdt>') + len('</w:sdt>')
+
+    def get_graded_document_xml(self,
+                                sequence_name,
+                                grade,
+                                damage,
+                                *header_details):
+
+        '''Return the document xml of a new marksheet of the sequence
+        `sequence_name`, graded `grade`, with its dropdown damaged by
+        `damage`, one of `dropdown_damages`, or not if it is None.'''
+
+        document_xml = self.get_document_xml(*header_details)
+
+        title = MarksheetModel.sequence_title_template % sequence_name
+        document_xml = document_xml.replace(self.template_title, title, 1)
+
+        # The dropdown is in the last fixed part, which is at the end.
+        tail_length = len(self.fixed_parts[-1])
+        head, tail = document_xml[:-tail_length], document_xml[-tail_length:]
+
+        if damage is None:
+            grade_xml = self.grade_xml % grade
+        elif damage == 'split':
+            grade_xml = self.grade_xml % (grade[:2] + '</w:t></w:r><w:r><w:t>'
+                                          + grade[2:])
+        elif damage == 'padded':
+            grade_xml = self.grade_xml.replace('<w:t>', '<w:t xml:space="preserve">')\
+                    % (' %s. ' % grade.lower())
+        elif damage == 'placeholder':
+            grade_xml = self.grade_xml % 'Choose an item.'
+        elif damage == 'empty':
+            grade_xml = '<w:sdtContent><w:r></w:r></w:sdtContent>'
+        elif damage == 'removed':
+            typed_grade = ' %s.' % grade.lower()
+            tail = (tail[:self.dropdown_start]
+                    + '<w:r><w:t xml:space="preserve">%s</w:t></w:r>' % typed_grade
+                    + tail[self.dropdown_end:])
+            return head + tail
+        else:
+            raise ValueError('Unknown dropdown damage %s.' % damage)
+
+        return head + tail.replace(self.template_grade_xml, grade_xml, 1)
+
+    def make_graded_marksheet(self,
+                              sequence_name,
+                              grade,
+                              damage,
+                              student_name,
+                              student_ID,
+                              marker_name,
+                              marker_email,
+                              new_marksheet_name):
+
+        'As `make_new_marksheet`, but see `get_graded_document_xml`.'
+
+        document_xml = self.get_graded_document_xml(sequence_name,
+                                                    grade,
+                                                    damage,
+                                                    student_name,
+                                                    student_ID,
+                                                    marker_name,
+                                                    marker_email)
+
+        with open(new_marksheet_name, 'wb') as new_marksheet:
+            new_marksheet.write(self.base_zip_bytes)
+
+        with zipfile.ZipFile(new_marksheet_name, 'a') as new_marksheet:
+            new_marksheet.writestr(self.document_xml_info,
+                                   document_xml.encode('utf-8'))
+
+
+def make_completed_marksheets(dirname, count, damaged, sequence_names=None):
+
+    '''Fill `dirname` with `count` completed marksheets, of sequences chosen
+    at random from `sequence_names`, with random grades. The dropdowns of a
+    proportion `damaged` of them are damaged, each in one of the ways in
+    `dropdown_damages`, chosen at random.
+
+    Return a list, in the order of their filenames, of a dictionary for each
+    marksheet with keys filename, sequence_name, grade, damage (or None), and
+    is_valid, i.e. whether it should be read without error.
+
+    '''
+
+    if sequence_names is None:
+        sequence_names = ['Experimental']
+
+    template = CorpusMarksheetTemplate()
+    damages = sorted(dropdown_damages)
+
+    manifest = []
+    for i in range(count):
+
+        student_name = 'Student %d Name' % i
+        student_id = 'N0%06d' % i
+        sequence_name = random.choice(sequence_names)
+        grade = random.choice(conf.grades)
+        damage = random.choice(damages) if random.random() < damaged else None
+
+        fname = conf.marksheet_fname_template % (student_name, student_id)
+
+        template.make_graded_marksheet(sequence_name,
+                                       grade,
+                                       damage,
+                                       student_name,
+                                       student_id,
+                                       'Marker %d Name' % (i % 40),
+                                       'marker%d@ntu.ac.uk' % (i % 40),
+                                       os.path.join(dirname, fname))
+
+        manifest.append(dict(filename = fname,
+                             sequence_name = sequence_name,
+                             grade = grade,
+                             damage = damage,
+                             is_valid = damage is None or dropdown_damages[damage]))
+
+    return sorted(manifest, key=lambda marksheet: marksheet['filename'])
@@ -0,0 +1,123 @@
+"""Tests that exporting the same completed marking again gives the same
+archives, byte for byte, however many threads write them.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import random
+import zipfile
+import tempfile
+import unittest
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.utils import archives, marksheets, reports
+from psyc20255management.tests.fixtures import (deadline,
+                                                 make_dropbox,
+                                                 make_dropbox_zip,
+                                                 make_completed_marksheets)
+
+#================================ End Imports ================================
+
+
+class TestExportArchives(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmpdir = tempfile.TemporaryDirectory()
+
+        dropbox_dirname = os.path.join(cls.tmpdir.name, 'dropbox')
+        marking_dirname = os.path.join(cls.tmpdir.name, 'completed_marking')
+        os.mkdir(dropbox_dirname)
+        os.mkdir(marking_dirname)
+
+        random.seed(101)
+        make_dropbox(dropbox_dirname, 30, 1, 4096)
+
+        # The last submission of one student is not a docx file, and so is
+        # deflated rather than stored.
+        with open(os.path.join(dropbox_dirname,
+                               '12345-99999 - N0000002 - Student 2 Name- %s'
+                               ' - report.txt'
+                               % deadline.strftime('%d %B, %Y %I%M %p')), 'w')\
+                as report:
+            report.write('The report of student 2.\n' * 200)
+
+        cls.dropbox_zip = os.path.join(cls.tmpdir.name, 'dropbox.zip')
+        make_dropbox_zip(dropbox_dirname, cls.dropbox_zip)
+
+        # Marksheets for only some of the students, with 40 markers between
+        # them, as `make_completed_marksheets` has.
+        make_completed_marksheets(marking_dirname, 25, 0)
+
+        cls.completed_marksheets\
+                = marksheets.process_completed_marksheets(marking_dirname)
+        cls.submissions\
+                = reports.get_submitted_reports_list_from_zip(cls.dropbox_zip)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def export(self, archive_dirname, threads):
+
+        '''Export the archives to `archive_dirname` with `threads` threads, and
+        return the contents of each archive, keyed by its path relative to
+        `archive_dirname`.'''
+
+        summary = archives.export_archives(self.completed_marksheets,
+                                           self.submissions,
+                                           self.dropbox_zip,
+                                           archive_dirname,
+                                           threads=threads)
+        self.assertEqual(summary['students'], 25)
+
+        contents = {}
+        for subdirname in ('markers', 'students'):
+            for fname in os.listdir(os.path.join(archive_dirname, subdirname)):
+                with open(os.path.join(archive_dirname, subdirname, fname),
+                          'rb') as archive:
+                    contents[os.path.join(subdirname, fname)] = archive.read()
+
+        return contents
+
+    def test_archives_are_byte_identical(self):
+
+        with tempfile.TemporaryDirectory() as archive_dirname:
+
+            contents = self.export(archive_dirname, threads=1)
+            self.assertEqual(len(contents), 25 + 25)
+
+            # Again, into the same directory.
+            self.assertEqual(self.export(archive_dirname, threads=1), contents)
+
+        for threads in (2, 8):
+            with tempfile.TemporaryDirectory() as archive_dirname:
+                self.assertEqual(self.export(archive_dirname, threads), contents,
+                                 '%d threads' % threads)
+
+    def test_compression_by_extension(self):
+
+        with tempfile.TemporaryDirectory() as archive_dirname:
+
+            self.export(archive_dirname, threads=4)
+
+            student_archive = archives.get_student_archive_fname('',
+                                                                 'Student 2 Name',
+                                                                 'N0000002')
+            with zipfile.ZipFile(os.path.join(archive_dirname,
+                                              student_archive)) as archive:
+                compress_types = {os.path.splitext(member.filename)[1]:
+                                  member.compress_type
+                                  for member in archive.infolist()}
+
+        self.assertEqual(compress_types, {'.docx': zipfile.ZIP_STORED,
+                                          '.txt': zipfile.ZIP_DEFLATED})
+
+
+if __name__ == '__main__':
+    unittest.main()
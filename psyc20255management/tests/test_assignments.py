@@ -0,0 +1,103 @@
+"""Tests of the scheduling of marking among markers.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import random
+import unittest
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.utils.assignments import schedule_marking
+
+#================================ End Imports ================================
+
+
+class TestScheduleMarking(unittest.TestCase):
+
+    def assertValidSchedule(self, schedule, reports, capacities=None):
+
+        'Assert that every assigned report went to one of its eligible markers.'
+
+        for student_id, weight, eligible_markers in reports:
+            if student_id in schedule.assignments and eligible_markers:
+                self.assertIn(schedule.assignments[student_id], eligible_markers)
+
+        for uid, capacity in (capacities or {}).items():
+            self.assertLessEqual(schedule.counts[uid], capacity)
+
+    def test_capacity_goes_to_the_reports_only_one_marker_may_take(self):
+
+        # Any marker may take the heaviest report, but only l1 may take three
+        # of the others, and l1 can take no more than them.
+        reports = [('4', 100, ()),
+                   ('12', 10, ('l1',)),
+                   ('18', 10, ('l1',)),
+                   ('24', 10, ('l1',)),
+                   ('30', 50, ())]
+        capacities = dict(l1 = 3)
+
+        schedule = schedule_marking(reports, ['l1', 'l2'], capacities)
+
+        self.assertEqual(schedule.unassigned, [])
+        self.assertEqual(schedule.assignments,
+                         {'4': 'l2', '12': 'l1', '18': 'l1', '24': 'l1', '30': 'l2'})
+        self.assertValidSchedule(schedule, reports, capacities)
+
+    def test_reports_over_capacity_are_unassigned(self):
+
+        reports = [(str(i), 1, ('l1',)) for i in range(5)]
+
+        schedule = schedule_marking(reports, ['l1', 'l2'], dict(l1 = 3))
+
+        self.assertEqual(len(schedule.assignments), 3)
+        self.assertEqual(sorted(schedule.unassigned), ['3', '4'])
+        self.assertEqual(schedule.counts, dict(l1 = 3, l2 = 0))
+
+    def test_equal_reports_are_shared_equally(self):
+
+        reports = [('N%07d' % i, 1, ()) for i in range(100)]
+        markers = ['l1', 'l2', 'l3', 'l4']
+
+        schedule = schedule_marking(reports, markers)
+
+        self.assertEqual(schedule.counts, dict.fromkeys(markers, 25))
+        self.assertEqual(schedule.loads, dict.fromkeys(markers, 25))
+
+    def test_loads_are_balanced_within_each_lab_group(self):
+
+        random_state = random.Random(101)
+        labgroup_markers = [('l1', 'l2'), ('l3', 'l4', 'l5')]
+        reports = [('N%07d' % i,
+                    random_state.randint(1000, 2000),
+                    labgroup_markers[i % 2])
+                   for i in range(200)]
+
+        schedule = schedule_marking(reports, ['l1', 'l2', 'l3', 'l4', 'l5'])
+
+        self.assertEqual(schedule.unassigned, [])
+        self.assertValidSchedule(schedule, reports)
+        for markers in labgroup_markers:
+            loads = [schedule.loads[uid] for uid in markers]
+            # Greedy scheduling, heaviest first, leaves the loads no further
+            # apart than the heaviest report.
+            self.assertLessEqual(max(loads) - min(loads), 2000)
+
+    def test_schedule_does_not_depend_on_order(self):
+
+        random_state = random.Random(101)
+        reports = [('N%07d' % i, random_state.choice([1, 2, 3]), ())
+                   for i in range(50)]
+        markers = ['l1', 'l2', 'l3']
+
+        schedule = schedule_marking(reports, markers, dict(l1 = 10))
+        random_state.shuffle(reports)
+
+        self.assertEqual(schedule_marking(reports, markers, dict(l1 = 10)),
+                         schedule)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+"""Tests of the caching of completed marksheets' headers by `MarksheetCache`:
+hits, misses, and the invalidation of the entries of changed, removed and
+unreadable marksheets.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management import conf
+from psyc20255management.utils import marksheets
+from psyc20255management.utils.cache import MarksheetCache
+from psyc20255management.tests.fixtures import (CorpusMarksheetTemplate,
+                                                 make_completed_marksheets)
+
+#================================ End Imports ================================
+
+sequence_name = 'Experimental'
+
+
+class TestMarksheetCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.marking_dirname = os.path.join(self.tmpdir.name, 'completed_marking')
+        os.mkdir(self.marking_dirname)
+        self.cache_filename = os.path.join(self.tmpdir.name, 'cache.pickle')
+
+        random.seed(101)
+        self.manifest = make_completed_marksheets(self.marking_dirname, 10, 0)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def get_filepath(self, marksheet):
+        return os.path.abspath(os.path.join(self.marking_dirname,
+                                            marksheet['filename']))
+
+    def process(self):
+
+        '''Process the directory with the cache from disk, save it, and return
+        the cache, the rows and the failures.'''
+
+        cache = MarksheetCache(self.cache_filename)
+        failures = []
+        rows = marksheets.process_completed_marksheets(self.marking_dirname,
+                                                       sequence_name,
+                                                       failures=failures,
+                                                       cache=cache)
+        cache.save()
+
+        return cache, rows, failures
+
+    def regrade(self, marksheet, grade):
+
+        'Write `marksheet` again, graded `grade`.'
+
+        student_name, student_id = marksheets.parse_marksheet_fname(
+                conf.marksheet_fname_pattern, marksheet['filename'])
+        CorpusMarksheetTemplate().make_graded_marksheet(sequence_name,
+                                                        grade,
+                                                        None,
+                                                        student_name,
+                                                        student_id,
+                                                        'Marker Name',
+                                                        'marker@ntu.ac.uk',
+                                                        self.get_filepath(marksheet))
+
+    def test_second_run_hits(self):
+
+        cache, rows, _ = self.process()
+        self.assertEqual((cache.hits, cache.misses), (0, 10))
+
+        cache, cached_rows, _ = self.process()
+        self.assertEqual((cache.hits, cache.misses), (10, 0))
+        self.assertEqual(cached_rows, rows)
+
+    def test_changed_marksheet_misses(self):
+
+        self.process()
+
+        marksheet = self.manifest[3]
+        grade = 'ZERO' if marksheet['grade'] != 'ZERO' else '1EXC'
+        self.regrade(marksheet, grade)
+
+        cache, rows, _ = self.process()
+        self.assertEqual((cache.hits, cache.misses), (9, 1))
+        self.assertEqual(rows[3].grade, grade)
+
+    def test_touched_marksheet_hits_by_checksum(self):
+
+        _, rows, _ = self.process()
+
+        filepath = self.get_filepath(self.manifest[3])
+        stat = os.stat(filepath)
+        os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        cache, touched_rows, _ = self.process()
+        self.assertEqual((cache.hits, cache.misses), (10, 0))
+        self.assertEqual(touched_rows, rows)
+
+    def test_removed_marksheet_is_evicted(self):
+
+        self.process()
+
+        filepath = self.get_filepath(self.manifest[3])
+        os.remove(filepath)
+
+        cache, rows, _ = self.process()
+        self.assertEqual((cache.hits, cache.misses), (9, 0))
+        self.assertNotIn(filepath, cache.entries)
+        self.assertEqual(len(rows), 9)
+
+    def test_unreadable_marksheet_is_not_cached(self):
+
+        filepath = self.get_filepath(self.manifest[3])
+        copy_filepath = os.path.join(self.tmpdir.name, 'marksheet.docx')
+        shutil.copy(filepath, copy_filepath)
+        with open(filepath, 'wb') as marksheet:
+            marksheet.write(b'Not yet copied in.')
+
+        cache, _, failures = self.process()
+        self.assertEqual(len(failures), 1)
+        self.assertNotIn(filepath, cache.entries)
+
+        # Once it has been copied in, it is read.
+        os.replace(copy_filepath, filepath)
+        cache, rows, failures = self.process()
+        self.assertEqual((cache.hits, cache.misses, len(rows), failures),
+                         (9, 1, 10, []))
+
+    def test_damaged_cache_starts_afresh(self):
+
+        with open(self.cache_filename, 'wb') as cache_file:
+            cache_file.write(b'Not a pickle.')
+
+        cache, rows, _ = self.process()
+        self.assertEqual((cache.hits, cache.misses, len(rows)), (0, 10, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
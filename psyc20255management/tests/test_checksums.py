@@ -0,0 +1,90 @@
+"""Tests of the checksums of files and streams, against `ernst.esys.checksum`,
+whose checksums are kept in the database, and against hashlib and zlib.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import io
+import os
+import zlib
+import hashlib
+import tempfile
+import unittest
+
+#=============================================================================
+# Imports of homespun packages
+#=============================================================================
+try:
+    from ernst import esys
+except ImportError:
+    esys = None
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.utils import checksums
+
+#================================ End Imports ================================
+
+buffer_size = checksums.buffer_size
+
+# Sizes around the read buffer's, where chunking could go wrong.
+file_sizes = [0, 1, 4095, buffer_size - 1, buffer_size, buffer_size + 1,
+              3 * buffer_size + 17]
+
+
+class TestChecksums(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.contents = {}
+
+        for size in file_sizes:
+            filepath = os.path.join(self.tmpdir.name, '%d.bin' % size)
+            contents = os.urandom(size)
+            with open(filepath, 'wb') as f:
+                f.write(contents)
+            self.contents[filepath] = contents
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_checksum_file_is_md5(self):
+        for filepath, contents in self.contents.items():
+            self.assertEqual(checksums.checksum_file(filepath),
+                             hashlib.md5(contents).hexdigest(),
+                             filepath)
+
+    @unittest.skipIf(esys is None, 'ernst is not installed')
+    def test_checksum_file_agrees_with_esys(self):
+        for filepath in self.contents:
+            self.assertEqual(checksums.checksum_file(filepath),
+                             esys.checksum(filepath),
+                             filepath)
+
+    def test_checksum_stream_agrees_with_checksum_file(self):
+        for filepath, contents in self.contents.items():
+            for fast in (False, True):
+                self.assertEqual(checksums.checksum_stream(io.BytesIO(contents), fast),
+                                 checksums.checksum_file(filepath, fast),
+                                 filepath)
+
+    def test_fast_checksum_is_size_and_crc32(self):
+        for filepath, contents in self.contents.items():
+            self.assertEqual(checksums.checksum_file(filepath, fast=True),
+                             '%d-%08x' % (len(contents), zlib.crc32(contents)),
+                             filepath)
+
+    def test_checksum_files_keeps_order(self):
+        filepaths = sorted(self.contents)
+        expected = [hashlib.md5(self.contents[filepath]).hexdigest()
+                    for filepath in filepaths]
+        for threads in (1, 4):
+            self.assertEqual(checksums.checksum_files(filepaths, threads=threads),
+                             expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
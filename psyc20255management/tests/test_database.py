@@ -0,0 +1,193 @@
+"""Tests of the bulk loading and updating of the database, on an in-memory
+SQLite database.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import datetime
+import unittest
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+from sqlalchemy import create_engine, inspect, select, func
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management import conf, database
+from psyc20255management.models import (Base, Lecturer, Report, Student,
+                                         LabGroupSequenceLecturer)
+from psyc20255management.utils.records import Submission, CompletedMarksheetRow
+
+#================================ End Imports ================================
+
+sequence_name = 'Experimental'
+
+
+def make_submissions(count):
+    'Return the `Submission`s of `count` students.'
+    timestamp = datetime.datetime(2017, 11, 14, 23, 30)
+    return {'N%07d' % i: Submission(filename = 'report %d.docx' % i,
+                                    filepath = 'report %d.docx' % i,
+                                    student_name = 'Student %d Name' % i,
+                                    student_id = 'N%07d' % i,
+                                    extension = '.docx',
+                                    timestamp = timestamp + datetime.timedelta(minutes=i),
+                                    checksum = '%032x' % i)
+            for i in range(count)}
+
+
+def make_completed_marksheets(submissions, grade):
+    'Return a `CompletedMarksheetRow` of each of `submissions`, all graded `grade`.'
+    return [CompletedMarksheetRow(student_name = submission.student_name,
+                                  student_id = student_id,
+                                  marker_name = 'Marker Name',
+                                  marker_email = 'marker@ntu.ac.uk',
+                                  grade = grade,
+                                  filepath = '%s.docx' % student_id)
+            for student_id, submission in submissions.items()]
+
+
+class TestInitializeDatabase(unittest.TestCase):
+
+    def test_older_database_is_brought_up_to_date(self):
+
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine)
+
+        # As made before the indexes, the report_duplicate table and the
+        # is_graded default were added.
+        with engine.begin() as connection:
+            for index_name in ('ix_report_marker',
+                               'ix_report_sequence_is_graded',
+                               'ix_student_labgroup_id'):
+                connection.execute('DROP INDEX %s' % index_name)
+            connection.execute('DROP TABLE report_duplicate')
+            connection.execute(Report.__table__.insert(),
+                               [dict(student = 'N0000000',
+                                     sequence = sequence_name,
+                                     is_graded = None)])
+
+        database.initialize_database(engine)
+
+        inspector = inspect(engine)
+        self.assertIn('report_duplicate', inspector.get_table_names())
+        for table in Base.metadata.sorted_tables:
+            self.assertLessEqual(
+                    {index.name for index in table.indexes},
+                    {index['name'] for index in inspector.get_indexes(table.name)},
+                    table.name)
+
+        with engine.connect() as connection:
+            self.assertEqual(
+                    connection.execute(select([Report.__table__.c.is_graded]))
+                    .fetchall(),
+                    [(False,)])
+
+        # And a second time changes nothing.
+        database.initialize_database(engine)
+
+
+class TestPopulateDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        database.initialize_database(self.engine)
+
+    def populate(self):
+        submissions = make_submissions(50)
+        students = [dict(uid = student_id,
+                         firstname = 'Student',
+                         lastname = '%s Name' % student_id,
+                         labgroup_id = conf.labgroups[i % len(conf.labgroups)])
+                    for i, student_id in enumerate(sorted(submissions))]
+        lecturers = [dict(uid = 'lecturer%d' % i,
+                          firstname = 'Lecturer',
+                          lastname = '%d' % i,
+                          email = 'lecturer%d@ntu.ac.uk' % i)
+                     for i in range(3)]
+        labgroup_lecturers = [dict(labgroup_id = labgroup_id,
+                                   sequence_id = sequence_name,
+                                   lecturer_id = 'lecturer%d' % (i % 3))
+                              for i, labgroup_id in enumerate(conf.labgroups)]
+        database.populate_database(self.engine,
+                                   students=students,
+                                   lecturers=lecturers,
+                                   labgroup_lecturers=labgroup_lecturers,
+                                   sequence_name=sequence_name,
+                                   submissions=submissions)
+
+    def count_rows(self):
+        with self.engine.connect() as connection:
+            return [connection.execute(select([func.count()])
+                                       .select_from(model.__table__)).scalar()
+                    for model in (Student, Lecturer,
+                                  LabGroupSequenceLecturer, Report)]
+
+    def test_second_populate_inserts_nothing(self):
+
+        self.populate()
+        self.assertEqual(self.count_rows(), [50, 3, len(conf.labgroups), 50])
+
+        self.populate()
+        self.assertEqual(self.count_rows(), [50, 3, len(conf.labgroups), 50])
+
+
+class TestUpdateReports(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        database.initialize_database(self.engine)
+        self.submissions = make_submissions(50)
+
+    def update(self, report_rows):
+        return database.update_reports(self.engine, sequence_name, report_rows)
+
+    def test_second_update_leaves_every_row_unchanged(self):
+
+        report_rows = database.get_report_rows(self.submissions)
+
+        self.assertEqual(self.update(report_rows), (50, 0, 0))
+        self.assertEqual(self.update(report_rows), (0, 0, 50))
+
+    def test_grades_update_rows_once(self):
+
+        self.update(database.get_report_rows(self.submissions))
+
+        grade_rows = database.get_grade_rows(
+                make_completed_marksheets(self.submissions, '21HIGH'))
+
+        self.assertEqual(self.update(grade_rows), (0, 50, 0))
+        self.assertEqual(self.update(grade_rows), (0, 0, 50))
+
+        # Grades and submissions together, as `database update` merges them.
+        report_rows = database.get_report_rows(self.submissions)
+        for student_id, values in grade_rows.items():
+            report_rows[student_id].update(values)
+        self.assertEqual(self.update(report_rows), (0, 0, 50))
+
+        with self.engine.connect() as connection:
+            rows = connection.execute(select([Report.__table__.c.grade,
+                                              Report.__table__.c.is_graded,
+                                              Report.__table__.c.checksum])).fetchall()
+        self.assertEqual({(row.grade, row.is_graded) for row in rows},
+                         {('21HIGH', True)})
+        self.assertEqual(sorted(row.checksum for row in rows),
+                         sorted(submission.checksum
+                                for submission in self.submissions.values()))
+
+    def test_only_changed_and_new_rows_are_written(self):
+
+        self.update(database.get_report_rows(self.submissions))
+
+        submissions = make_submissions(52)
+        submissions['N0000003'] = submissions['N0000003']._replace(checksum='f' * 32)
+
+        self.assertEqual(self.update(database.get_report_rows(submissions)),
+                         (2, 1, 49))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Tests of the reading of marksheets' paragraphs by `docxreader`, against
+python-docx, on a marksheet whose marker email is a hyperlink and whose
+other paragraphs have each kind of break.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import zipfile
+import tempfile
+import unittest
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+try:
+    import docx
+except ImportError:
+    docx = None
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.utils import docxreader, marksheets
+
+#================================ End Imports ================================
+
+marker_email = 'marker@ntu.ac.uk'
+
+# The runs of new marksheet paragraphs, as written by `MarksheetTemplate`,
+# and what they are replaced with.
+run_replacements = {
+    'Student name: Jane Doe':
+        '<w:r><w:t xml:space="preserve">Student name: Jane</w:t>'
+        '<w:noBreakHyphen/><w:t>Doe</w:t></w:r>',
+    'Student ID: N0123456':
+        '<w:r><w:t xml:space="preserve">Student ID: </w:t>'
+        '<w:br w:type="page"/><w:t>N0123456</w:t><w:br/></w:r>',
+    'Marker name: Marker Name':
+        '<w:r><w:t xml:space="preserve">Marker name:</w:t>'
+        '<w:ptab w:relativeTo="margin" w:alignment="left" w:leader="none"/>'
+        '<w:t>Marker</w:t><w:cr/><w:tab/>'
+        '<w:br w:type="textWrapping"/><w:br w:type="column"/><w:t>Name</w:t></w:r>',
+    'Marker email: %s' % marker_email:
+        '<w:r><w:t xml:space="preserve">Marker email: </w:t></w:r>'
+        '<w:hyperlink w:anchor="marker" w:history="1">'
+        '<w:r><w:t>%s</w:t></w:r></w:hyperlink>' % marker_email,
+}
+
+
+@unittest.skipIf(docx is None, 'python-docx is not installed')
+class TestReadMarksheetHeader(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.marksheet = os.path.join(cls.tmpdir.name, 'marksheet.docx')
+
+        template = marksheets.MarksheetTemplate()
+        document_xml = template.get_document_xml('Jane Doe',
+                                                 'N0123456',
+                                                 'Marker Name',
+                                                 marker_email)
+        for text, runs in run_replacements.items():
+            run = '<w:r><w:t xml:space="preserve">%s</w:t></w:r>' % text
+            assert run in document_xml
+            document_xml = document_xml.replace(run, runs)
+
+        with open(cls.marksheet, 'wb') as marksheet:
+            marksheet.write(template.base_zip_bytes)
+        with zipfile.ZipFile(cls.marksheet, 'a') as marksheet:
+            marksheet.writestr(template.document_xml_info,
+                               document_xml.encode('utf-8'))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_agrees_with_python_docx(self):
+        expected = [paragraph.text
+                    for paragraph in docx.Document(self.marksheet).paragraphs]
+        paragraphs, _ = docxreader.read_marksheet_header(self.marksheet,
+                                                         len(expected))
+        self.assertEqual(paragraphs, expected)
+
+    def test_hyperlinked_marker_email(self):
+        paragraphs, _ = docxreader.read_marksheet_header(
+                self.marksheet,
+                marksheets.MarksheetModel.marker_email_par_index + 1)
+        match = marksheets.MarksheetModel.marker_email_pattern.match(
+                paragraphs[marksheets.MarksheetModel.marker_email_par_index])
+        self.assertEqual(match.group(1), marker_email)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""Tests of the parsing of submitted report filenames, against
+`datetime.strptime`, which it replaced.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import random
+import datetime
+import unittest
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.utils import filenames
+
+#================================ End Imports ================================
+
+timestamp_format = '%d %B, %Y %I%M %p'
+
+
+def strptime_or_none(timestamp_str):
+    'Return what `datetime.strptime` parses, or None if it raises.'
+    try:
+        return datetime.datetime.strptime(timestamp_str, timestamp_format)
+    except ValueError:
+        return None
+
+
+def parse_timestamp_or_none(timestamp_str):
+    'Return what `filenames.parse_timestamp` parses, or None if it raises.'
+    try:
+        return filenames.parse_timestamp(timestamp_str)
+    except ValueError:
+        return None
+
+
+class TestParseTimestamp(unittest.TestCase):
+
+    def test_agrees_with_strptime(self):
+
+        random_state = random.Random(101)
+        start = datetime.datetime(2010, 1, 1)
+
+        for _ in range(2000):
+            timestamp = start + datetime.timedelta(
+                    minutes=random_state.randrange(20 * 366 * 24 * 60))
+            timestamp_str = timestamp.strftime(timestamp_format)
+            self.assertEqual(filenames.parse_timestamp(timestamp_str),
+                             timestamp,
+                             timestamp_str)
+
+    def test_agrees_with_strptime_on_unusual_timestamps(self):
+
+        timestamp_strs = ['1 November, 2017 1130 PM',
+                          '01 november, 2017 1130 pm',
+                          ' 1 NOVEMBER, 2017 1130 Pm',
+                          '14 November, 2017 130 AM',
+                          '14 November, 2017 0130 AM',
+                          '14 November, 2017 1205 AM',
+                          '14 November, 2017 1205 PM',
+                          '14 November, 2017 15 AM',
+                          '14  November,  2017  1130  PM',
+                          '29 February, 2016 1130 PM',
+                          '29 February, 2017 1130 PM',
+                          '31 April, 2017 1130 PM',
+                          '32 November, 2017 1130 PM',
+                          '0 November, 2017 1130 PM',
+                          '14 Novembre, 2017 1130 PM',
+                          '14 November 2017 1130 PM',
+                          '14 November, 17 1130 PM',
+                          '14 November, 2017 1360 PM',
+                          '14 November, 2017 1330 PM',
+                          '14 November, 2017 1130',
+                          '14 November, 2017 1130 PM ',
+                          '']
+
+        for timestamp_str in timestamp_strs:
+            self.assertEqual(parse_timestamp_or_none(timestamp_str),
+                             strptime_or_none(timestamp_str),
+                             repr(timestamp_str))
+
+
+class TestParseSubmittedReportFilename(unittest.TestCase):
+
+    def test_parses_fields(self):
+
+        fname = '12345-10001 - N0123456 - Jane Doe- 14 November, 2017 1130 PM'\
+                ' - report.docx'
+
+        self.assertEqual(filenames.parse_submitted_report_filename(fname),
+                         filenames.SubmittedReportFilename(
+                                 dropbox_id = '12345-10001',
+                                 student_id = 'N0123456',
+                                 student_name = 'Jane Doe',
+                                 timestamp = datetime.datetime(2017, 11, 14, 23, 30),
+                                 document_name = 'report.docx'))
+
+    def test_malformed_is_none(self):
+
+        for fname in ['report.docx',
+                      '12345-10001 - N0123456 - Jane Doe- 14 Nov, 2017 1130 PM'
+                      ' - report.docx']:
+            self.assertIsNone(filenames.parse_submitted_report_filename(fname))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""Tests of the reading of marksheets' grade dropdowns by incremental
+parsing, against the BeautifulSoup reading that it replaced, on marksheets
+made by `fixtures`, with each of its damaged dropdowns.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import random
+import zipfile
+import tempfile
+import unittest
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management import conf
+from psyc20255management.utils import docxreader, marksheets
+from psyc20255management.tests.fixtures import (CorpusMarksheetTemplate,
+                                                 dropdown_damages,
+                                                 make_completed_marksheets)
+
+#================================ End Imports ================================
+
+
+def read_dropdown_text_bs4(marksheet):
+
+    '''The previous reading of the grade dropdown: the whole xml as a
+    BeautifulSoup tree, or None if it has no dropdown.'''
+
+    with zipfile.ZipFile(marksheet) as document:
+        xml_data = document.read('word/document.xml')
+    soup = BeautifulSoup(xml_data, 'xml')
+    try:
+        return soup.find('sdt').find('sdtContent').text
+    except AttributeError:
+        return None
+
+
+def read_dropdown_text(marksheet, chunk_size=16384):
+    'Read the grade dropdown as `get_grade_from_marksheet` does.'
+    return docxreader.read_marksheet_header(marksheet, 0, chunk_size)[1]
+
+
+def get_grade_or_none(marksheet):
+    'Return the grade of a marksheet, or None if it can not be read.'
+    try:
+        return marksheets.get_grade_from_marksheet(marksheet)
+    except AssertionError:
+        return None
+
+
+@unittest.skipIf(BeautifulSoup is None, 'BeautifulSoup is not installed')
+class TestReadDropdownText(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmpdir = tempfile.TemporaryDirectory()
+
+        # A marksheet with each damage, and with none, for each grade, and a
+        # random corpus as made for the benchmarks.
+        template = CorpusMarksheetTemplate()
+        cls.manifest = []
+        for damage in [None] + sorted(dropdown_damages):
+            for grade in conf.grades:
+                fname = '%s %s.docx' % (damage, grade)
+                template.make_graded_marksheet('Experimental',
+                                               grade,
+                                               damage,
+                                               'Jane Doe',
+                                               'N0123456',
+                                               'Marker Name',
+                                               'marker@ntu.ac.uk',
+                                               os.path.join(cls.tmpdir.name, fname))
+                cls.manifest.append(dict(filename = fname,
+                                         grade = grade,
+                                         damage = damage,
+                                         is_valid = damage is None
+                                                    or dropdown_damages[damage]))
+
+        corpus_dirname = os.path.join(cls.tmpdir.name, 'corpus')
+        os.mkdir(corpus_dirname)
+        random.seed(101)
+        for marksheet in make_completed_marksheets(corpus_dirname, 50, 0.5):
+            marksheet['filename'] = os.path.join('corpus', marksheet['filename'])
+            cls.manifest.append(marksheet)
+
+        # BeautifulSoup is slow, so each marksheet is read with it just once.
+        for marksheet in cls.manifest:
+            marksheet['filepath'] = os.path.join(cls.tmpdir.name,
+                                                 marksheet['filename'])
+            marksheet['bs4_text'] = read_dropdown_text_bs4(marksheet['filepath'])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_agrees_with_bs4(self):
+        for marksheet in self.manifest:
+            self.assertEqual(read_dropdown_text(marksheet['filepath']),
+                             marksheet['bs4_text'],
+                             marksheet['filename'])
+
+    def test_agrees_with_bs4_in_small_chunks(self):
+        for marksheet in self.manifest[::7]:
+            for chunk_size in (1, 2, 7, 64):
+                self.assertEqual(read_dropdown_text(marksheet['filepath'],
+                                                    chunk_size),
+                                 marksheet['bs4_text'],
+                                 '%s, chunks of %d' % (marksheet['filename'],
+                                                       chunk_size))
+
+    def test_normalized_grades_agree_with_bs4(self):
+        for marksheet in self.manifest:
+            text = marksheet['bs4_text']
+            expected = None if text is None else marksheets.normalize_grade(text)
+            self.assertEqual(get_grade_or_none(marksheet['filepath']),
+                             expected if expected in conf.grades else None,
+                             marksheet['filename'])
+
+    def test_grades(self):
+        for marksheet in self.manifest:
+            grade = get_grade_or_none(marksheet['filepath'])
+            if marksheet['damage'] == 'removed':
+                # The grade is typed into the paragraph, with no dropdown.
+                self.assertIsNone(grade, marksheet['filename'])
+            elif marksheet['is_valid']:
+                self.assertEqual(grade, marksheet['grade'], marksheet['filename'])
+            else:
+                self.assertIsNone(grade, marksheet['filename'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""Tests of the writing of processed marksheets' rows, as csv and JSON lines,
+with the names that the old joined string output garbled.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import io
+import csv
+import json
+import unittest
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.utils import marksheets
+from psyc20255management.utils.records import CompletedMarksheetRow
+
+#================================ End Imports ================================
+
+rows = [CompletedMarksheetRow(student_name = 'Doe, Jane',
+                              student_id = 'N0000001',
+                              marker_name = 'Marker "Mark" Name',
+                              marker_email = 'marker@ntu.ac.uk',
+                              grade = '21HIGH',
+                              filepath = '/marking/Doe, Jane__N0000001__marksheet.docx'),
+        CompletedMarksheetRow(student_name = "O'Neil\nSmith",
+                              student_id = 'N0000002',
+                              marker_name = 'Marker Name',
+                              marker_email = 'marker@ntu.ac.uk',
+                              grade = 'FMARG',
+                              filepath = '/marking/O_Neil__N0000002__marksheet.docx')]
+
+
+class TestWriteCompletedMarksheets(unittest.TestCase):
+
+    def write(self, output_format):
+        output = io.StringIO()
+        marksheets.write_completed_marksheets(rows, output, output_format)
+        return output.getvalue()
+
+    def test_csv_is_quoted(self):
+        output = self.write('csv')
+        self.assertIn('"Doe, Jane"', output)
+        self.assertEqual([CompletedMarksheetRow(*row)
+                          for row in csv.reader(io.StringIO(output))],
+                         rows)
+
+    def test_jsonl(self):
+        output = self.write('jsonl')
+        self.assertEqual([CompletedMarksheetRow(**json.loads(line))
+                          for line in output.splitlines()],
+                         rows)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            self.write('xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
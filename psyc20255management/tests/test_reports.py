@@ -0,0 +1,84 @@
+"""Tests of the reading of submissions straight from the NOW dropbox zip file,
+against the reading of the directory that it would be extracted to.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import random
+import zipfile
+import tempfile
+import unittest
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.utils import reports
+from psyc20255management.tests.fixtures import make_dropbox, make_dropbox_zip
+
+#================================ End Imports ================================
+
+
+class TestSubmittedReportsFromZip(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.dropbox_dirname = os.path.join(cls.tmpdir.name, 'dropbox')
+        cls.dropbox_zip = os.path.join(cls.tmpdir.name, 'dropbox.zip')
+        os.mkdir(cls.dropbox_dirname)
+
+        random.seed(101)
+        make_dropbox(cls.dropbox_dirname, 40, 2, 4096)
+        make_dropbox_zip(cls.dropbox_dirname, cls.dropbox_zip)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_zip_listing_is_directory_listing(self):
+
+        submissions = reports.get_submitted_reports_list(self.dropbox_dirname)
+        zip_submissions\
+                = reports.get_submitted_reports_list_from_zip(self.dropbox_zip)
+
+        self.assertEqual(len(submissions), 40)
+
+        # The same, but for where each file is.
+        self.assertEqual({student_id: submission._replace(filepath=None)
+                          for student_id, submission in zip_submissions.items()},
+                         {student_id: submission._replace(filepath=None)
+                          for student_id, submission in submissions.items()})
+        for submission in zip_submissions.values():
+            self.assertEqual(submission.filepath,
+                             'submissions/' + submission.filename)
+
+    def test_copies_from_zip_are_copies_from_directory(self):
+
+        submissions = reports.get_submitted_reports_list(self.dropbox_dirname)
+        zip_submissions\
+                = reports.get_submitted_reports_list_from_zip(self.dropbox_zip)
+
+        with tempfile.TemporaryDirectory() as new_dirname,\
+                tempfile.TemporaryDirectory() as new_zip_dirname,\
+                zipfile.ZipFile(self.dropbox_zip) as dropbox:
+
+            for student_id, submission in submissions.items():
+
+                new_filename = reports.copy_report(submission, new_dirname)
+                self.assertEqual(
+                        reports.copy_report_from_zip(dropbox,
+                                                     zip_submissions[student_id],
+                                                     new_zip_dirname),
+                        new_filename)
+
+                with open(os.path.join(new_dirname, new_filename), 'rb') as copy,\
+                        open(os.path.join(new_zip_dirname, new_filename), 'rb')\
+                        as zip_copy:
+                    self.assertEqual(zip_copy.read(), copy.read(), new_filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
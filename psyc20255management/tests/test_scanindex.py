@@ -0,0 +1,136 @@
+"""Tests of the refreshing of a persistent `ScanIndex` as files are added to
+and removed from its directory.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import re
+import time
+import tempfile
+import unittest
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from psyc20255management.utils import scanindex
+
+#================================ End Imports ================================
+
+fname_pattern = re.compile(r'(N\d{7})\.docx$')
+
+
+def parse_fname(fname):
+    pattern_match = fname_pattern.match(fname)
+    return pattern_match.groups() if pattern_match else None
+
+
+class TestScanIndex(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dirname = os.path.join(self.tmpdir.name, 'marking')
+        os.mkdir(self.dirname)
+        self.index_filename = os.path.join(self.tmpdir.name, 'index.pickle')
+
+        for fname in ['N%07d.docx' % i for i in range(5)] + ['notes.txt']:
+            self.add_file(fname)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def add_file(self, fname):
+        with open(os.path.join(self.dirname, fname), 'w') as f:
+            f.write(fname)
+
+    def settle(self):
+        'Date the directory back beyond `scanindex.racy_seconds`.'
+        settled_time = time.time() - 10 * scanindex.racy_seconds
+        os.utime(self.dirname, (settled_time, settled_time))
+
+    def scan(self):
+
+        '''Scan with the index from disk, save it, and return the entries and
+        the parsed and reused counts.'''
+
+        scan_index = scanindex.ScanIndex(self.dirname,
+                                         parse_fname,
+                                         self.index_filename)
+        entries = scan_index.scan()
+        scan_index.save()
+
+        return entries, scan_index.parsed_count, scan_index.reused_count
+
+    def test_first_scan_parses_every_file(self):
+
+        entries, parsed_count, reused_count = self.scan()
+
+        self.assertEqual((parsed_count, reused_count), (6, 0))
+        self.assertEqual([entry.name for entry in entries],
+                         sorted(os.listdir(self.dirname)))
+        self.assertEqual([entry.parsed for entry in entries],
+                         [('N%07d' % i,) for i in range(5)] + [None])
+
+    def test_unchanged_directory_is_reused(self):
+
+        self.settle()
+        entries, _, _ = self.scan()
+
+        self.assertEqual(self.scan(), (entries, 0, 6))
+
+    def test_added_and_removed_files(self):
+
+        self.scan()
+
+        self.add_file('N0000009.docx')
+        os.remove(os.path.join(self.dirname, 'N0000001.docx'))
+
+        entries, parsed_count, reused_count = self.scan()
+
+        self.assertEqual((parsed_count, reused_count), (1, 5))
+        self.assertEqual([entry.name for entry in entries],
+                         sorted(os.listdir(self.dirname)))
+
+    def test_added_file_after_settled_scan(self):
+
+        self.settle()
+        self.scan()
+
+        # The directory's modification time moves on, so it is listed again.
+        self.add_file('N0000009.docx')
+
+        entries, parsed_count, reused_count = self.scan()
+
+        self.assertEqual((parsed_count, reused_count), (1, 6))
+        self.assertIn(('N0000009',), [entry.parsed for entry in entries])
+
+    def test_recently_modified_directory_is_listed_again(self):
+
+        self.scan()
+
+        # The directory was modified within `racy_seconds` of the first scan,
+        # so a file added within the same tick of its clock would not have
+        # changed its modification time, and it is not trusted.
+        stat = os.stat(self.dirname)
+        self.add_file('N0000009.docx')
+        os.utime(self.dirname, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        entries, parsed_count, _ = self.scan()
+
+        self.assertEqual(parsed_count, 1)
+        self.assertEqual(len(entries), 7)
+
+    def test_damaged_index_starts_afresh(self):
+
+        with open(self.index_filename, 'wb') as index_file:
+            index_file.write(b'Not a pickle.')
+
+        entries, parsed_count, reused_count = self.scan()
+
+        self.assertEqual((len(entries), parsed_count, reused_count), (6, 6, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
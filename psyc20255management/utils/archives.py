@@ -0,0 +1,262 @@
+"""Exporting the completed marking, as zip archives to send back and keep.
+
+Each marker gets an archive of the completed marksheets of their students,
+and the students' renamed reports, and each student gets an archive of
+their own marksheet and report. The marksheets are as found by
+`marksheets.process_completed_marksheets`, and the reports are streamed
+straight out of the NOW dropbox zip file, as `reports.copy_report_from_zip`
+streams them.
+
+Each file is read once, and written to the archive of its marker and that
+of its student at the same time, chunk by chunk, with no copy in between.
+Files that are already compressed, e.g. docx and pdf files, are stored as
+they are, and the rest are deflated. The archives of each marker, and of
+their students, are written by one of a pool of threads.
+
+Archives do not depend on when, or in what order, they are written: their
+members are in order, and have a fixed date and permissions, so exporting
+the same marking again gives the same archives, byte for byte.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import time
+import zipfile
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from .. import conf
+from . import checksums, profiling, reports
+
+#================================ End Imports ================================
+
+# The members with these extensions are already compressed, as they are zip
+# files themselves, or images, or PDFs with compressed streams.
+stored_extensions = ('.docx', '.xlsx', '.pptx', '.pdf', '.zip', '.png', '.jpg', '.jpeg')
+
+# The date of every member of an archive.
+member_date_time = (1980, 1, 1, 0, 0, 0)
+
+# A file to put in the archives of a marker and a student: its name in the
+# archives, and its path, or its name within the dropbox zip file if
+# `in_dropbox`, and the checksum it should have, or None.
+ArchiveSource = namedtuple('ArchiveSource',
+                           ['arcname',
+                            'filepath',
+                            'in_dropbox',
+                            'checksum'])
+
+
+def get_marker_archive_fname(archive_dirname, marker_name):
+    'Return the path of the archive of the marker `marker_name`.'
+    return os.path.join(archive_dirname,
+                        'markers',
+                        conf.marker_archive_fname_template
+                        % marker_name.replace(' ', '_'))
+
+
+def get_student_archive_fname(archive_dirname, student_name, student_id):
+    'Return the path of the archive of a student.'
+    return os.path.join(archive_dirname,
+                        'students',
+                        conf.student_archive_fname_template
+                        % (student_name.replace(' ', '_'), student_id))
+
+
+def get_member_info(arcname):
+
+    '''Return the `zipfile.ZipInfo` of a member `arcname` of an archive, which
+    is stored if its extension is one of `stored_extensions`, and deflated
+    otherwise.'''
+
+    member_info = zipfile.ZipInfo(arcname, date_time=member_date_time)
+    member_info.create_system = 3
+    member_info.external_attr = 0o644 << 16
+
+    if os.path.splitext(arcname)[1].lower() in stored_extensions:
+        member_info.compress_type = zipfile.ZIP_STORED
+    else:
+        member_info.compress_type = zipfile.ZIP_DEFLATED
+
+    return member_info
+
+
+def get_archive_plan(completed_marksheets, submissions):
+
+    '''Return what goes in each archive, as a dictionary, keyed by marker
+    name, of a list of the (student_name, student_id, sources) of each of
+    their students, in order of student ID, where the sources are the
+    `ArchiveSource`s of the student's marksheet and, if they have one, their
+    report.
+
+    `completed_marksheets` are the rows of `process_completed_marksheets`,
+    and `submissions` those of `reports.get_submitted_reports_list_from_zip`.
+
+    '''
+
+    plan = {}
+
+    for row in sorted(completed_marksheets, key=lambda row: row.student_id):
+
+        sources = [ArchiveSource(arcname = os.path.basename(row.filepath),
+                                 filepath = row.filepath,
+                                 in_dropbox = False,
+                                 checksum = None)]
+
+        submission = submissions.get(row.student_id)
+        if submission is not None:
+            sources.append(
+                    ArchiveSource(arcname = reports.get_new_report_filename(submission),
+                                  filepath = submission.filepath,
+                                  in_dropbox = True,
+                                  checksum = submission.checksum))
+
+        plan.setdefault(row.marker_name, []).append((row.student_name,
+                                                     row.student_id,
+                                                     sources))
+
+    return {marker_name: plan[marker_name] for marker_name in sorted(plan)}
+
+
+def open_source(source, dropbox):
+    'Open an `ArchiveSource` for reading, from the open zip file `dropbox`.'
+    if source.in_dropbox:
+        return dropbox.open(source.filepath)
+    return open(source.filepath, 'rb')
+
+
+def write_member(source, dropbox, archives):
+
+    '''Write the file `source`, an `ArchiveSource`, to each of the open zip
+    files `archives`, as it is read, chunk by chunk, checking its checksum if
+    it has one. Return the number of bytes read.'''
+
+    hasher = None if source.checksum is None else checksums.get_hasher()
+    size = 0
+
+    with open_source(source, dropbox) as stream:
+
+        # Each archive has its own ZipInfo, as writing a member sets its
+        # offset and sizes.
+        members = [archive.open(get_member_info(source.arcname), 'w')
+                   for archive in archives]
+        try:
+            for chunk in checksums.iter_chunks(stream):
+                if hasher is not None:
+                    hasher.update(chunk)
+                for member in members:
+                    member.write(chunk)
+                size += len(chunk)
+        finally:
+            for member in members:
+                member.close()
+
+    assert hasher is None or hasher.hexdigest() == source.checksum,\
+            'Checksum of %s changed while archiving.' % source.arcname
+
+    return size
+
+
+@profiling.timed('archive writing')
+def write_marker_archives(marker_name, students, dropbox, archive_dirname):
+
+    '''Write the archive of the marker `marker_name`, and those of their
+    `students`, from the `get_archive_plan`. Return the number of files and
+    of bytes read.'''
+
+    marker_archive_fname = get_marker_archive_fname(archive_dirname, marker_name)
+    file_count, total_size = 0, 0
+
+    # Each archive is written under a temporary name and then renamed, so that
+    # an archive is never left half written.
+    with zipfile.ZipFile(marker_archive_fname + '.tmp', 'w') as marker_archive:
+
+        for student_name, student_id, sources in students:
+
+            student_archive_fname = get_student_archive_fname(archive_dirname,
+                                                              student_name,
+                                                              student_id)
+
+            with zipfile.ZipFile(student_archive_fname + '.tmp', 'w')\
+                    as student_archive:
+                for source in sources:
+                    total_size += write_member(source,
+                                               dropbox,
+                                               (marker_archive, student_archive))
+                    file_count += 1
+
+            os.replace(student_archive_fname + '.tmp', student_archive_fname)
+
+    os.replace(marker_archive_fname + '.tmp', marker_archive_fname)
+
+    return file_count, total_size
+
+
+def export_archives(completed_marksheets,
+                    submissions,
+                    submissions_dropbox_zip,
+                    archive_dirname,
+                    threads=4):
+
+    '''Write the archives of each marker, and each student, of the
+    `completed_marksheets` and the `submissions`, from the dropbox zip file
+    `submissions_dropbox_zip` (see `get_archive_plan`), into the `markers`
+    and `students` directories of `archive_dirname`. The archives of at most
+    `threads` markers are written at a time.
+
+    Return a dictionary with keys
+    * markers, the number of marker archives
+    * students, the number of student archives
+    * missing_reports, the student IDs of the students with no report
+    * files, the number of files archived
+    * bytes, the number of bytes archived
+    * seconds, the time taken
+
+    '''
+
+    plan = get_archive_plan(completed_marksheets, submissions)
+
+    for subdirname in ('markers', 'students'):
+        os.makedirs(os.path.join(archive_dirname, subdirname), exist_ok=True)
+
+    missing_reports = [student_id
+                       for students in plan.values()
+                       for _, student_id, sources in students
+                       if len(sources) == 1]
+
+    start = time.perf_counter()
+
+    # Reading members of one zip file from many threads is safe, as each
+    # read seeks and reads under the zip file's lock.
+    with zipfile.ZipFile(submissions_dropbox_zip) as dropbox,\
+            ThreadPool(threads) as pool:
+        results = pool.starmap(write_marker_archives,
+                               [(marker_name, students, dropbox, archive_dirname)
+                                for marker_name, students in plan.items()])
+
+    return dict(markers = len(plan),
+                students = sum(len(students) for students in plan.values()),
+                missing_reports = missing_reports,
+                files = sum(file_count for file_count, _ in results),
+                bytes = sum(size for _, size in results),
+                seconds = time.perf_counter() - start)
+
+
+def format_export_summary(summary):
+
+    '''Return the throughput of an `export_archives` summary as a sentence.'''
+
+    seconds = max(summary['seconds'], 1e-9)
+
+    return 'Archived %d files (%.1f MB) for %d markers and %d students'\
+           ' in %.2f s: %.1f MB/s.' % (summary['files'],
+                                       summary['bytes'] / 1e6,
+                                       summary['markers'],
+                                       summary['students'],
+                                       summary['seconds'],
+                                       summary['bytes'] / 1e6 / seconds)
@@ -0,0 +1,296 @@
+"""Utilities for assigning submitted reports to markers.
+
+Markers are either given, in a csv file (see `read_marking_assignments`), or
+scheduled by `schedule_marking`, from the lecturers who mark each lab group.
+The schedule is greedy, longest processing time first: the reports are taken
+from those with the fewest eligible markers to those with the most, and from
+the largest to the smallest, and each is given to whichever of its eligible
+markers has the least marking so far, and still has capacity. The
+markers of each set of eligible markers are kept in a heap, by their load,
+so that a schedule of n reports among m markers takes O(n log m) time.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import csv
+import heapq
+import zipfile
+from collections import namedtuple
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from .. import conf
+from . import reports, marksheets
+
+#================================ End Imports ================================
+
+# The ways in which the marking of each report may be weighed, when it is
+# balanced between markers: by its size, or just as one report.
+balance_weights = ('bytes', 'reports')
+
+# A schedule of marking, from `schedule_marking`. The assignments are the
+# marker of each student's report, keyed by student ID, the loads and counts
+# are the total weight and number of reports of each marker, and the
+# unassigned are the student IDs of the reports that no marker could take.
+MarkingSchedule = namedtuple('MarkingSchedule',
+                             ['assignments',
+                              'loads',
+                              'counts',
+                              'unassigned'])
+
+
+def read_marking_assignments(marking_assignments_fname):
+
+    '''Return the marking assignments in the csv file
+    `marking_assignments_fname` as a dictionary, keyed by student ID, of
+    (marker name, marker email) tuples.
+
+    The csv file should have a header row, with columns `student_id`,
+    `marker_name` and `marker_email`.
+
+    '''
+
+    with open(marking_assignments_fname, newline='') as csv_file:
+        return {row['student_id']: (row['marker_name'], row['marker_email'])
+                for row in csv.DictReader(csv_file)}
+
+
+def read_marker_capacities(capacities_fname):
+
+    '''Return the most reports that each lecturer can mark, from the csv file
+    `capacities_fname`, as a dictionary keyed by lecturer uid.
+
+    The csv file should have a header row, with columns `lecturer_id` and
+    `capacity`.
+
+    '''
+
+    with open(capacities_fname, newline='') as csv_file:
+        return {row['lecturer_id']: int(row['capacity'])
+                for row in csv.DictReader(csv_file)}
+
+
+def get_report_weights(submissions_dropbox_zip, submissions, balance='bytes'):
+
+    '''Return the weight of the marking of each of the `submissions`, as
+    returned by `reports.get_submitted_reports_list_from_zip`, keyed by
+    student ID. If `balance` is 'bytes', it is the size of the report, from
+    the central directory of the dropbox zip file `submissions_dropbox_zip`,
+    and if it is 'reports', it is 1.'''
+
+    assert balance in balance_weights,\
+            'Unknown balance %s, not one of %s.' % (balance, ', '.join(balance_weights))
+
+    if balance == 'reports':
+        return dict.fromkeys(submissions, 1)
+
+    with zipfile.ZipFile(submissions_dropbox_zip) as dropbox:
+        return {student_id: dropbox.getinfo(submission.filepath).file_size
+                for student_id, submission in submissions.items()}
+
+
+def schedule_marking(reports, markers, capacities=None):
+
+    '''Return the `MarkingSchedule` of `reports` among `markers`.
+
+    `reports` is a list of (student ID, weight, eligible markers) of each
+    report, where the eligible markers are those who may mark it, e.g. the
+    lecturers of the student's lab group, or none, in which case any of
+    `markers` may. `markers` is a list of the uids of the markers, and
+    `capacities`, if given, is the most reports that each may mark, keyed by
+    uid. Markers who are not in `capacities` have no limit.
+
+    Each report goes to the eligible marker with the least load so far. The
+    reports with the fewest eligible markers are scheduled first, so that
+    markers' capacities go first to the reports that only they may mark, and
+    then the heaviest reports first. Reports of equal weight are scheduled
+    in order of student ID, and ties between markers are broken by uid, so
+    the same reports and markers give the same schedule.
+
+    '''
+
+    if capacities is None:
+        capacities = {}
+
+    all_markers = frozenset(markers)
+
+    loads = dict.fromkeys(markers, 0)
+    counts = dict.fromkeys(markers, 0)
+    assignments = {}
+    unassigned = []
+
+    # A heap of (load, uid) of each set of eligible markers. The loads in a
+    # heap may be out of date, as a marker may be in several sets, and are
+    # brought up to date as they reach the top. As loads only grow, the top
+    # marker, once up to date, has the least load.
+    heaps = {}
+
+    # The eligible markers of each report, or all of them if it has none.
+    reports = [(student_id,
+                weight,
+                frozenset(eligible_markers) & all_markers\
+                        if eligible_markers else all_markers)
+               for student_id, weight, eligible_markers in reports]
+
+    # The reports that fewest markers may mark are scheduled first, so that
+    # the reports that more markers may mark can not use up the capacity of
+    # the only markers of others. Then, the heaviest are scheduled first.
+    for student_id, weight, eligible_markers\
+            in sorted(reports, key=lambda report: (len(report[2]),
+                                                   -report[1],
+                                                   report[0])):
+
+        heap = heaps.get(eligible_markers)
+        if heap is None:
+            heap = heaps[eligible_markers]\
+                    = [(loads[uid], uid) for uid in eligible_markers]
+            heapq.heapify(heap)
+
+        while heap:
+            load, uid = heap[0]
+            if uid in capacities and counts[uid] >= capacities[uid]:
+                heapq.heappop(heap)
+            elif load != loads[uid]:
+                heapq.heapreplace(heap, (loads[uid], uid))
+            else:
+                break
+
+        if not heap:
+            unassigned.append(student_id)
+            continue
+
+        assignments[student_id] = uid
+        loads[uid] += weight
+        counts[uid] += 1
+        heapq.heapreplace(heap, (loads[uid], uid))
+
+    return MarkingSchedule(assignments = assignments,
+                           loads = loads,
+                           counts = counts,
+                           unassigned = unassigned)
+
+
+def get_marker_batches(schedule):
+
+    '''Return the student IDs of the reports of each marker in the
+    `MarkingSchedule` `schedule`, in order, keyed by marker uid.'''
+
+    batches = {uid: [] for uid in schedule.loads}
+    for student_id in sorted(schedule.assignments):
+        batches[schedule.assignments[student_id]].append(student_id)
+
+    return batches
+
+
+def get_scheduled_marking_assignments(schedule, lecturers):
+
+    '''Return the marking assignments of the `MarkingSchedule` `schedule`,
+    as `read_marking_assignments` would, where `lecturers` are the details of
+    each marker, keyed by uid, e.g. as returned by `database.get_lecturers`.'''
+
+    marking_assignments = {}
+
+    for uid, student_ids in get_marker_batches(schedule).items():
+        lecturer = lecturers[uid]
+        marker = ('%s %s' % (lecturer['firstname'], lecturer['lastname']),
+                  lecturer['email'])
+        for student_id in student_ids:
+            marking_assignments[student_id] = marker
+
+    return marking_assignments
+
+
+def format_schedule(schedule, balance='bytes'):
+
+    '''Return the number of reports and the load of each marker in the
+    `MarkingSchedule` `schedule`, as a list of lines of a table, where the
+    load is in kilobytes if `balance` is 'bytes'.'''
+
+    unit = 'kB' if balance == 'bytes' else 'reports'
+    scale = 1024 if balance == 'bytes' else 1
+
+    lines = ['%-20s %8s %12s' % ('Marker', 'reports', 'load ' + unit)]
+    for uid in sorted(schedule.loads):
+        lines.append('%-20s %8d %12.1f' % (uid,
+                                           schedule.counts[uid],
+                                           schedule.loads[uid] / scale))
+
+    return lines
+
+
+def get_marker_dirname(marking_dirname, marker_name):
+    'Return the name of the directory of a marker, within `marking_dirname`.'
+    return os.path.join(marking_dirname, marker_name.replace(' ', '_'))
+
+
+def create_marking_assignments(submissions_dropbox_zip,
+                               marking_assignments,
+                               marking_dirname,
+                               threads=4,
+                               progress_output=None,
+                               submissions=None):
+
+    '''Give each marker their reports to mark, and a new marksheet for each.
+
+    The most recent submission of each student is taken straight from the
+    NOW dropbox zip file `submissions_dropbox_zip` and copied, renamed, into
+    the directory of the student's marker (see `get_marker_dirname`) in
+    `marking_dirname`, along with a new marksheet for it. Markers are assigned
+    by `marking_assignments`, as returned by `read_marking_assignments` or
+    `get_scheduled_marking_assignments`. The `submissions` are listed from
+    the zip file, unless they already have been, and are given.
+
+    The reports are copied, and the marksheets written, by pools of
+    `threads` threads. Progress is written to `progress_output`, if given
+    (see `reports.intake_reports`).
+
+    Return the list of submissions of students who have no marker, which are
+    not copied, and the summary of the copying from `reports.intake_reports`.
+
+    '''
+
+    if submissions is None:
+        submissions\
+                = reports.get_submitted_reports_list_from_zip(submissions_dropbox_zip)
+
+    unassigned_submissions = []
+    report_copies = []
+    marksheet_rows = []
+
+    for student_id in sorted(submissions):
+
+        submission = submissions[student_id]
+
+        if student_id not in marking_assignments:
+            unassigned_submissions.append(submission)
+            continue
+
+        marker_name, marker_email = marking_assignments[student_id]
+        marker_dirname = get_marker_dirname(marking_dirname, marker_name)
+        os.makedirs(marker_dirname, exist_ok=True)
+
+        report_copies.append((submission, marker_dirname))
+
+        new_marksheet_name\
+                = os.path.join(marker_dirname,
+                               conf.marksheet_fname_template
+                               % (submission.student_name, student_id))
+
+        marksheet_rows.append((submission.student_name,
+                               student_id,
+                               marker_name,
+                               marker_email,
+                               new_marksheet_name))
+
+    with zipfile.ZipFile(submissions_dropbox_zip) as dropbox:
+        intake_summary = reports.intake_reports(report_copies,
+                                                threads=threads,
+                                                dropbox=dropbox,
+                                                progress_output=progress_output)
+
+    marksheets.make_new_marksheets(marksheet_rows, threads=threads)
+
+    return unassigned_submissions, intake_summary
@@ -0,0 +1,157 @@
+"""A persistent cache of the results of processing completed marksheets.
+
+Marksheets trickle into the completed marking directory over weeks, and we
+process that directory many times over. The results of processing each
+marksheet are cached on disk, so that only new or changed marksheets need to
+be parsed again.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import pickle
+import hashlib
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from .. import conf
+from . import checksums, profiling
+
+#================================ End Imports ================================
+
+
+class MarksheetCache(object):
+
+    '''An on-disk cache of the results of `read_completed_marksheet`.
+
+    Each entry is keyed by the marksheet's path, and records the file's size,
+    modification time and checksum, and the (header, exception) result of
+    reading it, where the exception is always None, as only marksheets that
+    were read are cached. One that could not be read, e.g. as it was still
+    being copied in, is read again next time. What is read does not depend on the sequence, which is
+    checked afterwards, so the one entry serves a batch of every sequence as
+    well as a directory of one. An entry is used if the file's size and
+    modification time are unchanged or, failing that, if its checksum is
+    unchanged, e.g. when a marksheet has been copied in again as is.
+
+    The counts of cache hits and misses are kept in `hits` and `misses`.
+
+    '''
+
+    version = 5
+
+    def __init__(self, cache_filename):
+
+        self.cache_filename = cache_filename
+        self.entries = {}
+
+        self.hits = 0
+        self.misses = 0
+
+        # Checksums calculated on a cache miss, kept for when the result is
+        # stored, so that each changed file is only checksummed once.
+        self._new_checksums = {}
+
+        if os.path.exists(self.cache_filename):
+            # A cache of an older version, or a damaged one, may not even
+            # unpickle, in which case it is started afresh, as is a scan
+            # index.
+            try:
+                with open(self.cache_filename, 'rb') as cache_file:
+                    cache_contents = pickle.load(cache_file)
+            except (pickle.UnpicklingError, TypeError, AttributeError, EOFError):
+                cache_contents = {}
+            if cache_contents.get('version') == self.version:
+                self.entries = cache_contents['entries']
+
+    #### Class methods ####
+    @classmethod
+    def for_directory(cls, completed_marking_dirname):
+        '''Return the cache for the completed marking directory
+        `completed_marking_dirname`, which is kept in `conf.cache_directory`.
+        '''
+
+        dirname = os.path.abspath(completed_marking_dirname)
+        cache_fname = conf.marksheet_cache_fname_template\
+                % hashlib.md5(dirname.encode('utf-8')).hexdigest()
+
+        return cls(os.path.join(conf.cache_directory, cache_fname))
+
+    ###########
+
+    @profiling.timed('cache lookup')
+    def lookup(self, filepath):
+
+        '''Return the cached (header, exception) result for the marksheet at
+        `filepath`, or None if there is no valid cached result.'''
+
+        entry = self.entries.get(filepath)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stat = os.stat(filepath)
+        if (entry['size'], entry['mtime']) == (stat.st_size, stat.st_mtime_ns):
+            self.hits += 1
+            return entry['result']
+
+        checksum = checksums.checksum_file(filepath)
+        if checksum == entry['checksum']:
+            entry['size'], entry['mtime'] = stat.st_size, stat.st_mtime_ns
+            self.hits += 1
+            return entry['result']
+
+        self._new_checksums[filepath] = checksum
+        self.misses += 1
+        return None
+
+    def store(self, filepath, result):
+
+        '''Cache the (header, exception) `result` of reading the marksheet at
+        `filepath`, unless there was an exception, in which case any old
+        entry is removed.'''
+
+        header, exception = result
+        if exception is not None:
+            self.entries.pop(filepath, None)
+            self._new_checksums.pop(filepath, None)
+            return
+
+        stat = os.stat(filepath)
+        checksum = self._new_checksums.pop(filepath, None)
+        if checksum is None:
+            checksum = checksums.checksum_file(filepath)
+
+        self.entries[filepath] = dict(size = stat.st_size,
+                                      mtime = stat.st_mtime_ns,
+                                      checksum = checksum,
+                                      result = result)
+
+    def evict_missing(self, filepaths):
+
+        '''Remove the entries of any marksheets that are not in `filepaths`,
+        i.e. those that have disappeared from the directory.'''
+
+        filepaths = set(filepaths)
+        for filepath in list(self.entries):
+            if filepath not in filepaths:
+                del self.entries[filepath]
+
+    def save(self):
+
+        'Write the cache to disk.'
+
+        cache_dirname = os.path.dirname(self.cache_filename)
+        if cache_dirname:
+            os.makedirs(cache_dirname, exist_ok=True)
+
+        # Write and then rename, so that an interrupted save can not leave a
+        # corrupted cache behind.
+        tmp_filename = self.cache_filename + '.tmp'
+        with open(tmp_filename, 'wb') as cache_file:
+            pickle.dump(dict(version = self.version, entries = self.entries),
+                        cache_file)
+        os.replace(tmp_filename, self.cache_filename)
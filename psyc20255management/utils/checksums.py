@@ -0,0 +1,129 @@
+"""Checksums of submitted reports, and of other files.
+
+The checksum of a file is the md5 hex digest of its contents, as given by
+`ernst.esys.checksum`, and as kept in the `checksum` column of the `Report`
+table. Files are hashed through a memory map, so their contents are never
+copied into Python, and streams, e.g. reports inside the dropbox zip file,
+are read into a buffer that is reused, one per thread.
+
+There is also a fast, non-cryptographic checksum, made of the size and the
+CRC-32 of the contents, for finding duplicates. It is not stored.
+
+md5 and CRC-32 both let other threads run while they hash, so many files can
+be hashed at once by a pool of threads (see `checksum_files`).
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import mmap
+import zlib
+import hashlib
+import threading
+from multiprocessing.pool import ThreadPool
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from . import profiling
+
+#================================ End Imports ================================
+
+buffer_size = 1048576
+
+_thread_buffers = threading.local()
+
+
+class FastHasher(object):
+
+    '''A hasher, with the `update` and `hexdigest` methods of those of
+    hashlib, whose hex digest is the size and CRC-32 of what it is given,
+    e.g. '1048576-8a3f0c21'.'''
+
+    def __init__(self):
+        self.crc = 0
+        self.size = 0
+
+    def update(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+
+    def hexdigest(self):
+        return '%d-%08x' % (self.size, self.crc)
+
+
+def get_hasher(fast=False):
+    'Return a new md5 hasher or, if `fast`, a new `FastHasher`.'
+    return FastHasher() if fast else hashlib.md5()
+
+
+def get_buffer():
+    'Return the read buffer of this thread, as a memoryview.'
+    buffer = getattr(_thread_buffers, 'buffer', None)
+    if buffer is None:
+        buffer = _thread_buffers.buffer = memoryview(bytearray(buffer_size))
+    return buffer
+
+
+def iter_chunks(stream):
+
+    '''Yield the contents of the binary file object `stream` in chunks, each
+    a memoryview of this thread's buffer, which is overwritten by the next
+    chunk.'''
+
+    buffer = get_buffer()
+    while True:
+        length = stream.readinto(buffer)
+        if not length:
+            break
+        yield buffer[:length]
+
+
+@profiling.timed('checksum')
+def checksum_file(filepath, fast=False):
+
+    '''Return the checksum of the file `filepath`, or its fast checksum if
+    `fast`.'''
+
+    hasher = get_hasher(fast)
+
+    with open(filepath, 'rb') as f:
+        try:
+            contents = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files, and files that can't be mapped.
+            for chunk in iter_chunks(f):
+                hasher.update(chunk)
+        else:
+            with contents:
+                hasher.update(contents)
+
+    return hasher.hexdigest()
+
+
+@profiling.timed('checksum')
+def checksum_stream(stream, fast=False):
+
+    '''Return the checksum of the contents of the binary file object
+    `stream`, or its fast checksum if `fast`. This is the same as
+    `checksum_file` gives for a file with those contents.'''
+
+    hasher = get_hasher(fast)
+    for chunk in iter_chunks(stream):
+        hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+
+def checksum_files(filepaths, threads=4, fast=False):
+
+    '''Return a list of the checksums, or fast checksums if `fast`, of the
+    files `filepaths`, in the same order, hashed by a pool of `threads`
+    threads.'''
+
+    if threads == 1:
+        return [checksum_file(filepath, fast) for filepath in filepaths]
+
+    with ThreadPool(threads) as pool:
+        return pool.map(lambda filepath: checksum_file(filepath, fast),
+                        filepaths)
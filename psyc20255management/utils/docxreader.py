@@ -0,0 +1,186 @@
+"""Lightweight, streaming reading of the parts of a docx file that we need.
+
+A docx file is a zip file, and its text is in `word/document.xml`. For a
+marksheet, all we need is the first few paragraphs and the value of the
+first content control (the grade dropdown), both of which are near the top
+of the document. Rather than building a full python-docx `Document` or a
+BeautifulSoup tree, we feed the xml through an incremental parser and stop
+as soon as we have what we need.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import zipfile
+from xml.etree import ElementTree
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from . import profiling
+
+#================================ End Imports ================================
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+BODY = W + 'body'
+PARAGRAPH = W + 'p'
+RUN = W + 'r'
+TEXT = W + 't'
+TAB = W + 'tab'
+HYPERLINK = W + 'hyperlink'
+BREAK = W + 'br'
+BREAK_TYPE = W + 'type'
+SDT = W + 'sdt'
+SDT_CONTENT = W + 'sdtContent'
+
+# The text, as in python-docx, of the other elements in a run that stand for
+# characters. A w:br is only a '\n' if it is a line break (see
+# `get_run_text`).
+run_character_texts = {TAB: '\t',
+                       W + 'ptab': '\t',
+                       W + 'cr': '\n',
+                       W + 'noBreakHyphen': '-'}
+
+def get_run_text(run):
+
+    '''Return the text of a `w:r` element, as python-docx would.
+
+    That is, the text of its `w:t` elements, with tabs and carriage returns
+    as '\\t' and '\\n', and non-breaking hyphens as '-'. A `w:br` is a '\\n'
+    if it is a line break, which is its default type, and is otherwise (a
+    page or column break) left out.
+
+    '''
+
+    text = []
+    for child in run:
+        if child.tag == TEXT:
+            text.append(child.text or '')
+        elif child.tag == BREAK:
+            if child.get(BREAK_TYPE, 'textWrapping') == 'textWrapping':
+                text.append('\n')
+        else:
+            text.append(run_character_texts.get(child.tag, ''))
+
+    return ''.join(text)
+
+
+def get_paragraph_text(paragraph):
+
+    '''Return the text of a `w:p` element, as python-docx would.
+
+    That is, the text (see `get_run_text`) of the runs that are children of
+    the paragraph, or of its hyperlinks, in document order. Text inside
+    content controls is not part of a paragraph's text in python-docx, and so
+    is not here either.
+
+    '''
+
+    text = []
+    for child in paragraph:
+        if child.tag == RUN:
+            text.append(get_run_text(child))
+        elif child.tag == HYPERLINK:
+            text.extend(get_run_text(run) for run in child.iterfind(RUN))
+
+    return ''.join(text)
+
+
+def get_sdt_text(sdt):
+
+    '''Return the text of the `w:sdtContent` of a `w:sdt` element, or None if
+    it has no content, as would BeautifulSoup's
+    `soup.find('sdt').find('sdtContent').text`.
+
+    '''
+
+    sdt_content = next(sdt.iter(SDT_CONTENT), None)
+    if sdt_content is None:
+        return None
+    return ''.join(sdt_content.itertext())
+
+
+@profiling.timed('marksheet header reading')
+def read_marksheet_header(docx_filename, paragraph_count, chunk_size=16384):
+
+    '''Return the text of the first `paragraph_count` paragraphs of the body
+    of a docx file, and the text of its first content control.
+
+    The return value is a (paragraphs, sdt_text) tuple. There may be fewer
+    than `paragraph_count` paragraphs if the document is short. The
+    `sdt_text` is None if there is no content control, or it has no content.
+
+    The xml is read in chunks of `chunk_size` bytes and parsing stops once
+    both the paragraphs and the content control have been found.
+
+    '''
+
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+
+    paragraphs = []
+    sdt = None
+    sdt_text = None
+    sdt_done = False
+
+    # The tags of the currently open elements.
+    open_tags = []
+
+    with zipfile.ZipFile(docx_filename) as document,\
+            document.open('word/document.xml') as xml_stream:
+
+        for chunk in iter(lambda: xml_stream.read(chunk_size), b''):
+
+            parser.feed(chunk)
+
+            for event, element in parser.read_events():
+
+                if event == 'start':
+                    open_tags.append(element.tag)
+                    if sdt is None and element.tag == SDT:
+                        sdt = element
+                    continue
+
+                open_tags.pop()
+
+                if element is sdt:
+                    sdt_text = get_sdt_text(sdt)
+                    sdt_done = True
+
+                if open_tags and open_tags[-1] == BODY:
+                    if element.tag == PARAGRAPH\
+                            and len(paragraphs) < paragraph_count:
+                        paragraphs.append(get_paragraph_text(element))
+                    # Finished with this part of the body, so free it.
+                    element.clear()
+
+                if sdt_done and len(paragraphs) == paragraph_count:
+                    return paragraphs, sdt_text
+
+    return paragraphs, sdt_text
+
+
+@profiling.timed('document text reading')
+def read_document_text(docx_file):
+
+    '''Return the text of a docx file, the filename or binary file object
+    `docx_file`, with one line per paragraph. Only the text of `w:t` elements
+    is read, so deleted text and field codes are left out.
+
+    Each paragraph is freed once its text has been read, so the whole tree
+    is never held in memory.
+
+    '''
+
+    paragraphs = []
+
+    with zipfile.ZipFile(docx_file) as document,\
+            document.open('word/document.xml') as xml_stream:
+
+        for event, element in ElementTree.iterparse(xml_stream):
+            if element.tag == PARAGRAPH:
+                paragraphs.append(''.join(text.text or ''
+                                          for text in element.iter(TEXT)))
+                element.clear()
+
+    return '\n'.join(paragraphs)
@@ -0,0 +1,246 @@
+"""Finding duplicate and near-duplicate submitted reports across a cohort.
+
+Exact duplicates are reports of different students with the same checksum,
+found by indexing the submissions by checksum.
+
+Near-duplicates are found by MinHash and locality sensitive hashing. The
+text of each docx report is read once, and split into shingles, i.e. the
+runs of `shingle_length` words. Its MinHash signature is made by one
+permutation hashing: each shingle is hashed once, the hash picks one of
+`bin_count` bins, and the signature is the least hash in each bin, with
+empty bins filled from the next bin that is not empty. The proportion of the
+bins of two reports that agree estimates the Jaccard similarity of their
+sets of shingles. This takes one hash per shingle, rather than one for each
+bin.
+
+The signatures are cut into `band_count` bands, and two reports are
+candidates if any band of theirs is the same, so that candidates are found
+by indexing the bands, rather than by comparing every pair of reports.
+Candidates are flagged if their estimated similarity is at least the given
+similarity.
+
+Signatures are made by a pool of worker processes.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import io
+import re
+import zlib
+import zipfile
+import functools
+import itertools
+from collections import namedtuple
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from . import docxreader, profiling
+from .marksheets import worker_map
+
+#================================ End Imports ================================
+
+EXACT = 'exact'
+NEAR = 'near'
+
+shingle_length = 5
+
+# The signatures have 128 bins, in 32 bands of 4, so reports that are 60%
+# similar are candidates with probability 0.99, and those that are 20%
+# similar with probability 0.05.
+bin_count = 128
+band_count = 32
+
+# The 64 bit hash of a shingle is its CRC-32 times an odd constant, whose top
+# 7 bits are its bin and whose other 57 bits are its value.
+shingle_multiplier = 0x9E3779B97F4A7C15
+hash_mask = 2 ** 64 - 1
+bin_shift = 57
+value_mask = 2 ** bin_shift - 1
+
+word_pattern = re.compile(r'\w+')
+
+# Two students' reports that are duplicates, or near-duplicates, of each
+# other, where the kind is EXACT or NEAR and the similarity is the estimated
+# similarity of their text, or 1.0 if they are exact duplicates. The student
+# IDs are in order.
+DuplicatePair = namedtuple('DuplicatePair',
+                           ['student_id',
+                            'other_student_id',
+                            'kind',
+                            'similarity'])
+
+
+def find_exact_duplicates(submissions):
+
+    '''Return the `DuplicatePair`s of students in `submissions`, as returned
+    by `reports.get_submitted_reports_list`, whose reports have the same
+    checksum.'''
+
+    students_by_checksum = {}
+    for student_id in sorted(submissions):
+        students_by_checksum.setdefault(submissions[student_id].checksum,
+                                        []).append(student_id)
+
+    return [DuplicatePair(student_id, other_student_id, EXACT, 1.0)
+            for student_ids in students_by_checksum.values()
+            for student_id, other_student_id in itertools.combinations(student_ids, 2)]
+
+
+def get_shingle_hashes(text):
+    'Return the set of the CRC-32s of the shingles of `text`.'
+    words = word_pattern.findall(text.lower())
+    return {zlib.crc32(' '.join(words[i:i + shingle_length]).encode('utf-8'))
+            for i in range(max(1, len(words) - shingle_length + 1))}
+
+
+@profiling.timed('minhash signature')
+def get_minhash_signature(shingle_hashes):
+
+    '''Return the MinHash signature, as a tuple of `bin_count` integers, of
+    the set of the CRC-32s of shingles `shingle_hashes`, which should not be
+    empty.'''
+
+    signature = [None] * bin_count
+    for shingle_hash in shingle_hashes:
+        shingle_hash = (shingle_hash * shingle_multiplier) & hash_mask
+        bin_index = shingle_hash >> bin_shift
+        value = shingle_hash & value_mask
+        if signature[bin_index] is None or value < signature[bin_index]:
+            signature[bin_index] = value
+
+    # Each empty bin takes the value of the next bin, round the end, that is
+    # not empty, offset by how far away it is, so that bins filled from
+    # different places do not agree by chance. Going round twice, backwards,
+    # the second time round has the nearest such bin for every bin.
+    densified_signature = list(signature)
+    next_value, distance = None, 0
+    for bin_index in reversed(range(2 * bin_count)):
+        value = signature[bin_index % bin_count]
+        if value is not None:
+            next_value, distance = value, 0
+        else:
+            distance += 1
+            if next_value is not None:
+                densified_signature[bin_index % bin_count]\
+                        = next_value + (distance << bin_shift)
+
+    return tuple(densified_signature)
+
+
+@functools.lru_cache(maxsize=1)
+def _open_dropbox(submissions_dropbox_zip):
+    # Each worker opens the dropbox zip file once, rather than for every
+    # report.
+    return zipfile.ZipFile(submissions_dropbox_zip)
+
+
+def get_submission_signature(filepath, submissions_dropbox_zip=None):
+
+    '''Return the MinHash signature of the text of the docx report
+    `filepath`, within the zip file `submissions_dropbox_zip`, if given,
+    or None if the report has no words.'''
+
+    if submissions_dropbox_zip is None:
+        text = docxreader.read_document_text(filepath)
+    else:
+        dropbox = _open_dropbox(submissions_dropbox_zip)
+        text = docxreader.read_document_text(io.BytesIO(dropbox.read(filepath)))
+
+    if not word_pattern.search(text):
+        return None
+
+    return get_minhash_signature(get_shingle_hashes(text))
+
+
+def _get_submission_signature(task):
+    # The worker function: return the signature, and no exception, or no
+    # signature, and the exception.
+    try:
+        return get_submission_signature(*task), None
+    except Exception as exception:
+        return None, exception
+
+
+def get_signature_similarity(signature, other_signature):
+    'Return the proportion of the hashes of two signatures that are the same.'
+    return sum(map(int.__eq__, signature, other_signature)) / len(signature)
+
+
+def find_near_duplicates(signatures, similarity):
+
+    '''Return the `DuplicatePair`s of students whose reports' signatures, in
+    the dictionary `signatures` keyed by student ID, are similar by at least
+    `similarity`.'''
+
+    rows = bin_count // band_count
+
+    candidates = set()
+    buckets = {}
+    for student_id in sorted(signatures):
+        signature = signatures[student_id]
+        for band in range(band_count):
+            bucket = buckets.setdefault(
+                    (band, signature[band * rows:(band + 1) * rows]), [])
+            candidates.update((other_student_id, student_id)
+                              for other_student_id in bucket)
+            bucket.append(student_id)
+
+    near_duplicates = []
+    for student_id, other_student_id in sorted(candidates):
+        pair_similarity = get_signature_similarity(signatures[student_id],
+                                                   signatures[other_student_id])
+        if pair_similarity >= similarity:
+            near_duplicates.append(DuplicatePair(student_id,
+                                                 other_student_id,
+                                                 NEAR,
+                                                 pair_similarity))
+
+    return near_duplicates
+
+
+def find_duplicates(submissions,
+                    submissions_dropbox_zip=None,
+                    similarity=0.6,
+                    processes=1):
+
+    '''Return the `DuplicatePair`s of students whose reports, in
+    `submissions`, are exact duplicates, or near-duplicates whose text is
+    similar by at least `similarity`, in order, and a list of the
+    (submission, exception) of each report whose text could not be read.
+
+    The `submissions` are as returned by `reports.get_submitted_reports_list`
+    or, if `submissions_dropbox_zip` is given, by
+    `reports.get_submitted_reports_list_from_zip`. Only docx reports are
+    compared for near-duplicates, and exact duplicates are not also given as
+    near-duplicates. The reports are read by a pool of `processes` worker
+    processes.
+
+    '''
+
+    exact_duplicates = find_exact_duplicates(submissions)
+    exact_pairs = {(pair.student_id, pair.other_student_id)
+                   for pair in exact_duplicates}
+
+    docx_submissions = [submissions[student_id]
+                        for student_id in sorted(submissions)
+                        if submissions[student_id].extension.lower() == '.docx']
+
+    signatures = {}
+    unreadable = []
+
+    with worker_map(processes) as map_:
+        results = map_(_get_submission_signature,
+                       [(submission.filepath, submissions_dropbox_zip)
+                        for submission in docx_submissions])
+        for submission, (signature, exception) in zip(docx_submissions, results):
+            if exception is not None:
+                unreadable.append((submission, exception))
+            elif signature is not None:
+                signatures[submission.student_id] = signature
+
+    near_duplicates = [pair for pair in find_near_duplicates(signatures, similarity)
+                       if (pair.student_id, pair.other_student_id) not in exact_pairs]
+
+    return sorted(exact_duplicates + near_duplicates), unreadable
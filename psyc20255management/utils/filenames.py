@@ -0,0 +1,103 @@
+"""Parsing the filenames of reports submitted to a NOW dropbox.
+
+The filenames are matched with `conf.submitted_report_filename_pattern`, and
+their timestamps, e.g. '14 November, 2017 1130 PM', are parsed with a
+precompiled regular expression and a table of month names, rather than with
+`datetime.strptime`, which is slow and depends on the locale.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import re
+import datetime
+from collections import namedtuple
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from .. import conf
+
+#================================ End Imports ================================
+
+month_numbers = {month_name: month_number for month_number, month_name
+                 in enumerate(['january', 'february', 'march', 'april',
+                               'may', 'june', 'july', 'august', 'september',
+                               'october', 'november', 'december'], 1)}
+
+# This matches exactly what `datetime.strptime` matches with the format
+# "%d %B, %Y %I%M %p", in an English locale.
+timestamp_pattern = re.compile(
+    r'(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])\s+'    # day
+    r'(%s),\s+'                                 # month
+    r'(\d\d\d\d)\s+'                            # year
+    r'(1[0-2]|0[1-9]|[1-9])([0-5]\d|\d)\s+'     # hour and minute
+    r'(am|pm)'
+    % '|'.join(month_numbers),
+    re.IGNORECASE)
+
+SubmittedReportFilename = namedtuple('SubmittedReportFilename',
+                                     ['dropbox_id',
+                                      'student_id',
+                                      'student_name',
+                                      'timestamp',
+                                      'document_name'])
+
+
+class MalformedFilenamesError(ValueError):
+
+    '''Raised in strict mode by `reports.get_most_recent_submissions`, with
+    all the filenames that could not be parsed.'''
+
+    def __init__(self, fnames):
+        self.fnames = fnames
+        super(MalformedFilenamesError, self).__init__(
+            '%d malformed submitted report filenames:\n%s'
+            % (len(fnames), '\n'.join(fnames)))
+
+
+def parse_timestamp(timestamp_str):
+
+    '''Parse a timestamp string, e.g. '14 November, 2017 1130 PM', from a
+    submitted report filename, as `datetime.strptime(timestamp_str, "%d %B,
+    %Y %I%M %p")` would. Raise a ValueError if it is malformed.'''
+
+    match = timestamp_pattern.fullmatch(timestamp_str)
+    if not match:
+        raise ValueError('Malformed timestamp "%s".' % timestamp_str)
+
+    day, month_name, year, hour, minute, am_pm = match.groups()
+
+    hour = int(hour) % 12
+    if am_pm.lower() == 'pm':
+        hour += 12
+
+    return datetime.datetime(int(year),
+                             month_numbers[month_name.lower()],
+                             int(day),
+                             hour,
+                             int(minute))
+
+
+def parse_submitted_report_filename(fname):
+
+    '''Return the `SubmittedReportFilename` record of the filename of a
+    submitted report, or None if it is malformed.'''
+
+    match = conf.submitted_report_filename_pattern.match(fname)
+    if not match:
+        return None
+
+    dropbox_id, student_id, student_name, date_string, document_name\
+            = match.groups()
+
+    try:
+        timestamp = parse_timestamp(date_string)
+    except ValueError:
+        return None
+
+    return SubmittedReportFilename(dropbox_id,
+                                   student_id,
+                                   student_name,
+                                   timestamp,
+                                   document_name)
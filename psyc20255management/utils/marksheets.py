@@ -4,15 +4,19 @@
 #=============================================================================
 # Standard library imports
 #=============================================================================
+import io
 import os
 import re
+import sys
+import csv
+import json
 import zipfile
-
-#=============================================================================
-# Third party imports
-#=============================================================================
-from docx import Document
-from bs4 import BeautifulSoup
+import functools
+import contextlib
+import collections
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+from xml.sax.saxutils import escape as xml_escape
 
 #=============================================================================
 # Imports of homespun packages
@@ -23,64 +27,326 @@ from ernst.emisc import assertTrue, assertEqual
 # Local imports
 #=============================================================================
 from .. import conf
+from . import docxreader
+from . import profiling
+from . import scanindex
+from .records import CompletedMarksheet, CompletedMarksheetRow
 
 #================================ End Imports ================================
 
+# The fields of each row returned by `process_completed_marksheets`.
+completed_marksheet_fields = CompletedMarksheetRow._fields
+
+# The formats in which `write_completed_marksheets` can write the rows.
+output_formats = ('csv', 'jsonl')
+
+
 def process_completed_marksheets(completed_marksheets_dirname,
                                  sequence_name='Experimental',
-                                 marksheet_fname_pattern=None):
+                                 marksheet_fname_pattern=None,
+                                 processes=1,
+                                 failures=None,
+                                 cache=None,
+                                 persistent_index=False):
 
 
     '''Return a list of processed and checked marksheets that were found in the
-    completed_marksheets_dirname. 
+    completed_marksheets_dirname, as `records.CompletedMarksheetRow`s. 
+
+    The marksheets are processed in the order of their filenames, and the
+    returned list is in that order regardless of how many `processes` are
+    used. If `processes` is greater than 1 (or None, meaning one per CPU),
+    the marksheets are farmed out to a pool of worker processes.
+
+    By default, the first bad marksheet raises its exception, as it always
+    has. If `failures` is a list, then bad marksheets are instead appended to
+    it as (completed_marksheet, exception) pairs, and processing carries on
+    with the rest.
+
+    If `cache` is a `cache.MarksheetCache`, only the marksheets that are not
+    in the cache, or that have changed, are processed. The cache is updated,
+    but not saved.
+
+    If `persistent_index`, the directory is listed with its persistent scan
+    index (see `list_completed_marksheets`).
 
     '''
 
-    completed_marksheets = []
-    for completed_marksheet\
-            in list_completed_marksheets(completed_marksheets_dirname,
-                                         marksheet_fname_pattern):
+    return list(iter_completed_marksheets(completed_marksheets_dirname,
+                                          sequence_name,
+                                          marksheet_fname_pattern,
+                                          processes,
+                                          failures,
+                                          cache,
+                                          persistent_index))
+
+
+def iter_completed_marksheets(completed_marksheets_dirname,
+                              sequence_name='Experimental',
+                              marksheet_fname_pattern=None,
+                              processes=1,
+                              failures=None,
+                              cache=None,
+                              persistent_index=False):
+
+    '''The generator form of `process_completed_marksheets`. 
+
+    Each processed and checked marksheet is yielded, in filename order, as
+    soon as it has been extracted, rather than when all of them have. Bad
+    marksheets are dealt with as by `process_completed_marksheets`, as they
+    come.
+
+    '''
+
+    completed_marksheets_list\
+            = list_completed_marksheets(completed_marksheets_dirname,
+                                        marksheet_fname_pattern,
+                                        persistent_index)
+
+    header_results = _iter_read_marksheets(completed_marksheets_list,
+                                           processes,
+                                           cache)
+
+    for completed_marksheet, header_result\
+            in zip(completed_marksheets_list, header_results):
+
+        row, exception = check_completed_marksheet(completed_marksheet,
+                                                   header_result,
+                                                   sequence_name)
+
+        if exception is None:
+            yield row
+        elif failures is None:
+            print('Bad trouble with %s.' % completed_marksheet.filename,
+                  file=sys.stderr)
+            raise exception
+        else:
+            failures.append((completed_marksheet, exception))
+
+
+@contextlib.contextmanager
+def worker_map(processes):
+
+    '''Yield a function that, like the builtin `map`, lazily maps a function
+    over an iterable and returns the results in order. The work is done by a
+    pool of `processes` worker processes, or in this process if `processes`
+    is 1.'''
+
+    if processes == 1:
+        yield map
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            yield functools.partial(pool.imap, chunksize=8)
+
+
+@profiling.timed('marksheet reading')
+def read_completed_marksheet(completed_marksheet):
+
+    '''Read the header of a single completed marksheet, as listed by
+    `list_completed_marksheets`, whatever its sequence.
+
+    Return a (header, exception) pair. The header is the (paragraphs,
+    dropdown_grade) of `MarksheetModel.read_marksheet_header`, and it is None
+    if the marksheet could not be read, in which case the exception says
+    why. Exceptions are returned rather than raised so that one bad
+    marksheet does not bring down a pool of workers.
+
+    '''
+
+    try:
+        return MarksheetModel.read_marksheet_header(completed_marksheet.filepath),\
+               None
+    except Exception as exception:
+        return None, exception
+
+
+def process_completed_marksheet(completed_marksheet, sequence_name):
+
+    '''Process and check a single completed marksheet, as listed by
+    `list_completed_marksheets`.
+
+    Return a (row, exception) pair. The row is a
+    `records.CompletedMarksheetRow` of the student name, student ID, marker
+    name, marker email, grade and file path, and it is None if the marksheet
+    is bad, in which case the exception says why.
+
+    '''
+
+    return check_completed_marksheet(completed_marksheet,
+                                     read_completed_marksheet(completed_marksheet),
+                                     sequence_name)
+
+
+@profiling.timed('marksheet checking')
+def check_completed_marksheet(completed_marksheet, header_result, sequence_name):
+
+    '''Check a completed marksheet, given the (header, exception) result of
+    reading it with `read_completed_marksheet`, against the sequence
+    `sequence_name`, and return the (row, exception) result of
+    `process_completed_marksheet`.'''
+
+    header, exception = header_result
+
+    if exception is not None:
+        return None, exception
+
+    return _check_completed_marksheet(completed_marksheet,
+                                      header[0],
+                                      header[1],
+                                      sequence_name)
+
+
+@profiling.timed('marksheet checking')
+def detect_and_check_completed_marksheet(completed_marksheet, header_result):
+
+    '''As `check_completed_marksheet`, but for a marksheet of any sequence,
+    which is detected from its title paragraph.
+
+    Return a (sequence_name, row, exception) triple. The sequence name is None
+    if the marksheet could not be read, or its title is not that of one of the
+    sequences in conf.
+
+    '''
+
+    header, exception = header_result
+
+    if exception is not None:
+        return None, None, exception
+
+    try:
+        sequence_name = MarksheetModel.detect_sequence_name(header[0])
+    except Exception as exception:
+        return None, None, exception
+
+    return (sequence_name,)\
+           + _check_completed_marksheet(completed_marksheet,
+                                        header[0],
+                                        header[1],
+                                        sequence_name)
+
+
+def _check_completed_marksheet(completed_marksheet, 
+                               paragraphs, 
+                               dropdown_grade, 
+                               sequence_name):
+
+    '''Return the (row, exception) result of `process_completed_marksheet`,
+    given the header of the marksheet, as read by
+    `MarksheetModel.read_marksheet_header`.'''
+
+    try:
+        (student_name, 
+         student_id, 
+         marker_name, 
+         marker_email, 
+         grade) = MarksheetModel.get_vital_details(paragraphs,
+                                                   dropdown_grade,
+                                                   sequence_name,
+                                                   completed_marksheet.filepath)
         
-        try:
-            (student_name, 
-             student_id, 
-             marker_name, 
-             marker_email, 
-             grade) = MarksheetModel.get_marksheet_vital_details(
-                     marksheet_filename=completed_marksheet['filepath'],
-                     sequence_name = sequence_name)
-            
-            assertEqual(student_name, completed_marksheet['student_name'])
-            assertEqual(student_id, completed_marksheet['student_id'])
-            assertTrue(grade in conf.grades)
-            
-            completed_marksheets.append(
-                [student_name, 
-                 student_id, 
-                 marker_name,
-                 marker_email,
-                 grade, 
-                 completed_marksheet['filepath']]
-            )
-        except AssertionError:
-            print('Bad trouble with %s.' % completed_marksheet)
-            raise
+        assertEqual(student_name, completed_marksheet.student_name)
+        assertEqual(student_id, completed_marksheet.student_id)
+        assertTrue(grade in conf.grades)
 
-    return completed_marksheets
+    except Exception as exception:
+        return None, exception
+
+    return (CompletedMarksheetRow(student_name, 
+                                  student_id, 
+                                  marker_name,
+                                  marker_email,
+                                  grade, 
+                                  completed_marksheet.filepath), 
+            None)
+
+
+def _iter_read_marksheets(completed_marksheets_list, processes, cache):
+
+    '''Yield the (header, exception) result of reading each of the
+    marksheets in `completed_marksheets_list`, in order, taking them from
+    the `cache` where possible.
+
+    The marksheets are read by the worker processes, and what is read is
+    cached, whatever the sequence. The much quicker checking against the
+    sequence is done by the caller, after the cache, so that the one cache
+    entry of a marksheet serves every sequence, and both batches and single
+    directories.'''
+
+    if cache is None:
+        cached_results = [None] * len(completed_marksheets_list)
+    else:
+        cache.evict_missing([completed_marksheet.filepath 
+                             for completed_marksheet in completed_marksheets_list])
+        cached_results = [cache.lookup(completed_marksheet.filepath)
+                          for completed_marksheet in completed_marksheets_list]
+
+    uncached_marksheets_list\
+            = [completed_marksheet for completed_marksheet, cached_result
+               in zip(completed_marksheets_list, cached_results)
+               if cached_result is None]
+
+    with worker_map(processes) as imap:
+
+        new_results = imap(read_completed_marksheet, uncached_marksheets_list)
+
+        for completed_marksheet, header_result\
+                in zip(completed_marksheets_list, cached_results):
+
+            if header_result is None:
+                header_result = next(new_results)
+                if cache is not None:
+                    cache.store(completed_marksheet.filepath, header_result)
+
+            yield header_result
 
 
+def write_completed_marksheets(completed_marksheets, output, output_format='csv'):
+
+    '''Write each of the rows `completed_marksheets`, e.g. from
+    `iter_completed_marksheets`, to the text file `output`, flushing after
+    each one so that whatever is reading them can start straight away.
+
+    The `output_format` is 'csv', for properly quoted comma separated
+    values with no header, or 'jsonl', for a JSON object per line with keys
+    `completed_marksheet_fields`.
+
+    '''
+
+    if output_format == 'csv':
+        writer = csv.writer(output, lineterminator='\n')
+        write_row = writer.writerow
+    elif output_format == 'jsonl':
+        def write_row(row):
+            output.write(json.dumps(row._asdict()))
+            output.write('\n')
+    else:
+        raise ValueError('Unknown output format %s, not one of %s.'
+                         % (output_format, ', '.join(output_formats)))
+
+    for completed_marksheet in completed_marksheets:
+        write_row(completed_marksheet)
+        output.flush()
+
+
+@profiling.timed('marksheet listing')
 def list_completed_marksheets(completed_marking_dirname,
-                              marksheet_fname_pattern=None):
+                              marksheet_fname_pattern=None,
+                              persistent_index=False):
     
     '''Return a list of (hopefully completed) marksheets from a
     `completed_marking` directory. Marksheets are defined as files that match a
     particular regular expression, which is recorded in conf.
     
-    The list is a list of small dictionaries, with keys 
+    The list is a list of `records.CompletedMarksheet`s, in filename order,
+    with fields
     * student_name, which is taken from the filename 
     * student_id, which is also taken from the filename
     * filename, the filename
     * filepath, the full and absolute path to the file
+
+    The directory is listed by `scanindex.scan_directory`, and, if
+    `persistent_index`, only the files that are new since the last listing
+    are matched. Files that do not match are summarized on stderr.
     '''
 
     # We need this here because we have changed the default
@@ -90,54 +356,211 @@ def list_completed_marksheets(completed_marking_dirname,
     if marksheet_fname_pattern is None:
         marksheet_fname_pattern = conf.marksheet_fname_pattern
 
-    def abspath(dirname, fname):
-        'Convenience function just to save some typing'
-        return os.path.abspath(os.path.join(completed_marking_dirname, fname))
-    
+    entries = scanindex.scan_directory(
+            completed_marking_dirname,
+            functools.partial(parse_marksheet_fname, marksheet_fname_pattern),
+            'marksheets %s' % marksheet_fname_pattern.pattern,
+            persistent_index
+    )
+
     completed_marksheets = []
+    unmatched_fnames = []
     
-    for fname in os.listdir(completed_marking_dirname):
-        
-        pattern_match = marksheet_fname_pattern.match(fname)
+    for entry in entries:
         
-        if pattern_match: 
-
-            student_name, student_id = pattern_match.groups()
-            
-            completed_marksheets.append(
-                    dict(student_name = student_name,
-                         student_id = student_id,
-                         filename = fname,
-                         filepath = abspath(completed_marking_dirname, fname)
-                         )
-                    )
-        else:
-            print('Did not match: %s' % fname)
+        if entry.parsed is None:
+            unmatched_fnames.append(entry.name)
+            continue
+
+        completed_marksheets.append(
+                make_completed_marksheet(completed_marking_dirname,
+                                         entry.name,
+                                         entry.parsed))
+
+    if unmatched_fnames:
+        print(scanindex.format_unmatched_summary(unmatched_fnames),
+              file=sys.stderr)
     
     return completed_marksheets
 
 
+def parse_marksheet_fname(marksheet_fname_pattern, fname):
+    '''Return the (student_name, student_id) of the marksheet `fname`, or
+    None if it does not match `marksheet_fname_pattern`.'''
+    pattern_match = marksheet_fname_pattern.match(fname)
+    return pattern_match.groups() if pattern_match else None
+
+
+@profiling.timed('marksheet listing')
+def list_completed_marksheet_tree(completed_marking_tree,
+                                  marksheet_fname_pattern=None):
+
+    '''As `list_completed_marksheets`, but list the marksheets anywhere in the
+    directory tree `completed_marking_tree`, e.g. one with a directory of
+    completed marking for each sequence and year, in order of their paths.
+    Other files, such as the reports themselves, are passed over silently.'''
+
+    if marksheet_fname_pattern is None:
+        marksheet_fname_pattern = conf.marksheet_fname_pattern
+
+    completed_marksheets = []
+
+    for dirpath, dirnames, fnames in os.walk(completed_marking_tree):
+
+        # Walk the subdirectories in order too.
+        dirnames.sort()
+
+        for fname in sorted(fnames):
+
+            completed_marksheet\
+                    = get_completed_marksheet(dirpath,
+                                              fname,
+                                              marksheet_fname_pattern)
+
+            if completed_marksheet:
+                completed_marksheets.append(completed_marksheet)
+
+    return completed_marksheets
+
+
+def process_completed_marksheet_tree(completed_marking_tree,
+                                     marksheet_fname_pattern=None,
+                                     processes=1,
+                                     cache=None):
+
+    '''Process all the completed marksheets in the directory tree
+    `completed_marking_tree`, of every sequence, in one pass.
+
+    The sequence of each marksheet is detected from its title paragraph, so
+    marksheets of different sequences, and of different years, can be mixed
+    in any way within the tree. They are all processed by the one pool of
+    `processes` worker processes and, if given, the one `cache`, as in
+    `process_completed_marksheets`.
+
+    Return two dictionaries, keyed by sequence name. The first has the list
+    of rows of the marksheets of each of the sequences in conf, in order of
+    their paths. The second has the list of (completed_marksheet, exception)
+    pairs of the bad marksheets of each sequence, where those whose sequence
+    could not be detected are under None.
+
+    '''
+
+    completed_marksheets_list\
+            = list_completed_marksheet_tree(completed_marking_tree,
+                                            marksheet_fname_pattern)
+
+    header_results = _iter_read_marksheets(completed_marksheets_list,
+                                           processes,
+                                           cache)
+
+    completed_marksheets = {sequence_name: [] 
+                            for sequence_name in conf.sequences}
+    failures = collections.defaultdict(list)
+
+    for completed_marksheet, header_result\
+            in zip(completed_marksheets_list, header_results):
+
+        sequence_name, row, exception\
+                = detect_and_check_completed_marksheet(completed_marksheet,
+                                                       header_result)
+
+        if exception is None:
+            completed_marksheets[sequence_name].append(row)
+        else:
+            failures[sequence_name].append((completed_marksheet, exception))
+
+    return completed_marksheets, dict(failures)
+
+
+def format_batch_summary(completed_marksheets, failures):
+
+    '''Return the counts of good and bad marksheets of each sequence, from
+    the results of `process_completed_marksheet_tree`, as a list of lines.'''
+
+    lines = ['%s: %d marksheets, %d bad.' 
+             % (sequence_name,
+                len(completed_marksheets.get(sequence_name, [])),
+                len(failures.get(sequence_name, [])))
+             for sequence_name in conf.sequences]
+
+    if None in failures:
+        lines.append('Unknown sequence: %d bad.' % len(failures[None]))
+
+    return lines
+
+
+def get_completed_marksheet(completed_marking_dirname,
+                            fname,
+                            marksheet_fname_pattern):
+
+    '''Return the `records.CompletedMarksheet` of the marksheet `fname` in the
+    `completed_marking_dirname` directory (see `list_completed_marksheets`),
+    or None if `fname` does not match `marksheet_fname_pattern`.'''
+
+    parsed = parse_marksheet_fname(marksheet_fname_pattern, fname)
+
+    if parsed is None:
+        return None
+
+    return make_completed_marksheet(completed_marking_dirname, fname, parsed)
+
+
+def make_completed_marksheet(completed_marking_dirname, fname, parsed):
+
+    '''Return the `records.CompletedMarksheet` of the marksheet `fname` in the
+    `completed_marking_dirname` directory, given the (student_name,
+    student_id) `parsed` from its name by `parse_marksheet_fname`.'''
+
+    student_name, student_id = parsed
+
+    return CompletedMarksheet(student_name = student_name,
+                              student_id = student_id,
+                              filename = fname,
+                              filepath = os.path.abspath(
+                                  os.path.join(completed_marking_dirname, fname))
+                              )
+
+
+@profiling.timed('marksheet grade')
 def get_grade_from_marksheet(marksheet):
     
     ''' 
     Extract the assigned grade from the marksheet. Return as a string that
-    should be from the `grades` list.
+    should be from the `grades` list, or None if the grade dropdown can not
+    be read.
 
     The grade assigned to a report is chosen from a Word dropdown list.  The
-    chosen value in a Word dropdown list is not obtainable using python-docx,
-    and so we must pull out the xml inside the zipfile (a docx file is a zip
-    file) and parse that using beautiful soup. The relevant tag for the
-    dropdown list is `sdt` (I think), and we're assuming there'll be only one
-    such tag in the file. The chosen value in the dropdown list is the value of
-    the `sdtContent` tag (again, I think).
+    chosen value in a Word dropdown list is not obtainable using python-docx.
+    It is the text of the first `sdt` (content control) element of the
+    document's xml, which is found by `docxreader.read_marksheet_header`
+    without parsing the rest of the xml, and is normalized by
+    `normalize_grade`.
 
     '''
     
-    document = zipfile.ZipFile(marksheet)
-    xml_data = document.read('word/document.xml')
-    document.close()
-    soup = BeautifulSoup(xml_data, 'xml')
-    grade = soup.find('sdt').find('sdtContent').text
+    _, grade = docxreader.read_marksheet_header(marksheet, paragraph_count=0)
+    if grade is None:
+        return None
+
+    return check_grade(normalize_grade(grade))
+
+
+def normalize_grade(grade):
+
+    '''Return `grade` if it is in the `grades` list in conf, and otherwise
+    `grade` tidied up, as a grade typed in by hand may need to be, e.g.
+    ' 21high.' becomes '21HIGH'.'''
+
+    if grade in conf.grades:
+        return grade
+
+    return grade.strip().replace('.', '').upper()
+
+
+def check_grade(grade):
+
+    '''Return `grade` if it is in the `grades` list in conf, and raise an
+    AssertionError otherwise.'''
 
     assert grade in conf.grades,\
             'Grade %s not in grades list %s.' % (grade, ' ,'.join(conf.grades))
@@ -187,11 +610,20 @@ class MarksheetModel(object):
     marker_email_pattern = re.compile(r'%s: (.*)$' % marker_email_label)
     marker_grade_pattern = re.compile(r'%s: (.*)$' % marker_grade_label)
 
+    sequence_title_template = 'PSYC20255: %s Sequence'
+    sequence_title_pattern = re.compile(r'PSYC20255: (.*) Sequence$')
+
+    @profiling.timed('python-docx document')
     def __init__(self, document_name, sequence_name='Experimental'):
         
+        # Imported here as, with `docxreader` doing the day to day reading
+        # of marksheets, python-docx is only needed for MarksheetModel
+        # instances.
+        from docx import Document
+
         self.document_name = document_name
         self.document = Document(self.document_name)
-        self.sequence_name = 'PSYC20255: %s Sequence' % sequence_name
+        self.sequence_name = self.sequence_title_template % sequence_name
         self.validate()
  
     #### Class methods ####
@@ -199,12 +631,89 @@ class MarksheetModel(object):
     def get_marksheet_vital_details(cls, marksheet_filename, sequence_name):
         '''Return the "vital details" of a marksheet.
 
-        This function uses the `extract_vital_details` instance method of the
-        `MarksheetModel` class.
+        This gives the same result, and raises the same errors, as the
+        `extract_vital_details` instance method of the `MarksheetModel`
+        class, but without building a python-docx `Document`. Instead, the
+        top of the marksheet's xml is streamed just once, using
+        `docxreader.read_marksheet_header`.
         '''
 
-        marksheet_model = cls(marksheet_filename, sequence_name)
-        return marksheet_model.extract_vital_details()
+        paragraphs, dropdown_grade = cls.read_marksheet_header(marksheet_filename)
+
+        return cls.get_vital_details(paragraphs,
+                                     dropdown_grade,
+                                     sequence_name,
+                                     marksheet_filename)
+
+    @classmethod
+    def read_marksheet_header(cls, marksheet_filename):
+        '''Return the contents of the paragraphs at the top of a marksheet,
+        down to the grade, and the value of its grade dropdown, which is
+        None if the dropdown could not be read.'''
+
+        return docxreader.read_marksheet_header(
+                marksheet_filename,
+                paragraph_count=cls.marker_grade_par_index + 1)
+
+    @classmethod
+    def detect_sequence_name(cls, P):
+        '''Return the name of the sequence of a marksheet, from the title in
+        its paragraph contents `P`. Raise an AssertionError if the title is
+        not that of one of the sequences in conf.'''
+
+        match = cls.sequence_title_pattern.match(P[cls.title_par_index])
+        assertTrue(match)
+
+        sequence_name = match.groups()[0]
+        assertTrue(sequence_name in conf.sequences)
+
+        return sequence_name
+
+    @classmethod
+    def get_vital_details(cls, P, dropdown_grade, sequence_name, document_name):
+        '''Validate the header of a marksheet of the sequence `sequence_name`,
+        as read by `read_marksheet_header`, and return its vital details.'''
+
+        cls.validate_paragraphs(P, cls.sequence_title_template % sequence_name)
+
+        if dropdown_grade is not None:
+            dropdown_grade = check_grade(normalize_grade(dropdown_grade))
+
+        return cls.parse_vital_details(P, dropdown_grade, document_name)
+
+    @classmethod
+    def validate_paragraphs(cls, P, sequence_title):
+        '''Validate the starting paragraph structure, given the paragraph
+        contents `P`. Anything unexpected will raise an Assertion error.'''
+
+        assertEqual(P[cls.title_par_index], sequence_title)
+        assertEqual(P[cls.null_par_index], '')
+        assertTrue(cls.student_name_pattern.match(P[cls.student_name_par_index]))
+        assertTrue(cls.student_id_pattern.match(P[cls.student_ID_par_index]))
+        assertTrue(cls.marker_name_pattern.match(P[cls.marker_name_par_index]))
+        assertTrue(cls.marker_email_pattern.match(P[cls.marker_email_par_index]))
+        assertTrue(cls.marker_grade_pattern.match(P[cls.marker_grade_par_index]))
+
+    @classmethod
+    def parse_vital_details(cls, P, dropdown_grade, document_name):
+        '''Return the vital details tuple (see `extract_vital_details`) given
+        the paragraph contents `P` and the value of the grade dropdown, which
+        is None if the dropdown could not be read.'''
+
+        # This BS is to deal with what happens if someone messes with the
+        # dropdown menu. 
+        grade = dropdown_grade
+        if grade is None:
+            print("Probably can't read dropdown in %s." % document_name,
+                  file=sys.stderr)
+            grade = cls.marker_grade_pattern.match(P[cls.marker_grade_par_index]).groups()[0]
+            grade = check_grade(normalize_grade(grade))
+
+        return (cls.student_name_pattern.match(P[cls.student_name_par_index]).groups()[0],
+                cls.student_id_pattern.match(P[cls.student_ID_par_index]).groups()[0],
+                cls.marker_name_pattern.match(P[cls.marker_name_par_index]).groups()[0],
+                cls.marker_email_pattern.match(P[cls.marker_email_par_index]).groups()[0],
+                grade)
 
     ###########
        
@@ -216,15 +725,8 @@ class MarksheetModel(object):
         ''' This validates the starting paragraph structure. Anything
         unexpected will raise an Assertion error.'''
         
-        P = self.get_paragraph_contents()
-        
-        assertEqual(P[self.title_par_index], self.sequence_name)
-        assertEqual(P[self.null_par_index], '')
-        assertTrue(self.student_name_pattern.match(P[self.student_name_par_index]))
-        assertTrue(self.student_id_pattern.match(P[self.student_ID_par_index]))
-        assertTrue(self.marker_name_pattern.match(P[self.marker_name_par_index]))
-        assertTrue(self.marker_email_pattern.match(P[self.marker_email_par_index]))
-        assertTrue(self.marker_grade_pattern.match(P[self.marker_grade_par_index]))
+        self.validate_paragraphs(self.get_paragraph_contents(), 
+                                 self.sequence_name)
         
     def extract_vital_details(self):
 
@@ -240,28 +742,9 @@ class MarksheetModel(object):
         
         P = self.get_paragraph_contents()
 
-        # This BS is to deal with what happens if someone messes with the
-        # dropdown menu. 
-        try:
-            grade = get_grade_from_marksheet(self.document_name)
-        except AttributeError:
-            print("Probably can't read dropdown in %s." % self.document_name)
-            grade = self.marker_grade_pattern.match(P[self.marker_grade_par_index]).groups()[0]
-                    
-            try:
-                assert grade in conf.grades
-            except:
-                grade = grade.strip().replace('.','').upper()
-
-            assert grade in conf.grades,\
-                'Grade %s not in grades list %s.' % (grade, ' ,'.join(conf.grades))
+        grade = get_grade_from_marksheet(self.document_name)
 
-        
-        return (self.student_name_pattern.match(P[self.student_name_par_index]).groups()[0],
-                self.student_id_pattern.match(P[self.student_ID_par_index]).groups()[0],
-                self.marker_name_pattern.match(P[self.marker_name_par_index]).groups()[0],
-                self.marker_email_pattern.match(P[self.marker_email_par_index]).groups()[0],
-                grade)
+        return self.parse_vital_details(P, grade, self.document_name)
     
     def make_new_marksheet(self, 
                           student_name,
@@ -293,3 +776,179 @@ class MarksheetModel(object):
         self.document.save(new_marksheet_name)
 
 
+
+
+class MarksheetTemplate(object):
+
+    '''A marksheet template, loaded once, from which any number of new
+    marksheets can be written.
+
+    Rather than editing a python-docx `Document`, the template's
+    `word/document.xml` is split, once, around the student name, student ID,
+    marker name and marker email paragraphs (see `MarksheetModel`), and a new
+    marksheet's xml is made by joining the pieces with new versions of these
+    four paragraphs. As with python-docx, each new paragraph keeps its
+    paragraph properties and has the new text as its only run.
+
+    All the other parts of the template are compressed once, into an
+    in-memory zip file. Writing a new marksheet is then a matter of writing a
+    copy of that zip file's bytes and appending the new document xml to it.
+
+    '''
+
+    document_xml_name = 'word/document.xml'
+
+    header_par_indices = (MarksheetModel.student_name_par_index,
+                          MarksheetModel.student_ID_par_index,
+                          MarksheetModel.marker_name_par_index,
+                          MarksheetModel.marker_email_par_index)
+
+    # Any start, end or empty xml tag.
+    tag_pattern = re.compile(r'<(/?)([\w:]+)[^>]*?(/?)>')
+
+    paragraph_properties_pattern = re.compile(r'<w:pPr\s*/>|<w:pPr\b.*?</w:pPr>',
+                                              re.DOTALL)
+
+    def __init__(self, template_fname=None):
+
+        if template_fname is None:
+            template_fname = conf.marksheet_template_fname
+
+        self.template_fname = template_fname
+
+        base = io.BytesIO()
+        with zipfile.ZipFile(self.template_fname) as template,\
+                zipfile.ZipFile(base, 'w') as base_zip:
+            for member in template.infolist():
+                if member.filename == self.document_xml_name:
+                    self.document_xml_info = member
+                    document_xml = template.read(member).decode('utf-8')
+                else:
+                    base_zip.writestr(member, template.read(member))
+
+        self.base_zip_bytes = base.getvalue()
+
+        self.split_document_xml(document_xml)
+
+    def split_document_xml(self, document_xml):
+
+        '''Split the document xml around the four header paragraphs.
+
+        This sets `fixed_parts`, the xml before, between and after the header
+        paragraphs, and `paragraph_starts`, the start tag and paragraph
+        properties of each header paragraph.
+
+        '''
+
+        body_start = document_xml.index('<w:body>') + len('<w:body>')
+
+        # Find the (start, content start, end) spans of the paragraphs that
+        # are children of the body.
+        paragraph_spans = []
+        depth = 0
+        for tag in self.tag_pattern.finditer(document_xml, body_start):
+            is_end, name, is_empty = tag.groups()
+            if is_end:
+                depth -= 1
+                if depth == 0 and name == 'w:p':
+                    paragraph_spans[-1][2] = tag.end()
+            else:
+                if depth == 0 and name == 'w:p':
+                    paragraph_spans.append([tag.start(), tag.end(), tag.end()])
+                if not is_empty:
+                    depth += 1
+
+            # Stop at the end of the body, or after the last header paragraph.
+            if depth < 0 or (depth == 0 and 
+                             len(paragraph_spans) > max(self.header_par_indices)):
+                break
+
+        self.fixed_parts = []
+        self.paragraph_starts = []
+
+        end = 0
+        for par_index in self.header_par_indices:
+            start, content_start, stop = paragraph_spans[par_index]
+            self.fixed_parts.append(document_xml[end:start])
+
+            start_tag = document_xml[start:content_start]
+            if start_tag.endswith('/>'):
+                self.paragraph_starts.append(start_tag[:-2] + '>')
+            else:
+                paragraph_properties = self.paragraph_properties_pattern.match(
+                        document_xml, content_start)
+                self.paragraph_starts.append(
+                        start_tag + (paragraph_properties.group()
+                                     if paragraph_properties else ''))
+            end = stop
+
+        self.fixed_parts.append(document_xml[end:])
+
+    def get_document_xml(self, student_name, student_ID, marker_name, marker_email):
+
+        'Return the document xml of a new marksheet.'
+
+        texts = ('%s: %s' % (MarksheetModel.student_name_label, student_name),
+                 '%s: %s' % (MarksheetModel.student_ID_label, student_ID),
+                 '%s: %s' % (MarksheetModel.marker_name_label, marker_name),
+                 '%s: %s' % (MarksheetModel.marker_email_label, marker_email))
+
+        parts = [self.fixed_parts[0]]
+        for paragraph_start, text, fixed_part\
+                in zip(self.paragraph_starts, texts, self.fixed_parts[1:]):
+            parts.append('%s<w:r><w:t xml:space="preserve">%s</w:t></w:r></w:p>'
+                         % (paragraph_start, xml_escape(text)))
+            parts.append(fixed_part)
+
+        return ''.join(parts)
+
+    @profiling.timed('marksheet creation')
+    def make_new_marksheet(self,
+                           student_name,
+                           student_ID,
+                           marker_name,
+                           marker_email,
+                           new_marksheet_name):
+
+        '''
+        Create a new marksheet named `new_marksheet_name` where 
+        * the student name is `student_name`
+        * student ID is `student_ID`
+        * marker name is `marker_name`, 
+        * marker email is `marker_email`.
+
+        '''
+
+        document_xml = self.get_document_xml(student_name,
+                                             student_ID,
+                                             marker_name,
+                                             marker_email)
+
+        with open(new_marksheet_name, 'wb') as new_marksheet:
+            new_marksheet.write(self.base_zip_bytes)
+
+        with zipfile.ZipFile(new_marksheet_name, 'a') as new_marksheet:
+            new_marksheet.writestr(self.document_xml_info,
+                                   document_xml.encode('utf-8'))
+
+
+def make_new_marksheets(rows, threads=4, template_fname=None):
+
+    '''Create a new marksheet for each row of `rows`, which is an iterable of
+    (student name, student ID, marker name, marker email, new marksheet
+    name) tuples, i.e. the arguments of `make_new_marksheet`.
+
+    The template is loaded just once, and the marksheets are written by a
+    pool of `threads` threads. Return a list of the new marksheets' names, in
+    the same order as `rows`.
+
+    '''
+
+    template = MarksheetTemplate(template_fname)
+
+    def make_new_marksheet(row):
+        template.make_new_marksheet(*row)
+        return row[-1]
+
+    with ThreadPool(threads) as pool:
+        return pool.map(make_new_marksheet, rows)
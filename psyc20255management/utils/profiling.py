@@ -0,0 +1,103 @@
+"""Timing of the stages of a run, e.g. reading marksheets or copying reports.
+
+The functions of each stage are wrapped with `timed`, and while timing is
+enabled (see `enable`), the time taken by each call is recorded against the
+stage's name. `format_report` then gives the count, total, median and 95th
+percentile time of each stage.
+
+Timing is off by default, in which case `timed` functions just call the
+function.
+
+Only the times in this process are recorded, not those in worker processes.
+Times in threads are recorded.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import time
+import functools
+import threading
+from collections import defaultdict
+
+#================================ End Imports ================================
+
+_enabled = False
+_timings = defaultdict(list)
+_timings_lock = threading.Lock()
+
+
+def enable():
+    'Start recording the time of each stage.'
+    global _enabled
+    _enabled = True
+
+
+def record(stage_name, seconds):
+    'Record that a call of the stage `stage_name` took `seconds`.'
+    with _timings_lock:
+        _timings[stage_name].append(seconds)
+
+
+def timed(stage_name):
+
+    '''Return a decorator that times each call of a function as a call of
+    the stage `stage_name`, when timing is enabled.'''
+
+    def decorator(function):
+
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(stage_name, time.perf_counter() - start)
+
+        return timed_function
+
+    return decorator
+
+
+def percentile(sorted_seconds, p):
+    'Return the `p`th percentile, by nearest rank, of `sorted_seconds`.'
+    rank = max(1, -(-p * len(sorted_seconds) // 100))
+    return sorted_seconds[int(rank) - 1]
+
+
+def get_report():
+
+    '''Return a list of the (stage_name, count, total, p50, p95) of each stage,
+    in seconds, in order of their total time, greatest first.'''
+
+    with _timings_lock:
+        timings = {stage_name: sorted(seconds)
+                   for stage_name, seconds in _timings.items()}
+
+    report = [(stage_name,
+               len(seconds),
+               sum(seconds),
+               percentile(seconds, 50),
+               percentile(seconds, 95))
+              for stage_name, seconds in timings.items()]
+
+    return sorted(report, key=lambda row: -row[2])
+
+
+def format_report():
+
+    '''Return the report of `get_report`, with times in milliseconds, as a
+    list of lines of a table.'''
+
+    lines = ['%-30s %8s %10s %9s %9s' % ('Stage', 'count', 'total ms',
+                                          'p50 ms', 'p95 ms')]
+    for stage_name, count, total, p50, p95 in get_report():
+        lines.append('%-30s %8d %10.1f %9.2f %9.2f' % (stage_name,
+                                                       count,
+                                                       1000 * total,
+                                                       1000 * p50,
+                                                       1000 * p95))
+
+    return lines
@@ -0,0 +1,46 @@
+"""The records of submitted reports and completed marksheets.
+
+These are namedtuples rather than dictionaries, so that each record holds
+just its values, and not a dictionary of the same few keys all over again.
+When several years of submissions and marksheets are loaded at once, that
+is most of the memory used.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+from collections import namedtuple
+
+#================================ End Imports ================================
+
+# The most recent submission of a student, as listed by
+# `reports.get_submitted_reports_list`. The filepath is the path of the
+# report, or its name within the dropbox zip file, and the checksum is None
+# until it has been calculated.
+Submission = namedtuple('Submission',
+                        ['filename',
+                         'filepath',
+                         'student_name',
+                         'student_id',
+                         'extension',
+                         'timestamp',
+                         'checksum'])
+
+# A marksheet in a completed marking directory, as listed by
+# `marksheets.list_completed_marksheets`, with the student's name and ID as
+# given by its filename.
+CompletedMarksheet = namedtuple('CompletedMarksheet',
+                                ['student_name',
+                                 'student_id',
+                                 'filename',
+                                 'filepath'])
+
+# The details extracted from a completed marksheet, as returned by
+# `marksheets.process_completed_marksheets`.
+CompletedMarksheetRow = namedtuple('CompletedMarksheetRow',
+                                   ['student_name',
+                                    'student_id',
+                                    'marker_name',
+                                    'marker_email',
+                                    'grade',
+                                    'filepath'])
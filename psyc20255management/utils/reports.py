@@ -5,76 +5,195 @@
 # Standard library imports
 #=============================================================================
 import os
-import datetime
+import sys
+import time
+import zipfile
+import posixpath
 import shutil
-from collections import defaultdict
-
-#=============================================================================
-# Imports of homespun packages
-#=============================================================================
-from ernst import esys
+from multiprocessing.pool import ThreadPool
 
 #=============================================================================
 # Local imports
 #=============================================================================
 from .. import conf
+from . import checksums, filenames, profiling, scanindex
+from .records import Submission
 
 #================================ End Imports ================================
 
 
-def get_submitted_reports_list(reports_directory):
+def get_submitted_reports_list(reports_directory,
+                               threads=1,
+                               strict=False,
+                               persistent_index=False):
 
     '''
     Return a list of all submitted reports.
     Keep only the most recent submitted version when there are more than one
     submissions.
 
+    This is done in two passes. The first uses only the filenames to find
+    the most recent submission of each student. The second checksums just
+    those, using a pool of `threads` threads if `threads` is greater than 1.
+    Superseded submissions are never read.
+
+    In `strict` mode, malformed filenames raise a
+    `filenames.MalformedFilenamesError` (see `get_most_recent_submissions`).
+
+    The directory is listed by `scanindex.scan_directory`, and, if
+    `persistent_index`, only the files that are new since the last listing
+    have their names parsed.
+
+    '''
+
+    entries = scanindex.scan_directory(reports_directory,
+                                       filenames.parse_submitted_report_filename,
+                                       'submissions',
+                                       persistent_index)
+
+    submissions\
+        = get_most_recent_submissions(entries,
+                                      lambda entry: os.path.join(reports_directory,
+                                                                 entry.name),
+                                      fname_getter=lambda entry: entry.name,
+                                      parsed_fname_getter=lambda entry: entry.parsed,
+                                      strict=strict)
+
+    filepaths = [submission.filepath for submission in submissions.values()]
+
+    return {student_id: submission._replace(checksum=checksum)
+            for (student_id, submission), checksum
+            in zip(submissions.items(),
+                   checksums.checksum_files(filepaths, threads=threads))}
+
+
+def get_submitted_reports_list_from_zip(submissions_dropbox_zip,
+                                        strict=False,
+                                        with_checksums=True):
+
+    '''
+    As `get_submitted_reports_list`, but read the submissions directly from
+    the zip file downloaded from the NOW dropbox, rather than from a
+    directory that it has been extracted to.
+
+    The submissions are found from the zip file's central directory, and only
+    the most recent submission of each student is read, in order to checksum
+    it, unless not `with_checksums`, in which case their checksums are left
+    as None. The `filepath` of each submission is its name within the zip
+    file.
+
     '''
 
-    def get_timestamp(timestamp_str):
-        '''Parse a timestamp string
-        
-        In particular, this is to parse the one in the submitted report filename.
-        '''
+    with zipfile.ZipFile(submissions_dropbox_zip) as dropbox:
+
+        members = [member for member in dropbox.namelist()
+                   if not member.endswith('/')]
 
-        return datetime.datetime.strptime(timestamp_str, "%d %B, %Y %I%M %p")
+        submissions\
+            = get_most_recent_submissions(sorted(members, key=posixpath.basename),
+                                          lambda member: member,
+                                          fname_getter=posixpath.basename,
+                                          strict=strict)
 
+        if not with_checksums:
+            return submissions
+
+        for student_id, submission in submissions.items():
+            with dropbox.open(submission.filepath) as report:
+                submissions[student_id]\
+                        = submission._replace(
+                                checksum=checksums.checksum_stream(report))
+
+    return submissions
+
+
+@profiling.timed('submission listing')
+def get_most_recent_submissions(fnames, 
+                                filepath_getter, 
+                                fname_getter=None, 
+                                parsed_fname_getter=None,
+                                strict=False):
+
+    '''
+    Return a dictionary, keyed by student ID, of the most recent submission
+    of each student from a listing `fnames` of submitted reports. 
 
-    def get_most_recent_submission(multiple_submissions):
-        '''
-        Return the most recent submission from a list of submissions, each of
-        which contain a submission timestamp.
+    Each submission is a `records.Submission`, with no checksum yet, where
+    the filepath is `filepath_getter(fname)`. If `fname_getter` is given, then the submitted
+    report's filename is `fname_getter(fname)`. If `parsed_fname_getter` is
+    given, then the filename has already been parsed, by
+    `filenames.parse_submitted_report_filename`, as
+    `parsed_fname_getter(fname)`.
 
-        '''
-        return sorted(multiple_submissions, 
-                      key = lambda submission: submission['timestamp']).pop()
+    Malformed filenames are summarized at the end or, in `strict` mode,
+    raised all together in a `filenames.MalformedFilenamesError`.
 
-    submissions = defaultdict(list)
-    for fname in os.listdir(reports_directory):
-        match = conf.submitted_report_filename_pattern.match(fname)
-        if not match:
-            print('Did not match file "%s".' % fname)
+    This uses just the filenames, and does not read any files.
+
+    '''
+
+    submissions = {}
+    malformed_fnames = []
+    for listed_fname in fnames:
+
+        if fname_getter is None:
+            fname = listed_fname
+        else:
+            fname = fname_getter(listed_fname)
+
+        if parsed_fname_getter is None:
+            parsed_fname = filenames.parse_submitted_report_filename(fname)
         else:
-            _, student_id, student_name, date_string, doc_name = match.groups()
-            timestamp = get_timestamp(date_string)
+            parsed_fname = parsed_fname_getter(listed_fname)
+        if parsed_fname is None:
+            malformed_fnames.append(fname)
+            continue
+
+        student_id = parsed_fname.student_id
+        timestamp = parsed_fname.timestamp
+
+        # Keep only the most recent submission. Of two submissions with
+        # the same timestamp, the later one in the listing wins.
+        most_recent_submission = submissions.get(student_id)
+        if most_recent_submission is not None\
+                and most_recent_submission.timestamp > timestamp:
+            continue
+
+        _, extension = os.path.splitext(fname)
+
+        assert extension[0] == '.', 'expecting a dot at start of %s' % extension
+
+        submissions[student_id]\
+            = Submission(filename = fname,
+                         filepath = filepath_getter(listed_fname),
+                         student_name = parsed_fname.student_name,
+                         student_id = student_id,
+                         extension = extension,
+                         timestamp = timestamp,
+                         checksum = None)
+
+    if strict and malformed_fnames:
+        raise filenames.MalformedFilenamesError(malformed_fnames)
 
-            filepath = os.path.join(reports_directory, fname)
-            _, extension = os.path.splitext(filepath)
+    if malformed_fnames:
+        print(scanindex.format_unmatched_summary(malformed_fnames),
+              file=sys.stderr)
 
-            assert extension[0] == '.', 'expecting a dot at start of %s' % extension
+    return submissions
 
-            submissions[student_id].append(
-                dict(filename = fname,
-                     filepath = filepath,
-                     student_name = student_name,
-                     student_id = student_id,
-                     extension = extension,
-                     checksum = esys.checksum(filepath),
-                     timestamp = timestamp)
-            )
-            
-    return {key:get_most_recent_submission(submissions[key]) 
-            for key in submissions}
+
+def get_new_report_filename(submission_info):
+
+    '''
+    Return the name to give the copy of the report whose details are listed in
+    `submission_info`, which is determined by the new_report_fname_template
+    that is found in conf.py. 
+
+    '''
+
+    return conf.new_report_fname_template % (submission_info.student_name.replace(' ', '_'), 
+                                             submission_info.student_id,
+                                             submission_info.extension)
 
 
 def copy_report(submission_info, new_directory='tmpdir'):
@@ -86,16 +205,134 @@ def copy_report(submission_info, new_directory='tmpdir'):
     The name of the new file is determined by the new_report_fname_template
     that is found in conf.py. 
 
+    The report is read just once, and checksummed as it is copied. The
+    checksum is checked against the one in `submission_info`.
+
     '''
     
-    new_filename = conf.new_report_fname_template % (submission_info['student_name'].replace(' ', '_'), 
-                                                     submission_info['student_id'],
-                                                     submission_info['extension'])
+    new_filename, _ = _copy_report(submission_info, new_directory)
+
+    return new_filename # Return new name just in case we need it
+
+
+def copy_report_from_zip(dropbox, submission_info, new_directory='tmpdir'):
+
+    '''
+    As `copy_report`, but copy the report out of the open NOW dropbox zip
+    file `dropbox`, as listed by `get_submitted_reports_list_from_zip`.
+
+    The report is streamed straight to its new name, and checksummed on the
+    way, so it is read only once and never written under its original name.
+
+    '''
+
+    new_filename, _ = _copy_report(submission_info, new_directory, dropbox)
+
+    return new_filename # Return new name just in case we need it
+
+
+@profiling.timed('report copy')
+def _copy_report(submission_info, new_directory, dropbox=None):
+
+    '''Copy a report, from the `dropbox` zip file if given, as `copy_report`
+    and `copy_report_from_zip` do. Return the new filename and the number of
+    bytes copied.'''
+
+    new_filename = get_new_report_filename(submission_info)
     
     new_path = os.path.join(new_directory, new_filename)
-    
-    shutil.copy2(submission_info['filepath'], new_path)
-    
-    assert esys.checksum(new_path) == submission_info['checksum']
-    
-    return new_filename # Return new name just in case we need it
+
+    if dropbox is None:
+        with open(submission_info.filepath, 'rb') as report:
+            checksum, size = copy_and_checksum(report, new_path)
+        shutil.copystat(submission_info.filepath, new_path)
+    else:
+        with dropbox.open(submission_info.filepath) as report:
+            checksum, size = copy_and_checksum(report, new_path)
+
+    assert checksum == submission_info.checksum,\
+            'Checksum of %s changed while copying.' % submission_info.filename
+
+    return new_filename, size
+
+
+def copy_and_checksum(stream, new_path):
+
+    '''
+    Copy the contents of the binary file object `stream` to a new file
+    `new_path`. Each chunk read goes to both the new file and the hasher, so
+    the contents are read only once, into this thread's buffer (see
+    `checksums.iter_chunks`). Return the checksum, as from
+    `checksums.checksum_stream`, and the number of bytes copied.
+
+    '''
+
+    hasher = checksums.get_hasher()
+    size = 0
+    with open(new_path, 'wb') as new_file:
+        for chunk in checksums.iter_chunks(stream):
+            hasher.update(chunk)
+            new_file.write(chunk)
+            size += len(chunk)
+
+    return hasher.hexdigest(), size
+
+
+def intake_reports(copies, threads=4, dropbox=None, progress_output=None):
+
+    '''
+    Copy many reports concurrently, as `copy_report` does, or as
+    `copy_report_from_zip` does if `dropbox` is given.
+
+    `copies` is a list of (submission_info, new_directory) pairs, and at most
+    `threads` of them are copied at a time. If `progress_output` is a text
+    file, e.g. sys.stderr, a running count of the reports copied is written
+    to it.
+
+    Return a dictionary with keys
+    * new_filenames, the new filename of each report, in the order of `copies`
+    * files, the number of reports copied
+    * bytes, the number of bytes copied
+    * seconds, the time taken
+
+    '''
+
+    def copy(indexed_copy):
+        index, (submission_info, new_directory) = indexed_copy
+        return (index,) + _copy_report(submission_info, new_directory, dropbox)
+
+    new_filenames = [None] * len(copies)
+    total_size = 0
+
+    start = time.perf_counter()
+    with ThreadPool(threads) as pool:
+        for count, (index, new_filename, size)\
+                in enumerate(pool.imap_unordered(copy, enumerate(copies)), 1):
+            new_filenames[index] = new_filename
+            total_size += size
+            if progress_output is not None:
+                progress_output.write('\rCopied %d of %d reports' 
+                                      % (count, len(copies)))
+                progress_output.flush()
+
+    if progress_output is not None and copies:
+        progress_output.write('\n')
+
+    return dict(new_filenames = new_filenames,
+                files = len(copies),
+                bytes = total_size,
+                seconds = time.perf_counter() - start)
+
+
+def format_intake_summary(summary):
+
+    '''Return the throughput of an `intake_reports` summary as a sentence.'''
+
+    seconds = max(summary['seconds'], 1e-9)
+
+    return 'Copied %d reports (%.1f MB) in %.2f s: %.1f MB/s, %.1f files/s.'\
+            % (summary['files'],
+               summary['bytes'] / 1e6,
+               summary['seconds'],
+               summary['bytes'] / 1e6 / seconds,
+               summary['files'] / seconds)
@@ -0,0 +1,200 @@
+"""A persistent index of the files in a directory, for listing dropboxes and
+completed marking directories without going through every file each time.
+
+A `ScanIndex` keeps, for each file in a directory, its name and the fields
+parsed from its name, or None if the name did not match. It is kept on
+disk, one index file per directory and kind of listing. Each scan is by
+`os.scandir`, and only files that were not in the index are parsed. If the
+directory's modification time has not changed, no file has been added,
+removed or renamed since the last scan, and the directory is not listed at
+all.
+
+The index does not keep the sizes or modification times of the files, as
+a file can be rewritten in place, keeping its name, without the directory
+changing. Whatever needs them, e.g. the `MarksheetCache`, stats the file
+itself.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import time
+import pickle
+import hashlib
+from collections import namedtuple
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from .. import conf
+from . import profiling
+
+#================================ End Imports ================================
+
+# A directory modified less than this long before a scan may be modified
+# again within the same tick of its clock, so its modification time is not
+# trusted until the next scan.
+racy_seconds = 2
+
+# The number of unmatched filenames shown by `format_unmatched_summary`.
+unmatched_shown = 10
+
+# A file in a directory, as indexed by `ScanIndex`, where parsed is what the
+# index's parse function gave for the name, or None if it did not match.
+ScanEntry = namedtuple('ScanEntry', ['name', 'parsed'])
+
+
+class ScanIndex(object):
+
+    '''An index of the files in the directory `dirname`, whose names are
+    parsed by `parse`, a function that returns the fields of a name, which
+    can be pickled, or None if it does not match.
+
+    The index is loaded from, and saved to, `index_filename` if it is given,
+    and is otherwise just kept in memory. The number of files that were
+    parsed, and whose entries were reused, on the last scan are kept in
+    `parsed_count` and `reused_count`.
+
+    '''
+
+    version = 2
+
+    def __init__(self, dirname, parse, index_filename=None):
+
+        self.dirname = dirname
+        self.parse = parse
+        self.index_filename = index_filename
+
+        self.directory_mtime = None
+        self.entries = {}
+
+        self.parsed_count = 0
+        self.reused_count = 0
+
+        # Whether the index has changed since it was loaded or saved.
+        self.is_changed = False
+
+        if index_filename is not None and os.path.exists(index_filename):
+            # An index of an older version may not even unpickle, as its
+            # entries had other fields, in which case it is started afresh.
+            try:
+                with open(index_filename, 'rb') as index_file:
+                    index_contents = pickle.load(index_file)
+            except (pickle.UnpicklingError, TypeError, AttributeError, EOFError):
+                index_contents = {}
+            if index_contents.get('version') == self.version:
+                self.directory_mtime = index_contents['directory_mtime']
+                self.entries = index_contents['entries']
+
+    #### Class methods ####
+    @classmethod
+    def for_directory(cls, dirname, parse, kind):
+        '''Return the persistent index of the directory `dirname` for the
+        `kind` of listing, e.g. 'submissions', which is kept in
+        `conf.cache_directory`.'''
+
+        key = '%s\0%s' % (os.path.abspath(dirname), kind)
+        index_fname = conf.scan_index_fname_template\
+                % hashlib.md5(key.encode('utf-8')).hexdigest()
+
+        return cls(dirname, parse, os.path.join(conf.cache_directory, index_fname))
+
+    ###########
+
+    @profiling.timed('directory scan')
+    def scan(self):
+
+        '''Bring the index up to date with the directory, and return the
+        `ScanEntry`s of its files, in order of their names. Subdirectories
+        are left out.'''
+
+        scan_time = time.time_ns()
+        directory_mtime = os.stat(self.dirname).st_mtime_ns
+
+        if directory_mtime == self.directory_mtime:
+            self.parsed_count, self.reused_count = 0, len(self.entries)
+            return [self.entries[name] for name in sorted(self.entries)]
+
+        entries = {}
+        self.parsed_count, self.reused_count = 0, 0
+
+        with os.scandir(self.dirname) as dir_entries:
+            for dir_entry in dir_entries:
+
+                if not dir_entry.is_file():
+                    continue
+
+                entry = self.entries.get(dir_entry.name)
+                if entry is None:
+                    entry = ScanEntry(name = dir_entry.name,
+                                      parsed = self.parse(dir_entry.name))
+                    self.parsed_count += 1
+                else:
+                    self.reused_count += 1
+
+                entries[dir_entry.name] = entry
+
+        self.is_changed = self.is_changed\
+                          or self.parsed_count > 0\
+                          or len(entries) != len(self.entries)
+        self.entries = entries
+        if scan_time - directory_mtime < racy_seconds * 10 ** 9:
+            self.directory_mtime = None
+        elif self.directory_mtime != directory_mtime:
+            self.directory_mtime = directory_mtime
+            self.is_changed = True
+
+        return [self.entries[name] for name in sorted(self.entries)]
+
+    def save(self):
+
+        'Write the index to disk, if it has an index file and has changed.'
+
+        if self.index_filename is None or not self.is_changed:
+            return
+
+        index_dirname = os.path.dirname(self.index_filename)
+        if index_dirname:
+            os.makedirs(index_dirname, exist_ok=True)
+
+        # Write and then rename, as for the marksheet cache.
+        tmp_filename = self.index_filename + '.tmp'
+        with open(tmp_filename, 'wb') as index_file:
+            pickle.dump(dict(version = self.version,
+                             directory_mtime = self.directory_mtime,
+                             entries = self.entries),
+                        index_file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filename, self.index_filename)
+        self.is_changed = False
+
+
+def scan_directory(dirname, parse, kind, persistent=False):
+
+    '''Return the `ScanEntry`s of the files in `dirname`, whose names are
+    parsed by `parse` (see `ScanIndex`). If `persistent`, the directory's
+    index for the `kind` of listing is used, and saved.'''
+
+    if not persistent:
+        return ScanIndex(dirname, parse).scan()
+
+    scan_index = ScanIndex.for_directory(dirname, parse, kind)
+    entries = scan_index.scan()
+    scan_index.save()
+
+    return entries
+
+
+def format_unmatched_summary(fnames):
+
+    '''Return a one line summary of the filenames `fnames` that did not
+    match, showing the first `unmatched_shown` of them.'''
+
+    shown = ', '.join('"%s"' % fname for fname in fnames[:unmatched_shown])
+    if len(fnames) > unmatched_shown:
+        shown += ', and %d more' % (len(fnames) - unmatched_shown)
+
+    return 'Did not match %d file%s: %s.' % (len(fnames),
+                                             '' if len(fnames) == 1 else 's',
+                                             shown)
@@ -0,0 +1,262 @@
+"""Watch the completed marking directory, and process marksheets as they
+arrive.
+
+A snapshot of the directory (the name, size and modification time of each
+file) is kept, and only the marksheets that have been added or modified
+since the last snapshot are processed. A running tally of graded, ungraded
+and invalid marksheets is kept.
+
+The directory is rescanned every so often or, if the optional
+`inotify_simple` package is available, as soon as anything in it changes.
+
+"""
+#=============================================================================
+# Standard library imports
+#=============================================================================
+import os
+import sys
+import time
+from collections import Counter
+
+#=============================================================================
+# Third party imports
+#=============================================================================
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+#=============================================================================
+# Imports of homespun packages
+#=============================================================================
+from ernst.emisc import assertEqual
+
+#=============================================================================
+# Local imports
+#=============================================================================
+from .. import conf
+from .marksheets import (MarksheetModel,
+                         get_completed_marksheet,
+                         read_completed_marksheet,
+                         check_completed_marksheet)
+from .scanindex import format_unmatched_summary
+
+#================================ End Imports ================================
+
+GRADED = 'graded'
+UNGRADED = 'ungraded'
+INVALID = 'invalid'
+
+
+def take_snapshot(dirname):
+
+    '''Return a dictionary, keyed by filename, of the (size, modification time)
+    of each file in `dirname`.'''
+
+    snapshot = {}
+    for fname in os.listdir(dirname):
+        try:
+            stat = os.stat(os.path.join(dirname, fname))
+        except FileNotFoundError:
+            # Deleted while we were looking.
+            continue
+        snapshot[fname] = (stat.st_size, stat.st_mtime_ns)
+
+    return snapshot
+
+
+def classify_marksheet(completed_marksheet, sequence_name):
+
+    '''Process a completed marksheet, and return a (status, row, exception)
+    tuple, where the status is one of
+
+    * GRADED, if it processes without error.
+    * UNGRADED, if everything except the grade checks out.
+    * INVALID, otherwise.
+
+    The row and exception are as returned by `process_completed_marksheet`.
+
+    '''
+
+    header_result = read_completed_marksheet(completed_marksheet)
+
+    row, exception = check_completed_marksheet(completed_marksheet,
+                                               header_result,
+                                               sequence_name)
+
+    if exception is None:
+        return GRADED, row, exception
+
+    # Find out whether it is only the grade that is wrong, from the header
+    # that has already been read.
+    header, read_exception = header_result
+    if read_exception is not None:
+        return INVALID, row, exception
+
+    try:
+        P, _ = header
+
+        MarksheetModel.validate_paragraphs(
+                P,
+                MarksheetModel.sequence_title_template % sequence_name)
+
+        student_name = MarksheetModel.student_name_pattern.match(
+                P[MarksheetModel.student_name_par_index]).groups()[0]
+        student_id = MarksheetModel.student_id_pattern.match(
+                P[MarksheetModel.student_ID_par_index]).groups()[0]
+
+        assertEqual(student_name, completed_marksheet.student_name)
+        assertEqual(student_id, completed_marksheet.student_id)
+
+    except Exception:
+        return INVALID, row, exception
+
+    return UNGRADED, row, exception
+
+
+class CompletedMarkingWatcher(object):
+
+    '''Keeps track of the marksheets in a completed marking directory.
+
+    Each call of `scan` processes the marksheets that have been added or
+    modified since the last, and updates `statuses`, the status of each
+    marksheet keyed by filename, and `tally`, the count of each status.
+
+    '''
+
+    def __init__(self,
+                 completed_marking_dirname,
+                 sequence_name='Experimental',
+                 marksheet_fname_pattern=None,
+                 settle_time=1.0):
+
+        if marksheet_fname_pattern is None:
+            marksheet_fname_pattern = conf.marksheet_fname_pattern
+
+        self.completed_marking_dirname = completed_marking_dirname
+        self.sequence_name = sequence_name
+        self.marksheet_fname_pattern = marksheet_fname_pattern
+
+        # Files modified within `settle_time` seconds may still be being
+        # copied in, and are left for a later scan.
+        self.settle_time = settle_time
+
+        self.snapshot = {}
+        self.statuses = {}
+        self.tally = Counter()
+
+    def scan(self):
+
+        '''Process the marksheets that have been added or modified since the
+        last scan, and forget those that have been removed.
+
+        Return a list of (completed_marksheet, status, row, exception) tuples,
+        one for each marksheet processed, in filename order.
+
+        '''
+
+        new_snapshot = take_snapshot(self.completed_marking_dirname)
+        settled_mtime = (time.time() - self.settle_time) * 1e9
+
+        for fname in set(self.snapshot) - set(new_snapshot):
+            del self.snapshot[fname]
+            status = self.statuses.pop(fname, None)
+            if status is not None:
+                self.tally[status] -= 1
+
+        results = []
+        unmatched_fnames = []
+        for fname in sorted(new_snapshot):
+
+            size, mtime = new_snapshot[fname]
+            if self.snapshot.get(fname) == (size, mtime)\
+                    or mtime > settled_mtime:
+                continue
+
+            self.snapshot[fname] = (size, mtime)
+
+            completed_marksheet\
+                    = get_completed_marksheet(self.completed_marking_dirname,
+                                              fname,
+                                              self.marksheet_fname_pattern)
+
+            if completed_marksheet is None:
+                unmatched_fnames.append(fname)
+                continue
+
+            status, row, exception = classify_marksheet(completed_marksheet,
+                                                        self.sequence_name)
+
+            previous_status = self.statuses.get(fname)
+            if previous_status is not None:
+                self.tally[previous_status] -= 1
+            self.statuses[fname] = status
+            self.tally[status] += 1
+
+            results.append((completed_marksheet, status, row, exception))
+
+        if unmatched_fnames:
+            print(format_unmatched_summary(unmatched_fnames), file=sys.stderr)
+
+        return results
+
+    def wait(self, interval):
+
+        '''Return after `interval` seconds, or sooner if inotify is available
+        and something in the directory changes.'''
+
+        if INotify is None:
+            time.sleep(interval)
+            return
+
+        if not hasattr(self, '_inotify'):
+            self._inotify = INotify()
+            self._inotify.add_watch(self.completed_marking_dirname,
+                                    inotify_flags.CREATE
+                                    | inotify_flags.CLOSE_WRITE
+                                    | inotify_flags.MOVED_TO
+                                    | inotify_flags.MOVED_FROM
+                                    | inotify_flags.DELETE)
+
+        # After an event, wait a little longer so that a burst of events is
+        # dealt with in one scan.
+        if self._inotify.read(timeout=int(1000 * interval)):
+            time.sleep(self.settle_time)
+            self._inotify.read(timeout=0)
+
+
+def watch_completed_marksheets(completed_marking_dirname,
+                               sequence_name='Experimental',
+                               marksheet_fname_pattern=None,
+                               interval=5.0):
+
+    '''Watch the completed marking directory until interrupted, printing the
+    status of each marksheet as it is added or modified, and then the running
+    tally.'''
+
+    watcher = CompletedMarkingWatcher(completed_marking_dirname,
+                                      sequence_name,
+                                      marksheet_fname_pattern)
+
+    while True:
+
+        results = watcher.scan()
+
+        for completed_marksheet, status, row, exception in results:
+            if exception is None:
+                print('%-8s %s (%s)' % (status,
+                                        completed_marksheet.filename,
+                                        row.grade))
+            else:
+                print('%-8s %s: %r' % (status,
+                                       completed_marksheet.filename,
+                                       exception))
+
+        if results:
+            print('Tally: %d %s, %d %s, %d %s.'
+                  % (watcher.tally[GRADED], GRADED,
+                     watcher.tally[UNGRADED], UNGRADED,
+                     watcher.tally[INVALID], INVALID),
+                  flush=True)
+
+        watcher.wait(interval)
@@ -3,44 +3,155 @@
 """psyc20255admin: A tool for admin of the NTU psyc20255 module
 
 Usage:
-  psyc20255admin database (create|initialize|populate|update)
-  psyc20255admin submissions (validate|create_marking_assignments) <submissions_dropbox_zip> 
-  psyc20255admin completions (validate|process) <completed_marking_directory>
+  psyc20255admin database (create|initialize) [--config=<file>]
+  psyc20255admin database populate [--config=<file>] [--students=<csv_file>] [--lecturers=<csv_file>] [--labgroup-lecturers=<csv_file>] [--sequence=<name> --submissions=<zip_file>] [--profile] [--profile-dump=<file>]
+  psyc20255admin database update --sequence=<name> [--config=<file>] [--submissions=<zip_file>] [--completions=<dir>] [--processes=<n>] [--profile] [--profile-dump=<file>]
+  psyc20255admin submissions validate <submissions_dropbox_zip> [--profile] [--profile-dump=<file>]
+  psyc20255admin submissions create_marking_assignments <submissions_dropbox_zip> --assignments=<csv_file> [--marking-dir=<dir>] [--threads=<n>] [--profile] [--profile-dump=<file>]
+  psyc20255admin submissions create_marking_assignments <submissions_dropbox_zip> --sequence=<name> [--config=<file>] [--capacities=<csv_file>] [--balance=<weight>] [--marking-dir=<dir>] [--threads=<n>] [--profile] [--profile-dump=<file>]
+  psyc20255admin submissions duplicates <submissions_dropbox_zip> [--similarity=<s>] [--processes=<n>] [--sequence=<name> [--config=<file>]] [--profile] [--profile-dump=<file>]
+  psyc20255admin completions (validate|process) <completed_marking_directory> [--processes=<n>] [--no-cache] [--format=<format>] [--profile] [--profile-dump=<file>]
+  psyc20255admin completions export <completed_marking_directory> <submissions_dropbox_zip> [--sequence=<name>] [--archive-dir=<dir>] [--processes=<n>] [--threads=<n>] [--no-cache] [--profile] [--profile-dump=<file>]
+  psyc20255admin completions watch <completed_marking_directory> [--sequence=<name>] [--interval=<seconds>]
+  psyc20255admin completions batch <completed_marking_directory> [--processes=<n>] [--no-cache] [--format=<format>] [--output-dir=<dir>] [--profile] [--profile-dump=<file>]
+  psyc20255admin analytics [--config=<file>] [--sequence=<name>] [--profile] [--profile-dump=<file>]
+  psyc20255admin analytics --completions=<dir> [--sequence=<name>] [--students=<csv_file>] [--processes=<n>] [--profile] [--profile-dump=<file>]
   psyc20255admin data new <corpus_name> [--data-type=<data_type>] <text_file> <vocab_file>
   psyc20255admin (-h | --help)
   psyc20255admin --version
 
 Options:
   initialize                    Initialize the database, and fill it.
+  --config=<file>               Database config file, with a [database] section
+                                [default: psyc20255management.ini].
+  --students=<csv_file>         Students, with columns uid, firstname, lastname
+                                and labgroup_id.
+  --lecturers=<csv_file>        Lecturers, with columns uid, firstname, lastname
+                                and email.
+  --labgroup-lecturers=<csv_file>
+                                Lecturers who mark each lab group in each
+                                sequence, with columns labgroup_id,
+                                sequence_id and lecturer_id.
+  --sequence=<name>             Lab sequence, e.g. Experimental.
+  --submissions=<zip_file>      Submissions dropbox zip file.
+  --completions=<dir>           Completed marking directory.
+  --processes=<n>               Number of worker processes to use, or 0 for one
+                                per CPU [default: 1].
+  --no-cache                    Process every marksheet, ignoring the cache,
+                                and list the directory afresh.
+  --format=<format>             Output format, csv or jsonl [default: csv].
+  --interval=<seconds>          Seconds between scans when watching [default: 5].
+  --output-dir=<dir>            Directory for the rows of each sequence, in a
+                                batch [default: completions].
+  --archive-dir=<dir>           Directory for the archives of each marker and
+                                student [default: archives].
+  --assignments=<csv_file>      Marking assignments, with columns student_id,
+                                marker_name and marker_email.
+  --similarity=<s>              Least similarity of the text of two reports
+                                for them to be near-duplicates [default: 0.6].
+  --capacities=<csv_file>       Most reports each lecturer can mark, with
+                                columns lecturer_id and capacity.
+  --balance=<weight>            Balance the markers' loads by report bytes, or
+                                by number of reports [default: bytes].
+  --marking-dir=<dir>           Directory of marking assignments [default: marking].
+  --threads=<n>                 Number of threads to use [default: 4].
+  --profile                     Print the time taken by each stage, at the
+                                end. Uses just one process.
+  --profile-dump=<file>         Also profile with cProfile, and write the
+                                stats to <file>, for pstats.
   -h --help                     Show this screen.
   --version                     Show version.
 
 """
 
+# Only light imports here. This script is run a lot, from shell loops and
+# cron, so SQLAlchemy, python-docx, ernst etc are imported only in the
+# branches that need them. See benchmarks/startup_time.py.
+import os
+import sys
+import time
+
 from docopt import docopt
-from sqlalchemy import create_engine
 import psyc20255management
 
-from psyc20255management.models import Base
-from psyc20255management.utils import marksheets
+ROOT = os.path.dirname(os.path.abspath(psyc20255management.__file__))
+
 
-from ernst import esys
+if __name__ == '__main__':
 
-ROOT = esys.thisDir(psyc20255management.__file__)
+    arguments = docopt(__doc__, version='psyc20255 0.0.0')
 
-db_name = 'foobar'
+    if arguments['--profile'] or arguments['--profile-dump']:
+        # The stage times are reported, and the cProfile stats written, as
+        # the script exits, however it exits.
+        import atexit
+        from psyc20255management.utils import profiling
 
+        profiling.enable()
+        atexit.register(lambda: print('\n'.join(profiling.format_report()),
+                                      file=sys.stderr))
 
-if __name__ == '__main__':
+        if arguments['--profile-dump']:
+            import cProfile
+            profiler = cProfile.Profile()
+            atexit.register(profiler.dump_stats, arguments['--profile-dump'])
+            atexit.register(profiler.disable)
+            profiler.enable()
 
-    arguments = docopt(__doc__, version='psyc20255 0.0.0')
-    print(arguments)
+        # Stages in worker processes would not be timed.
+        if arguments['--processes'] != '1':
+            print('Profiling with 1 process rather than %s.' 
+                  % arguments['--processes'], 
+                  file=sys.stderr)
+            arguments['--processes'] = '1'
+
+    # 0 processes means one per CPU, which the pools take as None.
+    try:
+        processes = int(arguments['--processes'])
+        assert processes >= 0
+    except (ValueError, AssertionError):
+        sys.exit('--processes must be a whole number, or 0 for one per CPU.')
+    processes = processes or None
 
     if arguments['completions']:
 
+        from psyc20255management.utils import marksheets
+        from psyc20255management.utils.cache import MarksheetCache
+
+        # Checked before any marksheets are read, rather than when the first
+        # row is written.
+        if arguments['--format'] not in marksheets.output_formats:
+            sys.exit('--format must be one of %s.'
+                     % ', '.join(marksheets.output_formats))
+
         completed_marking_directory\
                 = arguments['<completed_marking_directory>']
 
+        if arguments['watch']:
+            from psyc20255management.utils.watch import watch_completed_marksheets
+
+            sequence_options = {}
+            if arguments['--sequence']:
+                sequence_options['sequence_name'] = arguments['--sequence']
+
+            try:
+                watch_completed_marksheets(
+                        completed_marking_directory,
+                        interval=float(arguments['--interval']),
+                        **sequence_options
+                )
+            except KeyboardInterrupt:
+                sys.exit(0)
+
+        # Bad marksheets are collected here, rather than stopping the run at
+        # the first one, and reported at the end.
+        failures = []
+
+        if arguments['--no-cache']:
+            cache = None
+        else:
+            cache = MarksheetCache.for_directory(completed_marking_directory)
+
         if arguments['validate']:
             ## For now, just go through the process and see if we get errors.
             ## But in the future, we probably want to do
@@ -50,26 +161,418 @@ if __name__ == '__main__':
             ## 4) Check if their report has been reported, and if so, check if
             ##    anything has changed.
             ## 5) etc
-            marksheets.process_completed_marksheets(completed_marking_directory)
+            marksheets.process_completed_marksheets(
+                    completed_marking_directory,
+                    processes=processes,
+                    failures=failures,
+                    cache=cache,
+                    persistent_index=cache is not None
+            )
 
         elif arguments['process']:
+            # Rows are written out as they are extracted, so that whatever
+            # reads them can get going straight away.
             completed_marksheets\
-                    = marksheets.process_completed_marksheets(
-                            completed_marking_directory
+                    = marksheets.iter_completed_marksheets(
+                            completed_marking_directory,
+                            processes=processes,
+                            failures=failures,
+                            cache=cache,
+                            persistent_index=cache is not None
+                    )
+
+            marksheets.write_completed_marksheets(completed_marksheets,
+                                                  sys.stdout,
+                                                  arguments['--format'])
+
+        elif arguments['batch']:
+            # The directory is a tree, e.g. of several sequences and years,
+            # processed in one go. The rows of each sequence are written to
+            # their own file.
+            completed_marksheets, failures_by_sequence\
+                    = marksheets.process_completed_marksheet_tree(
+                            completed_marking_directory,
+                            processes=processes,
+                            cache=cache
+                    )
+
+            output_dir = arguments['--output-dir']
+            os.makedirs(output_dir, exist_ok=True)
+
+            for sequence_name, rows in completed_marksheets.items():
+                output_fname = os.path.join(output_dir,
+                                            '%s.%s' % (sequence_name, 
+                                                       arguments['--format']))
+                with open(output_fname, 'w', newline='') as output:
+                    marksheets.write_completed_marksheets(rows,
+                                                          output,
+                                                          arguments['--format'])
+
+            for line in marksheets.format_batch_summary(completed_marksheets,
+                                                        failures_by_sequence):
+                print(line, file=sys.stderr)
+
+            for sequence_failures in failures_by_sequence.values():
+                failures.extend(sequence_failures)
+
+        elif arguments['export']:
+            # The completed marksheets, and the reports straight from the
+            # dropbox, are archived for each marker and each student. The
+            # reports are not checksummed beforehand, so that each is read
+            # just once, as it is archived.
+            from psyc20255management.utils import reports, archives
+
+            sequence_options = {}
+            if arguments['--sequence']:
+                sequence_options['sequence_name'] = arguments['--sequence']
+
+            completed_marksheets = marksheets.process_completed_marksheets(
+                    completed_marking_directory,
+                    processes=processes,
+                    failures=failures,
+                    cache=cache,
+                    persistent_index=cache is not None,
+                    **sequence_options
+            )
+
+            submissions = reports.get_submitted_reports_list_from_zip(
+                    arguments['<submissions_dropbox_zip>'],
+                    with_checksums=False
+            )
+
+            export_summary = archives.export_archives(
+                    completed_marksheets,
+                    submissions,
+                    arguments['<submissions_dropbox_zip>'],
+                    arguments['--archive-dir'],
+                    threads=int(arguments['--threads'])
+            )
+
+            print(archives.format_export_summary(export_summary), file=sys.stderr)
+            if export_summary['missing_reports']:
+                print('%d students have no report: %s' 
+                      % (len(export_summary['missing_reports']),
+                         ', '.join(export_summary['missing_reports'])),
+                      file=sys.stderr)
+
+        if cache is not None:
+            cache.save()
+            print('Marksheet cache: %d hits, %d misses.' 
+                  % (cache.hits, cache.misses),
+                  file=sys.stderr)
+
+        if failures:
+            print('%d bad marksheets:' % len(failures), file=sys.stderr)
+            for completed_marksheet, exception in failures:
+                print('%s: %r' % (completed_marksheet.filename, exception),
+                      file=sys.stderr)
+            sys.exit(1)
+
+
+    elif arguments['submissions']:
+
+        from psyc20255management.utils import reports, assignments
+
+        submissions_dropbox_zip = arguments['<submissions_dropbox_zip>']
+
+        if arguments['validate']:
+            # List the most recent submission of each student, straight from
+            # the dropbox zip file, after checking every filename.
+            from psyc20255management.utils import filenames
+
+            try:
+                submissions = reports.get_submitted_reports_list_from_zip(
+                        submissions_dropbox_zip,
+                        strict=True
+                )
+            except filenames.MalformedFilenamesError as error:
+                print(error, file=sys.stderr)
+                sys.exit(1)
+
+            for student_id in sorted(submissions):
+                submission = submissions[student_id]
+                print(','.join([submission.student_id,
+                                submission.student_name,
+                                submission.timestamp.isoformat(),
+                                submission.checksum]))
+
+        elif arguments['create_marking_assignments']:
+
+            submissions = None
+
+            if arguments['--assignments']:
+                marking_assignments = assignments.read_marking_assignments(
+                        arguments['--assignments']
+                )
+            else:
+                # The reports are scheduled among the lecturers who mark each
+                # student's lab group, and the markers are recorded against
+                # the reports in the database.
+                from psyc20255management import database
+
+                sequence_name = arguments['--sequence']
+                balance = arguments['--balance']
+
+                engine = database.get_engine(arguments['--config'])
+                with engine.connect() as connection:
+                    lecturers = database.get_lecturers(connection)
+                    student_labgroups = database.get_student_labgroups(connection)
+                    labgroup_markers\
+                            = database.get_labgroup_markers(connection,
+                                                            sequence_name)
+
+                capacities = {}
+                if arguments['--capacities']:
+                    capacities = assignments.read_marker_capacities(
+                            arguments['--capacities']
                     )
 
-            print('\n'.join([','.join(completed_marksheet) 
-                             for completed_marksheet in completed_marksheets])
-                             )
+                submissions = reports.get_submitted_reports_list_from_zip(
+                        submissions_dropbox_zip
+                )
+                report_weights\
+                        = assignments.get_report_weights(submissions_dropbox_zip,
+                                                         submissions,
+                                                         balance)
+
+                # Without lecturers for their lab group, any marker of the
+                # sequence may mark a student's report.
+                sequence_markers = sorted({uid for markers in labgroup_markers.values()
+                                           for uid in markers})
+                schedule = assignments.schedule_marking(
+                        [(student_id,
+                          weight,
+                          labgroup_markers.get(student_labgroups.get(student_id), ()))
+                         for student_id, weight in report_weights.items()],
+                        sequence_markers or sorted(lecturers),
+                        capacities
+                )
+
+                print('\n'.join(assignments.format_schedule(schedule, balance)),
+                      file=sys.stderr)
+
+                marked_reports = database.update_report_markers(
+                        engine,
+                        sequence_name,
+                        schedule.assignments
+                )
+                if marked_reports < len(schedule.assignments):
+                    print('%d scheduled reports are not in the database.'
+                          % (len(schedule.assignments) - marked_reports),
+                          file=sys.stderr)
+
+                marking_assignments\
+                        = assignments.get_scheduled_marking_assignments(schedule,
+                                                                        lecturers)
+
+            unassigned_submissions, intake_summary\
+                    = assignments.create_marking_assignments(
+                            submissions_dropbox_zip,
+                            marking_assignments,
+                            arguments['--marking-dir'],
+                            threads=int(arguments['--threads']),
+                            progress_output=sys.stderr,
+                            submissions=submissions
+                    )
+
+            print(reports.format_intake_summary(intake_summary), file=sys.stderr)
+
+            if unassigned_submissions:
+                print('%d submissions have no marker:' 
+                      % len(unassigned_submissions),
+                      file=sys.stderr)
+                for submission in unassigned_submissions:
+                    print(submission.filename, file=sys.stderr)
+                sys.exit(1)
 
+        elif arguments['duplicates']:
+            # Exact and near-duplicate reports, as csv, and flagged against
+            # their Reports in the database if the sequence is given.
+            from psyc20255management.utils import duplicates
+
+            submissions = reports.get_submitted_reports_list_from_zip(
+                    submissions_dropbox_zip
+            )
+
+            duplicate_pairs, unreadable_submissions\
+                    = duplicates.find_duplicates(
+                            submissions,
+                            submissions_dropbox_zip,
+                            similarity=float(arguments['--similarity']),
+                            processes=processes
+                    )
+
+            for pair in duplicate_pairs:
+                print('%s,%s,%s,%.3f' % pair)
+
+            print('%d pairs of duplicates, of %d submissions.'
+                  % (len(duplicate_pairs), len(submissions)),
+                  file=sys.stderr)
+
+            if arguments['--sequence']:
+                from psyc20255management import database
+                flagged = database.update_report_duplicates(
+                        database.get_engine(arguments['--config']),
+                        arguments['--sequence'],
+                        duplicate_pairs
+                )
+                print('%d pairs flagged in the database.' % flagged,
+                      file=sys.stderr)
+
+            if unreadable_submissions:
+                print('%d reports could not be read:' 
+                      % len(unreadable_submissions),
+                      file=sys.stderr)
+                for submission, exception in unreadable_submissions:
+                    print('%s: %r' % (submission.filename, exception),
+                          file=sys.stderr)
 
     elif arguments['database']:
 
+        from psyc20255management import database
+
+        # One engine, configured from the config file, for every command.
+        engine = database.get_engine(arguments['--config'])
+
         if arguments['create']:
 
-            engine = create_engine('sqlite:///%s.db' % db_name)
-            Base.metadata.create_all(engine)
+            database.create_tables(engine)
 
         elif arguments['initialize']:
             # Use all config info to fill database
-            pass
+            database.initialize_database(engine)
+
+        elif arguments['populate']:
+
+            students, lecturers, labgroup_lecturers, submissions = [], [], [], None
+            if arguments['--students']:
+                students = database.read_students(arguments['--students'])
+            if arguments['--lecturers']:
+                lecturers = database.read_lecturers(arguments['--lecturers'])
+            if arguments['--labgroup-lecturers']:
+                labgroup_lecturers = database.read_labgroup_lecturers(
+                        arguments['--labgroup-lecturers']
+                )
+            if arguments['--submissions']:
+                from psyc20255management.utils import reports
+                submissions = reports.get_submitted_reports_list_from_zip(
+                        arguments['--submissions']
+                )
+
+            start = time.perf_counter()
+            database.populate_database(engine,
+                                       students=students,
+                                       lecturers=lecturers,
+                                       labgroup_lecturers=labgroup_lecturers,
+                                       sequence_name=arguments['--sequence'],
+                                       submissions=submissions)
+            print('Populated database in %.2f s.' % (time.perf_counter() - start),
+                  file=sys.stderr)
+
+        elif arguments['update']:
+            sequence_name = arguments['--sequence']
+
+            report_rows, grade_rows, failures = {}, {}, []
+            if arguments['--submissions']:
+                from psyc20255management.utils import reports
+                report_rows = database.get_report_rows(
+                        reports.get_submitted_reports_list_from_zip(
+                            arguments['--submissions'])
+                )
+            if arguments['--completions']:
+                # Bad marksheets, or those of another sequence, are left
+                # out, and the rest are updated.
+                from psyc20255management.utils import marksheets
+                grade_rows = database.get_grade_rows(
+                        marksheets.process_completed_marksheets(
+                            arguments['--completions'],
+                            sequence_name=sequence_name,
+                            processes=processes,
+                            failures=failures)
+                )
+
+            for student_id, values in grade_rows.items():
+                report_rows.setdefault(student_id, {}).update(values)
+
+            start = time.perf_counter()
+            inserted, updated, unchanged\
+                    = database.update_reports(engine, sequence_name, report_rows)
+            print('Reports: %d inserted, %d updated, %d unchanged, in %.2f s.'
+                  % (inserted, updated, unchanged, time.perf_counter() - start),
+                  file=sys.stderr)
+
+            if failures:
+                print('%d bad marksheets left out:' % len(failures),
+                      file=sys.stderr)
+                for completed_marksheet, exception in failures:
+                    print('%s: %r' % (completed_marksheet.filename, exception),
+                          file=sys.stderr)
+                sys.exit(1)
+
+    elif arguments['analytics']:
+
+        from psyc20255management import analytics
+
+        start = time.perf_counter()
+
+        if arguments['--completions']:
+            # Straight from a completions run. Without a sequence, the
+            # directory is processed as a batch of every sequence.
+            from psyc20255management.utils import marksheets
+
+            failures = []
+            if arguments['--sequence']:
+                completed_marksheets = marksheets.process_completed_marksheets(
+                        arguments['--completions'],
+                        sequence_name=arguments['--sequence'],
+                        processes=processes,
+                        failures=failures
+                )
+            else:
+                completed_marksheets_by_sequence, failures_by_sequence\
+                        = marksheets.process_completed_marksheet_tree(
+                                arguments['--completions'],
+                                processes=processes
+                        )
+                completed_marksheets\
+                        = [row for rows in completed_marksheets_by_sequence.values()
+                           for row in rows]
+                for sequence_failures in failures_by_sequence.values():
+                    failures.extend(sequence_failures)
+
+            if failures:
+                print('Leaving out %d bad marksheets.' % len(failures),
+                      file=sys.stderr)
+
+            labgroups = {}
+            if arguments['--students']:
+                from psyc20255management import database
+                labgroups = {student['uid']: student['labgroup_id'] for student
+                             in database.read_students(arguments['--students'])}
+
+            grade_rows = analytics.get_completed_marksheet_grade_rows(
+                    completed_marksheets, labgroups
+            )
+
+        else:
+            from psyc20255management import database
+
+            engine = database.get_engine(arguments['--config'])
+            with engine.connect() as connection:
+                grade_rows = analytics.get_report_grade_rows(
+                        connection, arguments['--sequence']
+                )
+
+        grade_columns = analytics.GradeColumns(grade_rows)
+
+        for line in analytics.format_group_statistics(
+                'Marker', grade_columns.get_marker_statistics()):
+            print(line)
+        print()
+        for line in analytics.format_group_statistics(
+                'Lab group', grade_columns.get_labgroup_statistics()):
+            print(line)
+
+        print('%d grades in %.2f s.' % (len(grade_columns), 
+                                        time.perf_counter() - start),
+              file=sys.stderr)